@@ -0,0 +1,287 @@
+"""
+Reproducible benchmark suite for the prediction hot path.
+
+Measures, on synthetic rows matching feature_columns.pkl:
+
+- model load time (cold, in a fresh interpreter, and warm)
+- prepare_input cost per batch size
+- predict latency for single rows and for batches of several sizes,
+  for the sklearn pipeline and the compiled path
+- explain latency (exact TreeSHAP and the Saabas approximation) for single
+  rows and batches, on the compiled path
+- Flask request overhead, via the test client of the shared serving app
+- peak memory (process max RSS and the Python allocations traced while scoring)
+
+Results are written as JSON so runs can be compared across commits:
+
+python benchmark.py --output results/HEAD.json
+python benchmark.py --compare results/baseline.json results/HEAD.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from predictor import DistractionPredictor
+from synthetic_data import make_rows
+
+BATCH_SIZES = [1, 10, 100, 1000]
+N_REPEATS = 20
+SEED = 0
+
+BRAINHACK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def timed(fn, repeats):
+    # Median and p95 wall time of fn() in milliseconds, after one warm-up call
+    fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'median_ms': round(statistics.median(samples), 4),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        'min_ms': round(samples[0], 4),
+    }
+
+
+def cold_load_ms(model_path, feature_columns_path, compiled):
+    # A fresh interpreter, so imports are part of the cost like at server start
+    code = (
+        "import time; start = time.perf_counter(); "
+        "from predictor import DistractionPredictor; "
+        f"DistractionPredictor({model_path!r}, {feature_columns_path!r}, compiled={compiled!r}); "
+        "print((time.perf_counter() - start) * 1000)"
+    )
+    output = subprocess.run(
+        [sys.executable, '-W', 'ignore', '-c', code],
+        cwd=BRAINHACK_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+    return round(float(output.strip().splitlines()[-1]), 2)
+
+
+def bench_load(model_path, feature_columns_path, repeats):
+    results = {}
+    for compiled in (False, True):
+        name = 'compiled' if compiled else 'pipeline'
+        results[name] = {
+            'cold_ms': cold_load_ms(model_path, feature_columns_path, compiled),
+            'warm': timed(lambda: DistractionPredictor(model_path, feature_columns_path, compiled=compiled), repeats),
+        }
+    return results
+
+
+def bench_predict(predictor, rows, batch_sizes, repeats):
+    results = {'prepare_input': {}, 'single_row': None, 'batch': {}}
+
+    results['single_row'] = timed(lambda: predictor.predict(rows[0]), repeats)
+    for size in batch_sizes:
+        batch = rows[:size]
+        results['prepare_input'][str(size)] = timed(lambda: predictor.prepare_input(batch), repeats)
+        stats = timed(lambda: predictor.predict_batch(batch), repeats)
+        stats['us_per_row'] = round(stats['median_ms'] * 1000 / size, 2)
+        results['batch'][str(size)] = stats
+    return results
+
+
+def bench_explain(predictor, rows, batch_sizes, repeats):
+    results = {}
+    for name, approximate in (('exact', False), ('approximate', True)):
+        results[name] = {'single_row': timed(lambda: predictor.explain(rows[0], approximate=approximate), repeats),
+                         'batch': {}}
+        for size in batch_sizes:
+            batch = rows[:size]
+            stats = timed(lambda: predictor.explain(batch, approximate=approximate), repeats)
+            stats['us_per_row'] = round(stats['median_ms'] * 1000 / size, 2)
+            results[name]['batch'][str(size)] = stats
+    return results
+
+
+def bench_flask(predictor, rows, batch_sizes, repeats):
+    # Imported here so the model-only benchmarks do not need Flask installed
+    from serving import InferenceService, create_app
+
+    client = create_app(InferenceService(predictor)).test_client()
+    results = {'predict': timed(lambda: client.post('/predict', json=rows[0]), repeats), 'batch': {}}
+
+    # Overhead is the request time minus the bare model call for the same input
+    direct = timed(lambda: predictor.predict_with_recommendations(rows[0]), repeats)
+    results['predict']['overhead_ms'] = round(results['predict']['median_ms'] - direct['median_ms'], 4)
+
+    for size in batch_sizes:
+        batch = rows[:size]
+        results['batch'][str(size)] = timed(lambda: client.post('/predict/batch', json=batch), repeats)
+    return results
+
+
+def bench_memory(predictor, rows):
+    tracemalloc.start()
+    predictor.predict_batch(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return {
+        'max_rss_mb': round(max_rss / divisor, 2),
+        'traced_peak_mb': round(peak / (1024 * 1024), 2),
+        'rows': len(rows),
+    }
+
+
+def environment():
+    import sklearn
+    import xgboost
+
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BRAINHACK_DIR, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'sklearn': sklearn.__version__,
+        'xgboost': xgboost.__version__,
+    }
+
+
+def run(model_path='distraction_model.pkl', feature_columns_path='feature_columns.pkl',
+        batch_sizes=BATCH_SIZES, repeats=N_REPEATS, with_flask=True, with_cold_load=True):
+    """
+    Run the benchmark suite.
+
+    Args:
+        model_path (str): Model pickle or bundle path
+        feature_columns_path (str): Feature columns pickle path
+        batch_sizes (list of int): Batch sizes for prepare_input, predict_batch and /predict/batch
+        repeats (int): Timed repetitions per measurement
+        with_flask (bool): Also measure requests through the Flask test client
+        with_cold_load (bool): Also measure cold loads in a fresh interpreter
+
+    Returns:
+        dict: JSON-serializable results
+    """
+    model_path = os.path.abspath(model_path)
+    feature_columns_path = os.path.abspath(feature_columns_path)
+
+    pipeline = DistractionPredictor(model_path, feature_columns_path, max_batch_size=max(batch_sizes))
+    compiled = DistractionPredictor(model_path, feature_columns_path, max_batch_size=max(batch_sizes), compiled=True)
+    rows = make_rows(pipeline.model, pipeline.feature_columns, max(batch_sizes), seed=SEED)
+
+    results = {
+        'environment': environment(),
+        'config': {
+            'model': os.path.relpath(model_path, BRAINHACK_DIR),
+            'batch_sizes': list(batch_sizes),
+            'repeats': repeats,
+            'seed': SEED,
+        },
+        'memory': bench_memory(pipeline, rows),
+        'predict': {
+            'pipeline': bench_predict(pipeline, rows, batch_sizes, repeats),
+            'compiled': bench_predict(compiled, rows, batch_sizes, repeats),
+        },
+        'explain': bench_explain(compiled, rows, batch_sizes, repeats),
+    }
+    if with_cold_load:
+        results['load'] = bench_load(model_path, feature_columns_path, max(3, repeats // 4))
+    if with_flask:
+        results['flask'] = bench_flask(pipeline, rows, batch_sizes, repeats)
+    return results
+
+
+def flatten(results, prefix=''):
+    # {'a': {'b': {'median_ms': 1}}} -> {'a.b.median_ms': 1}, keeping only numbers
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{prefix}{key}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Compare the timings and memory of two benchmark results.
+
+    Args:
+        baseline (dict): Earlier results
+        current (dict): New results
+        threshold (float): Relative increase reported as a regression
+
+    Returns:
+        list: (metric, baseline, current, ratio, regressed) tuples for the shared metrics
+    """
+    old = flatten({k: v for k, v in baseline.items() if k not in ('environment', 'config')})
+    new = flatten({k: v for k, v in current.items() if k not in ('environment', 'config')})
+    rows = []
+    for metric in sorted(old.keys() & new.keys()):
+        if not metric.endswith(('median_ms', 'cold_ms', 'us_per_row', '_mb')):
+            continue
+        ratio = new[metric] / old[metric] if old[metric] else float('inf')
+        rows.append((metric, old[metric], new[metric], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='distraction_model.pkl')
+    parser.add_argument('--feature-columns', default='feature_columns.pkl')
+    parser.add_argument('--batch-sizes', default=','.join(map(str, BATCH_SIZES)))
+    parser.add_argument('--repeats', type=int, default=N_REPEATS)
+    parser.add_argument('--no-flask', action='store_true', help='Skip the Flask test client benchmarks')
+    parser.add_argument('--no-cold-load', action='store_true', help='Skip the fresh-interpreter load benchmarks')
+    parser.add_argument('--output', help='Write the JSON results to this file (default: stdout)')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='Compare two result files instead of running the benchmarks')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative slowdown reported as a regression by --compare (default: 0.10)')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        print(f"{'metric':<50} {'baseline':>12} {'current':>12} {'ratio':>7}")
+        regressions = 0
+        for metric, old, new, ratio, regressed in compare(baseline, current, args.threshold):
+            regressions += regressed
+            print(f"{metric:<50} {old:>12.4f} {new:>12.4f} {ratio:>7.2f}{'  REGRESSION' if regressed else ''}")
+        sys.exit(1 if regressions else 0)
+
+    results = run(
+        args.model, args.feature_columns,
+        batch_sizes=[int(size) for size in args.batch_sizes.split(',')],
+        repeats=args.repeats,
+        with_flask=not args.no_flask,
+        with_cold_load=not args.no_cold_load,
+    )
+    output = json.dumps(results, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f"Wrote {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
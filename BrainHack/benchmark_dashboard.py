@@ -0,0 +1,153 @@
+"""
+Measure dashboard read latency: rollup documents against scanning raw sessions.
+
+Generates --days of history for --users users (focus sessions and breaks
+every day), then loads it two ways into SQLite files:
+
+- rollups: DashboardStore, fed in batches of --batch events as the EventLog
+  writer would (the build rate is reported in events per second)
+- raw: one row per focusSessions / breaks document, indexed by user, the way
+  the dashboard reads them today; each read fetches all of the user's rows
+  and computes the metrics from them
+
+Read latency is measured on random users for both, with the number of
+documents each read touches.
+
+Usage:
+python benchmark_dashboard.py [--users 100000] [--days 7] [--reads 20000] [--dir /tmp/dashboard-benchmark]
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import time
+
+from dashboard_store import (
+    DAY_SECONDS, DAYS_KEPT, HOUR_SECONDS, PRODUCTIVE_DAY_HOURS, DashboardStore,
+)
+
+START = 1_710_000_000 // DAY_SECONDS * DAY_SECONDS
+SESSIONS_PER_DAY = 3
+BREAKS_PER_DAY = 2
+
+
+def make_day(day, n_users, rng):
+    # One day of normalized events for every user, in time order
+    events = []
+    for user in range(n_users):
+        user_id = f'user_{user}'
+        t = START + day * DAY_SECONDS + 8 * HOUR_SECONDS
+        for _ in range(SESSIONS_PER_DAY):
+            duration = rng.randint(20, 120) * 60
+            events.append({'user_id': user_id, 'type': 'focus_session', 't': t + duration, 'start': t,
+                           'duration': duration, 'interrupted': rng.random() < 0.2})
+            t += duration + 15 * 60
+        for i in range(BREAKS_PER_DAY):
+            events.append({'user_id': user_id, 'type': 'break', 't': t + i * HOUR_SECONDS, 'duration': 600})
+    events.sort(key=lambda event: event['t'])
+    return events
+
+
+def scan_metrics(connection, user_id, t):
+    # What the dashboard does today: read all of the user's documents and aggregate them
+    sessions = connection.execute(
+        'SELECT start, end, duration, interrupted FROM focus_sessions WHERE user_id = ?', (user_id,)
+    ).fetchall()
+    breaks = connection.execute('SELECT t FROM breaks WHERE user_id = ?', (user_id,)).fetchall()
+    today = t // DAY_SECONDS * DAY_SECONDS
+    week_start = today - (DAYS_KEPT - 1) * DAY_SECONDS
+    recent = [s for s in sessions if t - DAY_SECONDS < s[1] <= t]
+    per_day = {}
+    for start, end, duration, _ in sessions:
+        if week_start <= end <= t:
+            per_day[end // DAY_SECONDS] = per_day.get(end // DAY_SECONDS, 0) + duration
+    week_seconds = sum(per_day.values())
+    interrupted = sum(s[3] for s in recent)
+    return {
+        'distractionRiskLevel': {
+            'percentage': round(100 * interrupted / len(recent)) if recent else 0,
+            'interruptedSessions': interrupted, 'totalSessions': len(recent),
+        },
+        'dailyStatistics': {
+            'focusTimeHours': round(per_day.get(today // DAY_SECONDS, 0) / HOUR_SECONDS, 1),
+            'breaksTaken': sum(1 for (b,) in breaks if today <= b <= t),
+        },
+        'weeklyStatistics': {
+            'productiveDays': sum(1 for s in per_day.values() if s >= PRODUCTIVE_DAY_HOURS * HOUR_SECONDS),
+            'averageFocusTimeHours': round(week_seconds / DAYS_KEPT / HOUR_SECONDS, 1),
+        },
+        'productivityScore': min(100, round(100 * week_seconds / (DAYS_KEPT * PRODUCTIVE_DAY_HOURS * HOUR_SECONDS))),
+    }, len(sessions) + len(breaks)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        'p50_us': samples[len(samples) // 2] * 1e6,
+        'p99_us': samples[int(len(samples) * 0.99)] * 1e6,
+        'mean_us': statistics.fmean(samples) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure dashboard read latency.')
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=7, help='Days of history per user')
+    parser.add_argument('--reads', type=int, default=20000)
+    parser.add_argument('--batch', type=int, default=10000, help='Events per rollup write transaction')
+    parser.add_argument('--dir', default='/tmp/dashboard-benchmark', help='Scratch directory for the SQLite files')
+    args = parser.parse_args()
+
+    shutil.rmtree(args.dir, ignore_errors=True)
+    os.makedirs(args.dir)
+    rng = random.Random(0)
+    store = DashboardStore(os.path.join(args.dir, 'rollups.sqlite'))
+    raw = sqlite3.connect(os.path.join(args.dir, 'raw.sqlite'))
+    raw.execute('CREATE TABLE focus_sessions (user_id TEXT, start REAL, end REAL, duration REAL, interrupted INTEGER)')
+    raw.execute('CREATE TABLE breaks (user_id TEXT, t REAL, duration REAL)')
+
+    build_seconds = n_events = 0
+    for day in range(args.days):
+        events = make_day(day, args.users, rng)
+        started = time.perf_counter()
+        for start in range(0, len(events), args.batch):
+            store.apply(events[start:start + args.batch], last_seq=n_events + min(start + args.batch, len(events)))
+        build_seconds += time.perf_counter() - started
+        n_events += len(events)
+        with raw:
+            raw.executemany('INSERT INTO focus_sessions VALUES (?, ?, ?, ?, ?)', [
+                (e['user_id'], e['start'], e['t'], e['duration'], e['interrupted'])
+                for e in events if e['type'] == 'focus_session'
+            ])
+            raw.executemany('INSERT INTO breaks VALUES (?, ?, ?)',
+                            [(e['user_id'], e['t'], e['duration']) for e in events if e['type'] == 'break'])
+    raw.execute('CREATE INDEX focus_sessions_user ON focus_sessions (user_id)')
+    raw.execute('CREATE INDEX breaks_user ON breaks (user_id)')
+    document_bytes = sqlite3.connect(store.path).execute('SELECT AVG(LENGTH(document)) FROM rollups').fetchone()[0]
+    print(f'{args.users} users, {args.days} days, {n_events} events: rollups built at '
+          f'{n_events / build_seconds:.0f} events/s, {document_bytes:.0f} bytes per rollup document')
+
+    # Read at the end of the last day, like a user opening the dashboard in the evening
+    t = START + args.days * DAY_SECONDS - 1
+    users = [f'user_{rng.randrange(args.users)}' for _ in range(args.reads)]
+    rollup_times, scan_times, documents = [], [], []
+    for user_id in users:
+        started = time.perf_counter()
+        store.metrics(user_id, t)
+        rollup_times.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        _, n_documents = scan_metrics(raw, user_id, t)
+        scan_times.append(time.perf_counter() - started)
+        documents.append(n_documents)
+
+    print(f"{'read':<10}{'p50 (us)':>12}{'p99 (us)':>12}{'mean (us)':>12}{'documents':>12}")
+    for name, samples, n_documents in (('rollup', rollup_times, 1), ('scan', scan_times, statistics.fmean(documents))):
+        result = percentiles(samples)
+        print(f"{name:<10}{result['p50_us']:>12.1f}{result['p99_us']:>12.1f}{result['mean_us']:>12.1f}"
+              f"{n_documents:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
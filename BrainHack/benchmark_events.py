@@ -0,0 +1,92 @@
+"""
+Measure /events ingestion throughput in events per second.
+
+Client threads post NDJSON batches to InferenceService.ingest_events, the
+handler behind /events in both apps: NDJSON parsing, validation, the
+write-ahead log's group commit and the feature store update. HTTP framing is
+left out so the numbers show the ingestion path itself.
+
+Usage:
+python benchmark_events.py [--events 200000] [--log-dir /tmp/events-benchmark]
+"""
+import argparse
+import json
+import random
+import shutil
+import threading
+import time
+
+from event_log import EVENT_TYPES, EventLog
+from feature_store import FeatureStore
+from serving import InferenceService
+
+N_USERS = 10000
+
+
+def make_body(n_events, seed):
+    rng = random.Random(seed)
+    start = 1_700_000_000
+    lines = []
+    for i in range(n_events):
+        event_type = rng.choice(EVENT_TYPES[:6])
+        lines.append(json.dumps({'user_id': f'user_{rng.randrange(N_USERS)}', 'type': event_type,
+                                 'timestamp': start + i}))
+    return '\n'.join(lines).encode('utf-8')
+
+
+def run(log_dir, n_events, batch_size, clients, fsync, max_pending=1_000_000):
+    shutil.rmtree(log_dir, ignore_errors=True)
+    service = InferenceService(feature_store=FeatureStore(),
+                               event_log=EventLog(log_dir, max_pending=max_pending, fsync=fsync),
+                               max_events=batch_size)
+    service.start()
+    requests_per_client = max(n_events // (batch_size * clients), 1)
+    bodies = [make_body(batch_size, seed) for seed in range(8)]
+    statuses = []
+
+    def client(index):
+        for i in range(requests_per_client):
+            statuses.append(service.ingest_events('application/x-ndjson', bodies[(index + i) % len(bodies)])[1])
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+    stats = service.event_log_stats()
+    service.event_log.close()
+
+    accepted = statuses.count(200) * batch_size
+    return {
+        'events_per_second': accepted / seconds,
+        'events_per_commit': accepted / max(stats['commits'], 1),
+        'rejected_requests': statuses.count(429),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure /events ingestion throughput.')
+    parser.add_argument('--events', type=int, default=200000, help='Events per configuration')
+    parser.add_argument('--log-dir', default='/tmp/events-benchmark', help='Scratch directory for the log')
+    args = parser.parse_args()
+
+    print(f"{'fsync':<7}{'batch':>7}{'clients':>9}{'events/s':>12}{'events/commit':>15}")
+    for fsync in (True, False):
+        for batch_size in (1, 100, 1000):
+            for clients in (1, 8):
+                # Unbatched requests are slow; keep their run short
+                n_events = args.events if batch_size > 1 else args.events // 50
+                result = run(args.log_dir, n_events, batch_size, clients, fsync)
+                print(f"{str(fsync):<7}{batch_size:>7}{clients:>9}{result['events_per_second']:>12.0f}"
+                      f"{result['events_per_commit']:>15.1f}")
+
+    # A queue much smaller than the offered load: the excess is rejected with 429 instead of queueing
+    result = run(args.log_dir, args.events, 1000, 8, True, max_pending=2000)
+    print(f"\nmax_pending=2000, 8 clients x 1000 events: {result['events_per_second']:.0f} events/s accepted, "
+          f"{result['rejected_requests']} requests rejected with 429")
+
+
+if __name__ == '__main__':
+    main()
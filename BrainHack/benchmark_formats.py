@@ -0,0 +1,104 @@
+"""
+Benchmark cold-load time and inference latency across model artifact formats.
+
+Compares the pickled sklearn pipeline with the model bundle exported by
+train_model.py (native XGBoost booster, pure NumPy trees and, if present, ONNX).
+
+Usage:
+python benchmark_formats.py [distraction_model.pkl] [distraction_model_bundle]
+"""
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from compiled_model import CompiledModel
+from model_bundle import load_bundle
+from predictor import DistractionPredictor
+from synthetic_data import make_rows
+
+N_SINGLE_ROWS = 200
+BATCH_SIZE = 1000
+
+# Each loader runs in a fresh interpreter so imports are part of the cold-load time
+COLD_LOADERS = {
+    'pickle': "import pickle; pickle.load(open({path!r}, 'rb'))",
+    'bundle (xgboost)': "from model_bundle import load_bundle; load_bundle({path!r})",
+    'bundle (onnx)': "from model_bundle import load_bundle; load_bundle({path!r}, runtime='onnx')",
+    'bundle (numpy)': "from model_bundle import load_bundle; load_bundle({path!r}, runtime='numpy')",
+}
+
+
+def cold_load_ms(fmt, path):
+    code = (
+        "import time; start = time.perf_counter(); "
+        + COLD_LOADERS[fmt].format(path=path)
+        + "; print((time.perf_counter() - start) * 1000)"
+    )
+    output = subprocess.run(
+        [sys.executable, '-W', 'ignore', '-c', code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def latency(model, rows):
+    start = time.perf_counter()
+    for row in rows[:N_SINGLE_ROWS]:
+        model.predict_proba([row])
+    single_us = (time.perf_counter() - start) * 1e6 / N_SINGLE_ROWS
+
+    start = time.perf_counter()
+    predictions = model.predict_proba(rows)
+    batch_us = (time.perf_counter() - start) * 1e6 / len(rows)
+
+    return single_us, batch_us, np.asarray(predictions)
+
+
+class PipelineModel:
+    # Adapts the pickled pipeline to the predict_proba(rows) interface used here
+    def __init__(self, predictor):
+        self.predictor = predictor
+
+    def predict_proba(self, rows):
+        return self.predictor.model.predict_proba(self.predictor.prepare_input(rows))[:, 1]
+
+
+def main(model_path='distraction_model.pkl', bundle_dir='distraction_model_bundle'):
+    model_path = os.path.abspath(model_path)
+    bundle_dir = os.path.abspath(bundle_dir)
+
+    predictor = DistractionPredictor(model_path)
+    rows = make_rows(predictor.model, predictor.feature_columns, BATCH_SIZE)
+
+    candidates = [
+        ('pickle', 'pickle', model_path, PipelineModel(predictor)),
+        ('pickle (compiled)', 'pickle', model_path,
+         CompiledModel.from_pipeline(predictor.model, predictor.feature_columns)),
+        ('bundle (xgboost)', 'bundle (xgboost)', bundle_dir, load_bundle(bundle_dir)[0]),
+    ]
+    try:
+        candidates.append(('bundle (numpy)', 'bundle (numpy)', bundle_dir, load_bundle(bundle_dir, runtime='numpy')[0]))
+    except ValueError as e:
+        print(f"Skipping NumPy: {e}")
+    try:
+        candidates.append(('bundle (onnx)', 'bundle (onnx)', bundle_dir, load_bundle(bundle_dir, runtime='onnx')[0]))
+    except (ImportError, ValueError) as e:
+        print(f"Skipping ONNX: {e}")
+
+    print(f"{'format':<20} {'cold load (ms)':>15} {'us/row single':>14} {'us/row batch':>13} {'max diff':>10}")
+    reference = None
+    for name, fmt, path, model in candidates:
+        load_ms = cold_load_ms(fmt, path)
+        single_us, batch_us, predictions = latency(model, rows)
+        if reference is None:
+            reference = predictions
+        max_diff = float(np.abs(predictions - reference).max())
+        print(f"{name:<20} {load_ms:>15.1f} {single_us:>14.1f} {batch_us:>13.2f} {max_diff:>10.2e}")
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
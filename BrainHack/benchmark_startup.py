@@ -0,0 +1,99 @@
+"""
+Measure the cold start of the Flask serving app, phase by phase.
+
+Each configuration runs in a fresh interpreter, like a new Cloud Run
+instance: start Python, import the serving package, load the model, build
+the app and answer the first /predict request. The heavy libraries that ended
+up imported are listed, since they dominate the import and load phases.
+
+With a background load, 'load' is only the time to start the loading thread:
+the app can accept connections after the 'app' phase, and the first request
+waits for the model.
+
+Usage:
+python benchmark_startup.py [--repeat 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BRAINHACK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+HEAVY_MODULES = ['pandas', 'sklearn', 'xgboost', 'onnxruntime', 'matplotlib']
+
+SAMPLE_ROW = {
+    'session_duration': 45, 'stress_level': 6, 'fatigue_score': 4, 'notifications_count': 12,
+    'phone_usage_minutes': 90, 'time_of_day': 'afternoon', 'location_type': 'home',
+    'timestamp': '2024-03-14 15:30:00', 'user_id': 'user_42',
+}
+
+# Environment of each configuration, on top of the current environment
+CONFIGURATIONS = {
+    'pickle': {},
+    'pickle, compiled': {'COMPILED_INFERENCE': 'true'},
+    'pickle, background load': {'BACKGROUND_MODEL_LOAD': 'true'},
+    'bundle, xgboost': {'MODEL_PATH': 'distraction_model_bundle'},
+    'bundle, numpy': {'MODEL_PATH': 'distraction_model_bundle', 'MODEL_RUNTIME': 'numpy'},
+    'bundle, numpy, background load': {
+        'MODEL_PATH': 'distraction_model_bundle', 'MODEL_RUNTIME': 'numpy', 'BACKGROUND_MODEL_LOAD': 'true'
+    },
+}
+
+CHILD = """
+import time
+started = time.perf_counter()
+import json, sys
+from serving import InferenceService, create_app
+imported = time.perf_counter()
+service = InferenceService.from_env('distraction_model.pkl', 'feature_columns.pkl')
+loaded = time.perf_counter()
+client = create_app(service).test_client()
+app_ready = time.perf_counter()
+response = client.post('/predict', json={row!r})
+assert response.status_code == 200, response.get_data(as_text=True)
+answered = time.perf_counter()
+print(json.dumps({{
+    'import': imported - started, 'load': loaded - imported, 'app': app_ready - loaded,
+    'first_request': answered - app_ready, 'in_process': answered - started,
+    'modules': [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def run_configuration(env):
+    # Wall time from spawning the interpreter to the first answer, plus the child's own phases
+    code = CHILD.format(row=SAMPLE_ROW, heavy=HEAVY_MODULES)
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-W', 'ignore', '-c', code],
+        cwd=BRAINHACK_DIR, env={**os.environ, **env},
+        capture_output=True, text=True, check=True,
+    ).stdout
+    total = time.perf_counter() - started
+    result = json.loads(output.strip().splitlines()[-1])
+    # Interpreter start-up and shut-down, outside the child's own clock
+    result['python'] = total - result['in_process']
+    result['total'] = total
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the cold start of the serving app.')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per configuration (the median is reported)')
+    args = parser.parse_args()
+
+    phases = ['python', 'import', 'load', 'app', 'first_request', 'total']
+    print(f"{'Configuration':<32}" + ''.join(f'{phase + " (ms)":>20}' for phase in phases) + '  heavy modules')
+    for name, env in CONFIGURATIONS.items():
+        runs = [run_configuration(env) for _ in range(args.repeat)]
+        medians = {phase: statistics.median(run[phase] for run in runs) * 1000 for phase in phases}
+        print(f'{name:<32}' + ''.join(f'{medians[phase]:>20.0f}' for phase in phases)
+              + '  ' + (', '.join(runs[0]['modules']) or '-'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""
+Score a whole file of user activity offline, in parallel.
+
+The input is read in chunks and the chunks are scored by a pool of worker
+processes, each loading the model once. The main process only moves bytes:
+
+- CSV: the file is cut into blocks of about --block-mb megabytes at line
+  boundaries, and each worker parses its own block. Records must not contain
+  newlines inside quoted fields.
+- Parquet: each row group is one chunk, read by the worker itself.
+
+Workers score a chunk with one vectorized call to the model (see
+DistractionPredictor.predict_proba) and return it already formatted, and the
+main process writes the chunks in input order. At most two chunks per worker
+are in flight, so memory stays flat on files of any size.
+
+Each output row has the columns given with --keep (those present in the
+input), risk_percentage and risk_level ('high', 'moderate' or 'low', the
+buckets of the recommendations). The output is CSV or Parquet, after its
+extension. Parquet files need pyarrow, an optional dependency.
+
+Usage:
+python bulk_score.py activity.csv scores.csv [--workers 4]
+python bulk_score.py activity.parquet scores.parquet --model distraction_model_bundle --runtime numpy
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from predictor import DistractionPredictor, risk_level
+
+DEFAULT_KEEP = ['user_id', 'timestamp']
+SCORE_COLUMNS = ['risk_percentage', 'risk_level']
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+# Set in each worker by _init_worker
+_worker = None
+
+
+def is_parquet(path):
+    """
+    Tell Parquet files from CSV files by their extension.
+
+    Args:
+        path (str): File path
+
+    Returns:
+        bool: Whether the file is Parquet
+    """
+    return path.lower().endswith(PARQUET_EXTENSIONS)
+
+
+def csv_blocks(path, block_bytes):
+    """
+    Cut a CSV file into blocks of whole lines.
+
+    Args:
+        path (str): CSV file with a header line
+        block_bytes (int): Approximate size of each block
+
+    Yields:
+        tuple: (header line, block) as bytes
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+        while True:
+            block = f.read(block_bytes)
+            if not block:
+                return
+            if not block.endswith(b'\n'):
+                # Finish the line the block cut through
+                block += f.readline()
+            yield header, block
+
+
+def _pyarrow():
+    # pyarrow is only needed for Parquet, so it is an optional dependency
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('Parquet input and output need pyarrow: pip install pyarrow') from None
+    return pyarrow
+
+
+def input_columns(path):
+    """
+    Read the column names of a CSV or Parquet file.
+
+    Args:
+        path (str): CSV file with a header line, or Parquet file
+
+    Returns:
+        list: Column names
+    """
+    if is_parquet(path):
+        return _pyarrow().parquet.ParquetFile(path).schema_arrow.names
+    with open(path, newline='', encoding='utf-8') as f:
+        return next(csv.reader(f), [])
+
+
+def parquet_row_groups(path):
+    """
+    List the row groups of a Parquet file.
+
+    Args:
+        path (str): Parquet file
+
+    Returns:
+        range: Row group indices
+    """
+    return range(_pyarrow().parquet.ParquetFile(path).num_row_groups)
+
+
+class _ChunkScorer:
+    # Per-process state: the model, and the input file for Parquet row groups
+
+    def __init__(self, model_path, feature_columns_path, runtime, input_path, keep, output_parquet):
+        self.predictor = DistractionPredictor(model_path, feature_columns_path, runtime=runtime)
+        self.input_path = input_path
+        self.keep = keep
+        self.output_parquet = output_parquet
+        self._parquet_file = None
+        # Read categorical columns as text, whatever a block's values look like
+        self.dtypes = {col: str for col in [*self.predictor.feature_columns['categorical'], *keep, 'user_id']}
+
+    def read(self, chunk):
+        import pandas as pd
+
+        if isinstance(chunk, int):
+            if self._parquet_file is None:
+                self._parquet_file = _pyarrow().parquet.ParquetFile(self.input_path)
+            return self._parquet_file.read_row_group(chunk).to_pandas()
+        header, block = chunk
+        return pd.read_csv(io.BytesIO(header + block), dtype=self.dtypes)
+
+    def score(self, chunk):
+        df = self.read(chunk)
+        out = df[[col for col in self.keep if col in df.columns]].copy()
+        risk = [round(float(p) * 100, 2) for p in self.predictor.predict_proba(df)]
+        out['risk_percentage'] = risk
+        out['risk_level'] = [risk_level(r) for r in risk]
+        if self.output_parquet:
+            return len(out), out
+        return len(out), out.to_csv(index=False, header=False).encode('utf-8')
+
+
+def _init_worker(*args):
+    global _worker
+    _worker = _ChunkScorer(*args)
+
+
+def _score_chunk(chunk):
+    return _worker.score(chunk)
+
+
+def _ordered_results(chunks, workers, init_args):
+    # Yield the scored chunks in input order, keeping at most two chunks per worker in flight
+    if workers == 1:
+        scorer = _ChunkScorer(*init_args)
+        for chunk in chunks:
+            yield scorer.score(chunk)
+        return
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init_args) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_score_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def bulk_score(input_path, output_path, model_path='distraction_model.pkl',
+               feature_columns_path='feature_columns.pkl', runtime='xgboost', workers=None,
+               block_bytes=8 << 20, keep=DEFAULT_KEEP):
+    """
+    Score every row of a CSV or Parquet file and write the scores in input order.
+
+    Args:
+        input_path (str): Input CSV or Parquet file with the model's input columns
+        output_path (str): Output CSV or Parquet file
+        model_path (str): Model pickle or model bundle directory
+        feature_columns_path (str): Feature columns pickle (ignored for model bundles)
+        runtime (str): Runtime for model bundles, 'xgboost', 'onnx' or 'numpy'
+        workers (int): Worker processes (default: one per CPU); 1 scores in this process
+        block_bytes (int): Approximate size of each CSV chunk
+        keep (list): Input columns copied to the output, when present
+
+    Returns:
+        dict: Rows scored, chunks, seconds and rows per second
+    """
+    workers = workers or os.cpu_count() or 1
+    output_parquet = is_parquet(output_path)
+    # Fail before scoring anything if Parquet output cannot be written
+    pa = _pyarrow() if output_parquet else None
+    present = set(input_columns(input_path))
+    columns = [col for col in keep if col in present] + SCORE_COLUMNS
+    chunks = parquet_row_groups(input_path) if is_parquet(input_path) else csv_blocks(input_path, block_bytes)
+    init_args = (model_path, feature_columns_path, runtime, input_path, list(keep), output_parquet)
+
+    started = time.perf_counter()
+    n_rows = n_chunks = 0
+    writer = None
+    with open(output_path, 'wb') as f:
+        if not output_parquet:
+            # Written here so an input without rows still gets one; workers leave it out of their chunks
+            f.write((','.join(columns) + '\n').encode('utf-8'))
+        for chunk_rows, data in _ordered_results(chunks, workers, init_args):
+            if output_parquet:
+                table = pa.Table.from_pandas(data, preserve_index=False)
+                if writer is None:
+                    writer = pa.parquet.ParquetWriter(f, table.schema)
+                writer.write_table(table)
+            else:
+                f.write(data)
+            n_chunks += 1
+            n_rows += chunk_rows
+        if output_parquet and writer is None:
+            # No rows to infer the schema from: the kept columns are text, like _ChunkScorer reads them
+            schema = pa.schema([(col, pa.string()) for col in columns[:-len(SCORE_COLUMNS)]]
+                               + [('risk_percentage', pa.float64()), ('risk_level', pa.string())])
+            writer = pa.parquet.ParquetWriter(f, schema)
+        if writer is not None:
+            writer.close()
+    seconds = time.perf_counter() - started
+    return {'rows': n_rows, 'chunks': n_chunks, 'seconds': seconds, 'rows_per_second': n_rows / seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='CSV or Parquet file to score')
+    parser.add_argument('output', help='CSV or Parquet file for the scores')
+    parser.add_argument('--model', default='distraction_model.pkl', help='Model pickle or model bundle directory')
+    parser.add_argument('--feature-columns', default='feature_columns.pkl')
+    parser.add_argument('--runtime', default='xgboost', choices=['xgboost', 'onnx', 'numpy'],
+                        help='Runtime for model bundles')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--block-mb', type=float, default=8, help='Size of each CSV chunk in megabytes')
+    parser.add_argument('--keep', default=','.join(DEFAULT_KEEP),
+                        help='Comma-separated input columns copied to the output')
+    args = parser.parse_args()
+
+    result = bulk_score(
+        args.input, args.output, model_path=args.model, feature_columns_path=args.feature_columns,
+        runtime=args.runtime, workers=args.workers, block_bytes=int(args.block_mb * (1 << 20)),
+        keep=[col for col in args.keep.split(',') if col],
+    )
+    print(f"Scored {result['rows']} rows in {result['chunks']} chunks in {result['seconds']:.1f} s "
+          f"({result['rows_per_second']:.0f} rows/s), written to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+import math
+
+import numpy as np
+
+
+class CompiledModel:
+    """
+    A pandas-free inference path for the trained distraction pipeline.
+
+    At load time the fitted StandardScaler statistics and OneHotEncoder category
+    maps are copied out of the pipeline's ColumnTransformer, so a dict can be
+    encoded straight into a preallocated NumPy vector and handed to the XGBoost
+    booster without building a DataFrame. The same parameters can be stored as
+    plain arrays in a model bundle (see model_bundle.py).
+    """
+
+    def __init__(self, preprocessing, booster, iteration_range=(0, 0)):
+        """
+        Build the model from plain preprocessing parameters and a booster.
+
+        Args:
+            preprocessing (dict): Preprocessing parameters, as returned by get_preprocessing
+            booster (xgboost.Booster): Trained booster
+            iteration_range (tuple): Range of boosting rounds to use, (0, 0) for all
+        """
+        self.numeric_columns = list(preprocessing['numeric_columns'])
+        self.categorical_columns = list(preprocessing['categorical_columns'])
+        self.n_features = int(preprocessing['n_features'])
+
+        # The ColumnTransformer emits a sparse matrix when one-hot columns dominate, and
+        # XGBoost treats the entries a sparse matrix does not store as missing, not as 0
+        self.sparse = bool(preprocessing['sparse'])
+        self.fill_value = np.nan if self.sparse else 0.0
+
+        self.numeric_slots = np.asarray(preprocessing['numeric_slots'], dtype=np.intp)
+        self.numeric_mean = np.asarray(preprocessing['numeric_mean'], dtype=np.float64)
+        self.numeric_scale = np.asarray(preprocessing['numeric_scale'], dtype=np.float64)
+        self.category_slots = {
+            col: {category: preprocessing['category_offsets'][col] + i for i, category in enumerate(categories)}
+            for col, categories in preprocessing['categories'].items()
+        }
+        self._preprocessing = preprocessing
+        self._column_matrix = None
+
+        self.booster = booster
+        self.iteration_range = tuple(iteration_range)
+
+    @classmethod
+    def from_pipeline(cls, pipeline, feature_columns):
+        """
+        Extract the preprocessing parameters and booster from a fitted pipeline.
+
+        Args:
+            pipeline (sklearn.pipeline.Pipeline): Fitted preprocessor + XGBClassifier pipeline
+            feature_columns (dict): Dictionary with 'numeric' and 'categorical' column lists
+
+        Returns:
+            CompiledModel: Model that scores rows without pandas or sklearn
+        """
+        preprocessor = pipeline.named_steps['preprocessor']
+        classifier = pipeline.named_steps['classifier']
+
+        preprocessing = {
+            'numeric_columns': list(feature_columns['numeric']),
+            'categorical_columns': list(feature_columns['categorical']),
+            'n_features': sum(indices.stop - indices.start for indices in preprocessor.output_indices_.values()),
+            'sparse': bool(preprocessor.sparse_output_),
+            'numeric_slots': [],
+            'numeric_mean': [],
+            'numeric_scale': [],
+            'category_offsets': {},
+            'categories': {},
+        }
+
+        for name, transformer, columns in preprocessor.transformers_:
+            if name == 'remainder':
+                continue
+            start = preprocessor.output_indices_[name].start
+            if name == 'num':
+                preprocessing.update(cls._compile_scaler(transformer, columns, start, feature_columns['numeric']))
+            elif name == 'cat':
+                preprocessing.update(cls._compile_encoder(transformer, columns, start))
+            else:
+                raise ValueError(f"Cannot compile transformer '{name}'")
+
+        return cls(preprocessing, classifier.get_booster(), classifier._get_iteration_range(None))
+
+    @staticmethod
+    def _compile_scaler(scaler, columns, start, numeric_columns):
+        positions = {col: i for i, col in enumerate(columns)}
+        order = [positions[col] for col in numeric_columns]
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(len(columns))
+        scale = scaler.scale_ if scaler.with_std else np.ones(len(columns))
+        return {
+            'numeric_slots': [start + i for i in order],
+            'numeric_mean': np.asarray(mean, dtype=np.float64)[order].tolist(),
+            'numeric_scale': np.asarray(scale, dtype=np.float64)[order].tolist(),
+        }
+
+    @staticmethod
+    def _compile_encoder(encoder, columns, start):
+        if encoder.drop is not None or encoder.handle_unknown != 'ignore':
+            raise ValueError("Only OneHotEncoder(handle_unknown='ignore') without drop can be compiled")
+
+        category_offsets = {}
+        categories = {}
+        offset = start
+        for col, values in zip(columns, encoder.categories_):
+            category_offsets[col] = offset
+            categories[col] = values.tolist()
+            offset += len(values)
+        return {'category_offsets': category_offsets, 'categories': categories}
+
+    def get_preprocessing(self):
+        """
+        Get the preprocessing parameters as plain, JSON-serializable values.
+
+        Returns:
+            dict: Preprocessing parameters accepted by the constructor
+        """
+        return self._preprocessing
+
+    def _numeric_value(self, row, col):
+        # Mirror DataFrame.astype(float): missing columns default to 0, None becomes NaN
+        if col not in row:
+            return 0.0
+        value = row[col]
+        if value is None:
+            return math.nan
+        return float(value)
+
+    def transform(self, rows):
+        """
+        Encode rows into the model's feature matrix.
+
+        Args:
+            rows (list of dict): Input rows for prediction
+
+        Returns:
+            numpy.ndarray: Dense feature matrix of shape (len(rows), n_features)
+        """
+        matrix = np.full((len(rows), self.n_features), self.fill_value, dtype=np.float32)
+        numeric = np.empty((len(rows), len(self.numeric_columns)), dtype=np.float64)
+
+        for i, row in enumerate(rows):
+            for j, col in enumerate(self.numeric_columns):
+                numeric[i, j] = self._numeric_value(row, col)
+
+            # Unknown or missing categories are ignored, like handle_unknown='ignore'
+            for col in self.categorical_columns:
+                slot = self.category_slots[col].get(row.get(col, 'unknown'))
+                if slot is not None:
+                    matrix[i, slot] = 1.0
+
+        scaled = (numeric - self.numeric_mean) / self.numeric_scale
+        if self.sparse:
+            scaled[scaled == 0] = np.nan
+        matrix[:, self.numeric_slots] = scaled
+
+        return matrix
+
+    def predict_proba(self, rows):
+        """
+        Predict the probability of distraction for each row.
+
+        Args:
+            rows (list of dict): Input rows for prediction
+
+        Returns:
+            numpy.ndarray: Probability of distraction (0-1) per row
+        """
+        return self.predict_encoded(self.transform(rows))
+
+    def predict_encoded(self, matrix):
+        """
+        Score an already encoded feature matrix.
+
+        Args:
+            matrix (numpy.ndarray): Feature matrix from transform
+
+        Returns:
+            numpy.ndarray: Probability of distraction (0-1) per row
+        """
+        return self.booster.inplace_predict(
+            matrix,
+            iteration_range=self.iteration_range,
+            missing=np.nan,
+            validate_features=False,
+        )
+
+    def column_matrix(self):
+        """
+        Map the encoded features back to the input columns.
+
+        Returns:
+            numpy.ndarray: 0/1 matrix of shape (n_features, columns), numeric columns first and then
+                categorical ones, with a 1 where a feature (a scaled value or a one-hot slot) comes from a column
+        """
+        if self._column_matrix is None:
+            n_numeric = len(self.numeric_columns)
+            matrix = np.zeros((self.n_features, n_numeric + len(self.categorical_columns)), dtype=np.float32)
+            matrix[self.numeric_slots, np.arange(n_numeric)] = 1.0
+            for k, col in enumerate(self.categorical_columns):
+                matrix[list(self.category_slots[col].values()), n_numeric + k] = 1.0
+            self._column_matrix = matrix
+        return self._column_matrix
+
+    def explain_encoded(self, matrix, approximate=False):
+        """
+        Split the log-odds of each row into contributions of the input columns.
+
+        Uses XGBoost's exact TreeSHAP (pred_contribs) on the encoded matrix, then
+        sums the contributions of each column's one-hot slots.
+
+        Args:
+            matrix (numpy.ndarray): Feature matrix from transform
+            approximate (bool): Use the much faster Saabas approximation (approx_contribs), which
+                credits the change in expected value at each split on the row's path to the split feature
+
+        Returns:
+            tuple: (contributions of shape (len(matrix), columns) in column_matrix order,
+                bias of each row); contributions plus bias add up to the row's log-odds
+        """
+        if self.booster is None:
+            raise RuntimeError("Explanations need the XGBoost booster; load the model bundle with runtime='xgboost'")
+        import xgboost as xgb
+        from scipy.sparse import csr_matrix
+
+        if self.sparse:
+            # Hand over only the stored entries: a row has a few dozen of the thousands of one-hot slots
+            present = ~np.isnan(matrix)
+            data = csr_matrix(
+                (matrix[present], np.nonzero(present)[1], np.concatenate([[0], np.cumsum(present.sum(axis=1))])),
+                shape=matrix.shape,
+            )
+        else:
+            data = matrix
+        contributions = self.booster.predict(
+            xgb.DMatrix(data, missing=np.nan),
+            pred_contribs=True,
+            approx_contribs=approximate,
+            iteration_range=self.iteration_range,
+            validate_features=False,
+        )
+        return contributions[:, :-1] @ self.column_matrix(), contributions[:, -1]
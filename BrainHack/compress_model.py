@@ -0,0 +1,455 @@
+"""
+Post-training compression of the distraction model.
+
+Rewrites the trained pipeline into a smaller one that takes the same inputs
+(feature_columns.pkl is unchanged):
+
+- unused features: one-hot categories no tree splits on are removed from the
+  OneHotEncoder. This is lossless, and it is most of the size of models that
+  one-hot encode high-cardinality columns.
+- --max-depth: each subtree rooted at the given depth is collapsed into one
+  leaf, holding the cover-weighted mean of the leaves it replaces, so the tree's
+  average output over the training data does not move.
+- --min-contribution: trees whose mean absolute output (weighted by the
+  training cover of their leaves) is below the threshold are dropped. Their
+  mean output is folded into the base score, so the average prediction does
+  not move.
+- --quantize-bits: numeric split thresholds and leaf values are rounded to
+  this many mantissa bits. XGBoost always stores 32-bit floats, so this does
+  not shrink the pickle itself, but it makes the artifact compress much
+  better (gzip, git, Docker layers). Thresholds are rounded down: tree splits
+  sit on an observed value that goes right, and rounding down keeps it there.
+
+Each step is reported with the pickle size, gzip size, load time, per-row
+latency, test AUC and the largest change in predicted probability, so a
+size/accuracy trade-off can be picked. --sweep evaluates a set of presets.
+
+Usage:
+python compress_model.py --sweep
+python compress_model.py --min-contribution 0.015 --quantize-bits 10
+"""
+import argparse
+import copy
+import gzip
+import json
+import math
+import os
+import pickle
+import tempfile
+from collections import deque
+
+import numpy as np
+
+from benchmark import timed
+from feature_matrix import assemble_preprocessor
+from predictor import DistractionPredictor
+from synthetic_data import make_rows
+
+# Parent id XGBoost stores for the root node
+ROOT_PARENT = 2147483647
+
+# Presets evaluated by --sweep: (name, compress_pipeline arguments)
+SWEEP = [
+    ('unused features', {}),
+    ('+ quantize 10 bits', {'quantize_bits': 10}),
+    ('+ quantize 6 bits', {'quantize_bits': 6}),
+    ('+ contribution 0.015', {'min_contribution': 0.015}),
+    ('+ contribution 0.02', {'min_contribution': 0.02}),
+    ('+ depth 4', {'max_depth': 4}),
+    ('+ depth 3', {'max_depth': 3}),
+    ('+ 0.015, 10 bits', {'min_contribution': 0.015, 'quantize_bits': 10}),
+]
+
+# Per-node arrays of a tree in XGBoost's JSON model format
+NODE_ARRAYS = ['base_weights', 'default_left', 'left_children', 'loss_changes', 'parents', 'right_children',
+               'split_conditions', 'split_indices', 'split_type', 'sum_hessian']
+
+
+def _internal_nodes(tree):
+    return [node for node, child in enumerate(tree['left_children']) if child != -1]
+
+
+def _leaf_weights(tree):
+    # Leaf values and the training cover (sum of hessians) that reached each leaf
+    leaves = [node for node, child in enumerate(tree['left_children']) if child == -1]
+    values = np.array([tree['split_conditions'][node] for node in leaves])
+    cover = np.array([tree['sum_hessian'][node] for node in leaves])
+    return values, cover / cover.sum()
+
+
+def tree_contribution(tree):
+    """
+    Mean absolute output of a tree over the training data.
+
+    Args:
+        tree (dict): Tree in XGBoost's JSON model format
+
+    Returns:
+        float: Cover-weighted mean absolute leaf value (in log-odds)
+    """
+    values, weights = _leaf_weights(tree)
+    return float(np.sum(np.abs(values) * weights))
+
+
+def subtree_means(tree):
+    """
+    Cover-weighted mean of the leaf values below each node.
+
+    Args:
+        tree (dict): Tree in XGBoost's JSON model format
+
+    Returns:
+        list of float: Mean leaf value (in log-odds) reached from each node
+    """
+    left, right = tree['left_children'], tree['right_children']
+    cover = tree['sum_hessian']
+    means = list(tree['split_conditions'])
+    # Children come after their parent in breadth-first order, so walk it backwards
+    order, queue = [], deque([0])
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        if left[node] != -1:
+            queue.extend((left[node], right[node]))
+    for node in reversed(order):
+        if left[node] != -1:
+            total = cover[left[node]] + cover[right[node]]
+            means[node] = (means[left[node]] * cover[left[node]] + means[right[node]] * cover[right[node]]) / total
+    return means
+
+
+def limit_depth(tree, max_depth):
+    """
+    Collapse every subtree rooted at max_depth into one leaf.
+
+    The new leaf takes the cover-weighted mean of the leaves it replaces.
+    The node's base weight would not do: XGBoost stores it before the
+    learning rate is applied, while leaf values already include it.
+
+    Args:
+        tree (dict): Tree in XGBoost's JSON model format
+        max_depth (int): Depth at which nodes become leaves (the root is depth 0), so the
+            deepest splits kept are at max_depth - 1
+
+    Returns:
+        dict: The truncated tree, with nodes renumbered breadth-first
+    """
+    means = subtree_means(tree)
+    arrays = {name: [] for name in NODE_ARRAYS}
+    queue = deque([(0, 0, ROOT_PARENT)])
+    next_id = 1
+    while queue:
+        old, depth, parent = queue.popleft()
+        new = len(arrays['parents'])
+        is_leaf = tree['left_children'][old] == -1 or depth >= max_depth
+
+        for name in NODE_ARRAYS:
+            arrays[name].append(tree[name][old])
+        arrays['parents'][new] = parent
+        if is_leaf:
+            arrays['left_children'][new] = arrays['right_children'][new] = -1
+            arrays['split_conditions'][new] = means[old]
+            arrays['split_indices'][new] = 0
+            arrays['default_left'][new] = 0
+            arrays['loss_changes'][new] = 0.0
+        else:
+            arrays['left_children'][new], arrays['right_children'][new] = next_id, next_id + 1
+            queue.append((tree['left_children'][old], depth + 1, new))
+            queue.append((tree['right_children'][old], depth + 1, new))
+            next_id += 2
+
+    truncated = {**tree, **arrays}
+    truncated['tree_param'] = {**tree['tree_param'], 'num_nodes': str(len(arrays['parents'])), 'num_deleted': '0'}
+    return truncated
+
+
+def drop_trees(model, min_contribution):
+    """
+    Drop the trees whose contribution is below min_contribution.
+
+    The cover-weighted mean output of the dropped trees is added to the
+    base score, so the average margin stays the same.
+
+    Args:
+        model (dict): XGBoost JSON model (binary:logistic)
+        min_contribution (float): Smallest tree contribution kept, in log-odds
+
+    Returns:
+        int: Number of trees dropped
+    """
+    learner = model['learner']
+    if learner['objective']['name'] != 'binary:logistic':
+        raise ValueError('Dropping trees is only supported for binary:logistic models')
+
+    booster = learner['gradient_booster']['model']
+    contributions = [tree_contribution(tree) for tree in booster['trees']]
+    # Always keep at least the strongest tree
+    threshold = min(min_contribution, max(contributions))
+    kept, shift = [], 0.0
+    for tree, contribution in zip(booster['trees'], contributions):
+        if contribution >= threshold:
+            kept.append(tree)
+        else:
+            values, weights = _leaf_weights(tree)
+            shift += float(np.sum(values * weights))
+
+    for i, tree in enumerate(kept):
+        tree['id'] = i
+    dropped = len(booster['trees']) - len(kept)
+    booster['trees'] = kept
+    booster['tree_info'] = [0] * len(kept)
+    booster['iteration_indptr'] = list(range(len(kept) + 1))
+    booster['gbtree_model_param']['num_trees'] = str(len(kept))
+
+    # base_score is a probability; move it by the dropped trees' mean margin
+    base_score = float(learner['learner_model_param']['base_score'])
+    margin = math.log(base_score / (1 - base_score)) + shift
+    # XGBoost parses it as a float32 and silently falls back to 0.5 on longer strings
+    learner['learner_model_param']['base_score'] = str(np.float32(1 / (1 + math.exp(-margin))))
+    return dropped
+
+
+def _quantize(values, bits, rounding):
+    mantissa, exponent = np.frexp(np.asarray(values, dtype=np.float64))
+    return np.ldexp(rounding(mantissa * 2 ** bits) / 2 ** bits, exponent)
+
+
+def quantize_tree(tree, bits, n_numeric):
+    """
+    Round a tree's numbers to a number of mantissa bits.
+
+    Numeric thresholds are rounded down, everything else (leaf values, node
+    weights, gains and covers) to the nearest value. One-hot thresholds are
+    left alone: only which side of them 1 falls on matters.
+
+    Args:
+        tree (dict): Tree in XGBoost's JSON model format, modified in place
+        bits (int): Mantissa bits kept
+        n_numeric (int): Number of numeric features, which come first in the encoding
+    """
+    conditions = np.asarray(tree['split_conditions'], dtype=np.float64)
+    is_leaf = np.asarray(tree['left_children']) == -1
+    numeric_split = ~is_leaf & (np.asarray(tree['split_indices']) < n_numeric)
+
+    conditions[numeric_split] = _quantize(conditions[numeric_split], bits, np.floor)
+    conditions[is_leaf] = _quantize(conditions[is_leaf], bits, np.round)
+    tree['split_conditions'] = conditions.tolist()
+    for name in ('base_weights', 'loss_changes', 'sum_hessian'):
+        tree[name] = _quantize(tree[name], bits, np.round).tolist()
+
+
+def prune_categories(model, encoder, n_numeric):
+    """
+    Remove the one-hot categories no tree splits on and renumber the features.
+
+    Every column keeps at least one category, so the inputs stay the same.
+
+    Args:
+        model (dict): XGBoost JSON model, modified in place
+        encoder (sklearn.preprocessing.OneHotEncoder): Fitted encoder
+        n_numeric (int): Number of numeric features, which come first in the encoding
+
+    Returns:
+        list: Categories kept per categorical column
+    """
+    trees = model['learner']['gradient_booster']['model']['trees']
+    used = {tree['split_indices'][node] for tree in trees for node in _internal_nodes(tree)}
+
+    index_map = {i: i for i in range(n_numeric)}
+    categories = []
+    old, new = n_numeric, n_numeric
+    for values in encoder.categories_:
+        kept = [i for i in range(len(values)) if old + i in used] or [0]
+        for i in kept:
+            index_map[old + i] = new
+            new += 1
+        categories.append([values[i] for i in kept])
+        old += len(values)
+
+    for tree in trees:
+        for node in _internal_nodes(tree):
+            tree['split_indices'][node] = index_map[tree['split_indices'][node]]
+        tree['tree_param']['num_feature'] = str(new)
+    model['learner']['learner_model_param']['num_feature'] = str(new)
+    return categories
+
+
+def compress_pipeline(pipeline, max_depth=None, min_contribution=0.0, quantize_bits=None):
+    """
+    Compress a fitted preprocessor + XGBClassifier pipeline.
+
+    Args:
+        pipeline (sklearn.pipeline.Pipeline): Pipeline from train_model.py
+        max_depth (int): Turn nodes at this depth into leaves (None keeps every split)
+        min_contribution (float): Drop trees contributing less than this (0 keeps every tree)
+        quantize_bits (int): Mantissa bits kept in thresholds and leaf values (None keeps all)
+
+    Returns:
+        sklearn.pipeline.Pipeline: The compressed pipeline
+    """
+    import xgboost as xgb
+    from sklearn.pipeline import Pipeline
+
+    preprocessor = pipeline.named_steps['preprocessor']
+    classifier = pipeline.named_steps['classifier']
+    transformers = {name: (transformer, columns) for name, transformer, columns in preprocessor.transformers_}
+    scaler, numeric_columns = transformers['num']
+    encoder, categorical_columns = transformers['cat']
+    n_numeric = len(numeric_columns)
+
+    # Only the rounds the model predicts with (early stopping) are kept
+    start, end = classifier._get_iteration_range(None)
+    booster = classifier.get_booster()
+    if (start, end) != (0, 0):
+        booster = booster[start:end]
+    model = json.loads(booster.save_raw('json'))
+    trees = model['learner']['gradient_booster']['model']['trees']
+
+    if max_depth is not None:
+        trees[:] = [limit_depth(tree, max_depth) for tree in trees]
+    if min_contribution > 0:
+        drop_trees(model, min_contribution)
+        trees = model['learner']['gradient_booster']['model']['trees']
+    if quantize_bits is not None:
+        for tree in trees:
+            quantize_tree(tree, quantize_bits, n_numeric)
+    categories = prune_categories(model, encoder, n_numeric)
+
+    attributes = model['learner']['attributes']
+    if 'best_iteration' in attributes:
+        attributes['best_iteration'] = str(len(trees) - 1)
+    compressed_booster = xgb.Booster()
+    compressed_booster.load_model(bytearray(json.dumps(model).encode('utf-8')))
+
+    compressed_classifier = copy.copy(classifier)
+    compressed_classifier._Booster = compressed_booster
+    compressed_preprocessor = assemble_preprocessor(
+        copy.deepcopy(scaler), numeric_columns, categorical_columns, categories, preprocessor.sparse_output_
+    )
+    return Pipeline(steps=[('preprocessor', compressed_preprocessor), ('classifier', compressed_classifier)])
+
+
+def evaluate(pipeline, feature_columns_path, rows, reference=None, test=None, repeats=20):
+    """
+    Measure a pipeline's artifact size, load time, latency and accuracy.
+
+    Args:
+        pipeline (sklearn.pipeline.Pipeline): Pipeline to measure
+        feature_columns_path (str): Feature columns pickle
+        rows (list of dict): Synthetic input rows
+        reference (numpy.ndarray): Probabilities of the uncompressed model on rows
+        test (tuple): (X_test, y_test) from the split store, for the AUC
+        repeats (int): Timing repetitions
+
+    Returns:
+        tuple: (report row, probabilities on rows)
+    """
+    data = pickle.dumps(pipeline)
+    booster = pipeline.named_steps['classifier'].get_booster()
+    trees = json.loads(booster.save_raw('json'))['learner']['gradient_booster']['model']['trees']
+    result = {
+        'size_kb': round(len(data) / 1024, 1),
+        'gzip_kb': round(len(gzip.compress(data)) / 1024, 1),
+        'load_ms': timed(lambda: pickle.loads(data), 5)['median_ms'],
+        'n_trees': len(trees),
+        'n_nodes': sum(len(tree['left_children']) for tree in trees),
+        'n_features': booster.num_features(),
+    }
+
+    # Score through DistractionPredictor, like the services do
+    with tempfile.TemporaryDirectory() as directory:
+        model_path = os.path.join(directory, 'model.pkl')
+        with open(model_path, 'wb') as f:
+            f.write(data)
+        predictor = DistractionPredictor(model_path, os.path.abspath(feature_columns_path))
+        compiled = DistractionPredictor(model_path, os.path.abspath(feature_columns_path), compiled=True)
+
+    result['predict_ms'] = timed(lambda: predictor.predict(rows[0]), repeats)['median_ms']
+    result['compiled_predict_us'] = round(timed(lambda: compiled.predict(rows[0]), repeats)['median_ms'] * 1000, 1)
+    matrix = compiled.compiled_model.transform(compiled._engineer_rows(rows))
+    batch_ms = timed(lambda: compiled.compiled_model.predict_encoded(matrix), repeats)['median_ms']
+    result['batch_us_per_row'] = round(batch_ms * 1000 / len(rows), 3)
+
+    probabilities = pipeline.predict_proba(predictor.prepare_input(rows))[:, 1]
+    if reference is not None:
+        result['mean_probability_change'] = round(float(np.mean(np.abs(probabilities - reference))), 5)
+        result['max_probability_change'] = round(float(np.max(np.abs(probabilities - reference))), 5)
+    if test is not None:
+        from sklearn.metrics import roc_auc_score
+
+        X_test, y_test = test
+        result['test_auc'] = round(float(roc_auc_score(y_test, pipeline.predict_proba(X_test)[:, 1])), 5)
+    return result, probabilities
+
+
+def load_test_split(store_dir, pipeline):
+    # The AUC needs a split store with the columns the pipeline was trained on
+    from split_store import load_split
+
+    try:
+        X_test, y_test = load_split(store_dir, 'test', mmap_mode=None)
+    except OSError:
+        return None
+    preprocessor = pipeline.named_steps['preprocessor']
+    columns = [col for _, _, cols in preprocessor.transformers_ if isinstance(cols, list) for col in cols]
+    if not set(columns) <= set(X_test.columns):
+        return None
+    return X_test, y_test
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='distraction_model.pkl')
+    parser.add_argument('--feature-columns', default='feature_columns.pkl')
+    parser.add_argument('--store', default='data_splits', help='Split store with the test split for the AUC')
+    parser.add_argument('--max-depth', type=int, help='Turn nodes at this depth into leaves (the root is depth 0)')
+    parser.add_argument('--min-contribution', type=float, default=0.0,
+                        help='Drop trees with a smaller mean absolute output (log-odds)')
+    parser.add_argument('--quantize-bits', type=int, help='Mantissa bits kept in thresholds and leaf values')
+    parser.add_argument('--sweep', action='store_true', help='Evaluate the presets instead of writing a model')
+    parser.add_argument('--output', default='distraction_model_compressed.pkl')
+    parser.add_argument('--report', default='compression_report.json')
+    args = parser.parse_args()
+
+    with open(args.model, 'rb') as f:
+        pipeline = pickle.load(f)
+    with open(args.feature_columns, 'rb') as f:
+        feature_columns = pickle.load(f)
+
+    rows = make_rows(pipeline, feature_columns, 1000)
+    test = load_test_split(args.store, pipeline)
+    if test is None:
+        print(f"No matching test split in '{args.store}': skipping the AUC")
+
+    original, reference = evaluate(pipeline, args.feature_columns, rows, test=test)
+
+    if args.sweep:
+        presets = SWEEP
+    else:
+        presets = [('compressed', {
+            'max_depth': args.max_depth, 'min_contribution': args.min_contribution, 'quantize_bits': args.quantize_bits
+        })]
+
+    report = [{'name': 'original', **original}]
+    for name, options in presets:
+        compressed = compress_pipeline(pipeline, **options)
+        result, _ = evaluate(compressed, args.feature_columns, rows, reference, test)
+        report.append({'name': name, 'options': options, **result})
+
+    columns = ['size_kb', 'gzip_kb', 'load_ms', 'n_trees', 'n_nodes', 'n_features', 'predict_ms',
+               'compiled_predict_us', 'batch_us_per_row', 'test_auc', 'mean_probability_change', 'max_probability_change']
+    print(f"{'':<28}" + ''.join(f"{column:>14}" for column in columns))
+    for row in report:
+        print(f"{row['name']:<28}" + ''.join(f"{str(row.get(column, '')):>14}" for column in columns))
+
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    if not args.sweep:
+        with open(args.output, 'wb') as f:
+            pickle.dump(compressed, f)
+        print(f"\nCompressed model saved to '{args.output}' (use it with the same {args.feature_columns})")
+    print(f"Report written to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
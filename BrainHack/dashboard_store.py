@@ -0,0 +1,279 @@
+"""
+Incremental aggregates behind the productivity dashboard.
+
+The dashboard (PRODUCTIVITY_TRACKING_README.md) shows four metrics per user:
+
+- distractionRiskLevel: share of the focus sessions of the last 24 hours
+  that were interrupted
+- dailyStatistics: focus hours and breaks taken today
+- weeklyStatistics: productive days (at least 4 focus hours) among the last
+  7 days, and the average daily focus time over them
+- productivityScore: focus time over the last 7 days against a target of
+  4 hours a day, from 0 to 100
+
+Computing them used to mean reading every focusSessions and breaks document
+of the user on each page load. Instead, each user has one rollup document,
+updated as focus_session and break events arrive (see event_log.py):
+
+- hours: a ring of 24 hourly buckets of [hour, sessions, interrupted
+  sessions], by the hour the session ended
+- days: a ring of 7 daily buckets of [day, focus seconds, breaks]; a session
+  crossing midnight is split between the two days
+
+A slot is reset when a newer bucket reaches it, and events older than the
+slot's bucket are dropped, so a document has a fixed size and a read sums 31
+buckets at most, however long the user's history is. The 24-hour window is
+exact to the hour. Days are UTC days, as everywhere else in the app.
+
+The documents live in SQLite, a local stand-in for the Firestore collection
+they would be in: one row per user, written in one transaction per batch of
+events. The transaction also records the EventLog sequence number of the
+batch, so after a crash the store catches up from the log.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from event_log import event_time
+
+HOUR_SECONDS = 60 * 60
+DAY_SECONDS = 24 * HOUR_SECONDS
+HOURS_KEPT = 24
+DAYS_KEPT = 7
+PRODUCTIVE_DAY_HOURS = 4
+
+# SQLite's default limit on bound parameters in one statement is 999
+_MAX_PARAMETERS = 900
+
+
+def _ring_add(ring, bucket, values):
+    # Add values to the ring slot of an absolute bucket number
+    slot = bucket % len(ring)
+    held = ring[slot]
+    if held is None or held[0] < bucket:
+        held = ring[slot] = [bucket] + [0] * len(values)
+    elif held[0] > bucket:
+        # Older than the window ending at the newest bucket seen in this slot
+        return
+    for i, value in enumerate(values, 1):
+        held[i] += value
+
+
+def _ring_window(ring, bucket):
+    # The slots holding one of the len(ring) buckets up to and including `bucket`
+    return [held for held in ring if held is not None and bucket - len(ring) < held[0] <= bucket]
+
+
+def _split_by_day(start, end, seconds):
+    # Share a session's focus seconds between the days its start..end interval covers
+    first, last = int(start // DAY_SECONDS), int(end // DAY_SECONDS)
+    if first == last:
+        return [(last, seconds)]
+    return [
+        (day, seconds * (min(end, (day + 1) * DAY_SECONDS) - max(start, day * DAY_SECONDS)) / (end - start))
+        for day in range(max(first, last - DAYS_KEPT + 1), last + 1)
+    ]
+
+
+class DashboardRollup:
+    """
+    Rollup document of one user.
+    """
+
+    __slots__ = ('hours', 'days')
+
+    def __init__(self, hours=None, days=None):
+        """
+        Args:
+            hours (list): Hourly ring of [hour, sessions, interrupted] or None per slot
+            days (list): Daily ring of [day, focus seconds, breaks] or None per slot
+        """
+        self.hours = hours or [None] * HOURS_KEPT
+        self.days = days or [None] * DAYS_KEPT
+
+    def record(self, event):
+        """
+        Apply one event.
+
+        Args:
+            event (dict): Normalized event from parse_event (types other than focus_session and break are ignored)
+        """
+        if event['type'] == 'focus_session':
+            _ring_add(self.hours, int(event['t'] // HOUR_SECONDS), (1, int(event['interrupted'])))
+            for day, seconds in _split_by_day(event['start'], event['t'], event['duration']):
+                _ring_add(self.days, day, (seconds, 0))
+        elif event['type'] == 'break':
+            _ring_add(self.days, int(event['t'] // DAY_SECONDS), (0, 1))
+
+    def metrics(self, t):
+        """
+        Compute the dashboard metrics at time t.
+
+        Args:
+            t (float): Time in seconds
+
+        Returns:
+            dict: The four metrics, shaped like the dashboard's DashboardData
+        """
+        sessions = interrupted = 0
+        for _, hour_sessions, hour_interrupted in _ring_window(self.hours, int(t // HOUR_SECONDS)):
+            sessions += hour_sessions
+            interrupted += hour_interrupted
+
+        today = int(t // DAY_SECONDS)
+        focus_today = breaks_today = week_seconds = productive_days = 0
+        for day, focus_seconds, breaks in _ring_window(self.days, today):
+            week_seconds += focus_seconds
+            if focus_seconds >= PRODUCTIVE_DAY_HOURS * HOUR_SECONDS:
+                productive_days += 1
+            if day == today:
+                focus_today, breaks_today = focus_seconds, breaks
+
+        return {
+            'distractionRiskLevel': {
+                'percentage': round(100 * interrupted / sessions) if sessions else 0,
+                'interruptedSessions': interrupted,
+                'totalSessions': sessions,
+            },
+            'dailyStatistics': {
+                'focusTimeHours': round(focus_today / HOUR_SECONDS, 1),
+                'breaksTaken': breaks_today,
+            },
+            'weeklyStatistics': {
+                'productiveDays': productive_days,
+                'averageFocusTimeHours': round(week_seconds / DAYS_KEPT / HOUR_SECONDS, 1),
+            },
+            'productivityScore': min(
+                100, round(100 * week_seconds / (DAYS_KEPT * PRODUCTIVE_DAY_HOURS * HOUR_SECONDS))
+            ),
+        }
+
+    def to_json(self):
+        return json.dumps({'hours': self.hours, 'days': self.days}, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, document):
+        state = json.loads(document)
+        return cls(state['hours'], state['days'])
+
+
+class DashboardStore:
+    """
+    Rollup documents of every user, kept in a SQLite file.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): SQLite file (created if needed)
+        """
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self.events = 0
+        self.last_write = None
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'last_seq'").fetchone()
+        # Sequence number of the last EventLog event applied
+        self.last_seq = int(row[0]) if row else 0
+
+    def _connection(self):
+        # One connection per thread (and process): WAL lets readers run while a batch is written
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # Commits are not synced in WAL mode; a lost commit is replayed from the EventLog
+            connection.execute('PRAGMA synchronous=NORMAL')
+            with connection:
+                connection.execute('CREATE TABLE IF NOT EXISTS rollups (user_id TEXT PRIMARY KEY, document TEXT NOT NULL)')
+                connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)')
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def apply(self, events, last_seq=None):
+        """
+        Update the rollups of the users in a batch of events, e.g. as an EventLog subscriber.
+
+        Args:
+            events (list of dict): Events from parse_event (only focus_session and break are used)
+            last_seq (int): EventLog sequence number of the last event, stored with the rollups
+
+        Returns:
+            int: Number of events applied to a rollup
+        """
+        by_user = {}
+        for event in events:
+            if event['type'] in ('focus_session', 'break'):
+                by_user.setdefault(event['user_id'], []).append(event)
+        if not by_user and last_seq is None:
+            return 0
+
+        with self._write_lock:
+            connection = self._connection()
+            with connection:
+                rollups = self._read(connection, list(by_user))
+                for user_id, user_events in by_user.items():
+                    rollup = rollups.get(user_id)
+                    if rollup is None:
+                        rollup = rollups[user_id] = DashboardRollup()
+                    for event in user_events:
+                        rollup.record(event)
+                connection.executemany(
+                    'INSERT OR REPLACE INTO rollups VALUES (?, ?)',
+                    [(user_id, rollup.to_json()) for user_id, rollup in rollups.items()],
+                )
+                if last_seq is not None:
+                    connection.execute("INSERT OR REPLACE INTO meta VALUES ('last_seq', ?)", (last_seq,))
+            if last_seq is not None:
+                self.last_seq = last_seq
+            applied = sum(len(user_events) for user_events in by_user.values())
+            self.events += applied
+            self.last_write = time.time()
+        return applied
+
+    @staticmethod
+    def _read(connection, user_ids):
+        rollups = {}
+        for start in range(0, len(user_ids), _MAX_PARAMETERS):
+            chunk = user_ids[start:start + _MAX_PARAMETERS]
+            rows = connection.execute(
+                f"SELECT user_id, document FROM rollups WHERE user_id IN ({','.join('?' * len(chunk))})", chunk
+            )
+            rollups.update((user_id, DashboardRollup.from_json(document)) for user_id, document in rows)
+        return rollups
+
+    def metrics(self, user_id, timestamp=None):
+        """
+        Get a user's dashboard metrics: one document read.
+
+        Args:
+            user_id (str): User id
+            timestamp (str or float): Time the windows end at (default: now)
+
+        Returns:
+            dict: The dashboard metrics (all zero for users without sessions or breaks)
+        """
+        t = event_time(timestamp)
+        row = self._connection().execute(
+            'SELECT document FROM rollups WHERE user_id = ?', (str(user_id),)
+        ).fetchone()
+        rollup = DashboardRollup.from_json(row[0]) if row else DashboardRollup()
+        return rollup.metrics(t)
+
+    def stats(self):
+        """
+        Get the store counters.
+
+        Returns:
+            dict: Users with a rollup, events applied, last EventLog sequence number applied
+                and the time of the last write
+        """
+        users = self._connection().execute('SELECT COUNT(*) FROM rollups').fetchone()[0]
+        return {
+            'users': users,
+            'events': self.events,
+            'last_seq': self.last_seq,
+            'last_write': self.last_write,
+        }
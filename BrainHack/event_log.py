@@ -0,0 +1,388 @@
+"""
+Write-ahead log for user events posted to /events.
+
+Events are validated and normalized in the request thread (parse_event),
+then handed to a single writer thread. The writer takes everything queued
+since its last write and commits it with one write and one fsync (group
+commit): concurrent requests share the cost of the fsync. Committed events
+are then passed, in log order, to the subscribers that aggregate them (the
+feature store, the dashboard aggregates), and each request returns once its
+events are durable and applied.
+
+The queue is bounded by max_pending events; appends that would exceed it
+fail with EventLogFull, which the HTTP layer turns into a 429, so a writer
+that falls behind pushes back on clients instead of growing memory.
+
+Layout, under the log directory:
+
+- <first seq>.ndjson   segments of one normalized event per line; an event's
+                       sequence number is the segment's first seq plus its line
+- LOCK                 held by the one process writing the log
+
+A torn last line from a crash is truncated when the log is opened again.
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from features import TIMESTAMP_FORMAT
+
+EVENT_TYPES = (
+    'notification', 'unlock', 'screen_on', 'screen_off', 'session_start', 'session_stop',
+    'focus_session', 'break',
+)
+
+SEGMENT_SUFFIX = '.ndjson'
+LOCK_FILE = 'LOCK'
+
+# fdatasync skips the metadata flush where it exists
+_sync = getattr(os, 'fdatasync', os.fsync)
+
+
+class EventLogFull(RuntimeError):
+    """
+    Raised when an append would exceed the log's pending-event limit.
+    """
+
+
+def event_time(timestamp):
+    """
+    Convert an event or request timestamp to seconds.
+
+    Args:
+        timestamp (str, float or None): '%Y-%m-%d %H:%M:%S' wall-clock time, seconds since
+            the epoch, or None for now
+
+    Returns:
+        float: Seconds; wall-clock times are counted as if they were UTC, so days
+            start at the user's local midnight
+    """
+    if timestamp is None or timestamp == '':
+        return time.time()
+    if isinstance(timestamp, str):
+        try:
+            return datetime.strptime(timestamp, TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+        except ValueError:
+            return float(timestamp)
+    return float(timestamp)
+
+
+def _seconds(event, name, default=None):
+    value = event.get(name, default)
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a number of seconds, not {value!r}')
+    if not seconds >= 0:
+        raise ValueError(f'{name} must not be negative')
+    return seconds
+
+
+def parse_event(event):
+    """
+    Validate and normalize a raw event.
+
+    Every event has 'user_id', 'type' and an optional 'timestamp' (default:
+    now). A focus_session, as stored by the productivity dashboard, has
+    'start_time', 'end_time' (its timestamp), an optional 'duration' in
+    seconds (default: end - start) and 'interrupted'; a break has a
+    'duration' in seconds.
+
+    Args:
+        event (dict): Raw event
+
+    Returns:
+        dict: Normalized event: 'user_id', 'type', 't' (seconds) and the type's fields
+    """
+    if not isinstance(event, dict):
+        raise ValueError('Expected an event object')
+    user_id = event.get('user_id')
+    if user_id is None or user_id == '':
+        raise ValueError('Events need a user_id')
+    event_type = event.get('type')
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Unknown event type {event_type!r}, expected one of {', '.join(EVENT_TYPES)}")
+
+    time_field = 'end_time' if event_type == 'focus_session' else 'timestamp'
+    try:
+        t = event_time(event.get(time_field))
+        start = event_time(event['start_time']) if event_type == 'focus_session' else None
+    except KeyError:
+        raise ValueError('A focus_session needs a start_time')
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid {time_field} or start_time in {event!r}')
+
+    parsed = {'user_id': str(user_id), 'type': event_type, 't': t}
+    if event_type == 'focus_session':
+        if start > t:
+            raise ValueError('A focus_session cannot end before it starts')
+        parsed['start'] = start
+        parsed['duration'] = _seconds(event, 'duration', t - start)
+        parsed['interrupted'] = bool(event.get('interrupted', False))
+    elif event_type == 'break':
+        parsed['duration'] = _seconds(event, 'duration')
+    return parsed
+
+
+class _Batch:
+    # One append: its serialized lines and the commit the caller waits for
+    __slots__ = ('events', 'data', 'committed', 'last_seq', 'error')
+
+    def __init__(self, events, data):
+        self.events = events
+        self.data = data
+        self.committed = threading.Event()
+        self.last_seq = None
+        self.error = None
+
+
+class EventLog:
+    """
+    Segmented NDJSON write-ahead log with group commit and a bounded queue.
+    """
+
+    def __init__(self, log_dir, max_pending=100000, segment_bytes=64 << 20, fsync=True, commit_timeout=10.0):
+        """
+        Args:
+            log_dir (str): Directory of the log segments (created if needed)
+            max_pending (int): Events that may wait for the writer before appends fail with EventLogFull
+            segment_bytes (int): Size after which a new segment is started
+            fsync (bool): Sync every group commit to disk (False leaves it to the OS page cache)
+            commit_timeout (float): Seconds append waits for its commit
+        """
+        self.log_dir = log_dir
+        self.max_pending = max_pending
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.commit_timeout = commit_timeout
+        self.subscribers = []
+        self.last_seq = 0
+        self.commits = 0
+        self.rejected = 0
+        self._queue = []
+        self._pending = 0
+        self._closing = False
+        self._writer = None
+        self._condition = threading.Condition()
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._lock_fd = None
+        self._segment_size = 0
+
+    def subscribe(self, subscriber, position=None):
+        """
+        Register a callable receiving (events, last_seq) for every committed group, in log order.
+
+        Args:
+            subscriber (callable): Called on the writer thread; a slow subscriber slows the writer
+            position (callable): Returns the last sequence number the subscriber has applied;
+                start() first replays the events committed after it
+        """
+        self.subscribers.append((subscriber, position))
+
+    def segments(self):
+        """
+        List the log segments.
+
+        Returns:
+            list: (first seq, path) per segment, in log order
+        """
+        if not os.path.isdir(self.log_dir):
+            return []
+        return sorted(
+            (int(name[:-len(SEGMENT_SUFFIX)]), os.path.join(self.log_dir, name))
+            for name in os.listdir(self.log_dir) if name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def start(self):
+        """
+        Open the log for writing in this process and start the writer thread (idempotent per process).
+
+        Subscribers registered with a position catch up on the events they
+        missed first. Only one process can write a log; others fail here with
+        a RuntimeError.
+        """
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            os.makedirs(self.log_dir, exist_ok=True)
+            lock_fd = os.open(os.path.join(self.log_dir, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(lock_fd)
+                raise RuntimeError(f'Another process is writing the event log in {self.log_dir}')
+            self._lock_fd = lock_fd
+
+            segments = self.segments()
+            if segments:
+                first_seq, path = segments[-1]
+                self.last_seq = first_seq - 1 + self._recover_segment(path)
+                self._open_segment(path)
+            else:
+                self.last_seq = 0
+                self._open_segment(self._segment_path(1))
+            for subscriber, position in self.subscribers:
+                if position is not None:
+                    for events, last_seq in self.replay(position()):
+                        subscriber(events, last_seq)
+            self._pid = os.getpid()
+            self._closing = False
+            self._writer = threading.Thread(target=self._write_loop, name='event-log-writer', daemon=True)
+            self._writer.start()
+
+    def close(self):
+        """
+        Commit what is queued, stop the writer and release the log for another process.
+        """
+        with self._start_lock:
+            if self._pid != os.getpid():
+                return
+            with self._condition:
+                self._closing = True
+                self._condition.notify()
+            self._writer.join()
+            os.close(self._fd)
+            os.close(self._lock_fd)
+            self._fd = self._lock_fd = self._pid = None
+
+    def _segment_path(self, first_seq):
+        return os.path.join(self.log_dir, f'{first_seq:016d}{SEGMENT_SUFFIX}')
+
+    def _recover_segment(self, path):
+        # Count the complete lines and cut off a torn last line
+        with open(path, 'rb+') as f:
+            data = f.read()
+            complete = data.rfind(b'\n') + 1
+            if complete < len(data):
+                f.truncate(complete)
+        return data.count(b'\n', 0, complete)
+
+    def _open_segment(self, path):
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._segment_size = os.fstat(self._fd).st_size
+
+    def append(self, events):
+        """
+        Append normalized events and wait until they are committed.
+
+        Args:
+            events (list of dict): Events from parse_event
+
+        Returns:
+            int: Sequence number of the last event appended
+        """
+        if not events:
+            return self.last_seq
+        # Serialize in the caller's thread so the writer only writes
+        data = ''.join(json.dumps(event, separators=(',', ':')) + '\n' for event in events).encode('utf-8')
+        batch = _Batch(events, data)
+        with self._condition:
+            if self._pending + len(events) > self.max_pending:
+                self.rejected += len(events)
+                raise EventLogFull(f'{self._pending} events are waiting for the writer')
+            self._queue.append(batch)
+            self._pending += len(events)
+            self._condition.notify()
+
+        if not batch.committed.wait(self.commit_timeout):
+            raise TimeoutError(f'Events not committed within {self.commit_timeout} s')
+        if batch.error is not None:
+            raise batch.error
+        return batch.last_seq
+
+    def _write_loop(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closing:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                batches, self._queue = self._queue, []
+
+            events = [event for batch in batches for event in batch.events]
+            try:
+                if self._segment_size >= self.segment_bytes:
+                    self._open_segment(self._segment_path(self.last_seq + 1))
+                data = b''.join(batch.data for batch in batches)
+                os.write(self._fd, data)
+                if self.fsync:
+                    _sync(self._fd)
+                self._segment_size += len(data)
+            except OSError as e:
+                for batch in batches:
+                    batch.error = e
+            else:
+                for batch in batches:
+                    self.last_seq += len(batch.events)
+                    batch.last_seq = self.last_seq
+                self.commits += 1
+
+            # Subscribers see the events before the appends return, so a client reads its own writes
+            if batches[0].error is None:
+                self._publish(events, self.last_seq)
+            with self._condition:
+                self._pending -= len(events)
+            for batch in batches:
+                batch.committed.set()
+
+    def _publish(self, events, last_seq):
+        for subscriber, _ in self.subscribers:
+            try:
+                subscriber(events, last_seq)
+            except Exception as e:
+                print(f"Event subscriber {subscriber!r} failed: {e}")
+
+    def replay(self, after_seq=0, batch_size=10000):
+        """
+        Read the committed events after a sequence number.
+
+        Args:
+            after_seq (int): Last sequence number already applied by the reader
+            batch_size (int): Events per yielded batch
+
+        Yields:
+            tuple: (events, last seq of the batch)
+        """
+        segments = self.segments()
+        for i, (first_seq, path) in enumerate(segments):
+            # Skip segments that end before after_seq
+            if i + 1 < len(segments) and segments[i + 1][0] <= after_seq + 1:
+                continue
+            seq, batch = first_seq - 1, []
+            with open(path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    seq += 1
+                    if seq <= after_seq:
+                        continue
+                    batch.append(json.loads(line))
+                    if len(batch) >= batch_size:
+                        yield batch, seq
+                        batch = []
+            if batch:
+                yield batch, seq
+
+    def stats(self):
+        """
+        Get the log counters.
+
+        Returns:
+            dict: Last sequence number, group commits, events waiting and events rejected
+        """
+        with self._condition:
+            return {
+                'last_seq': self.last_seq,
+                'commits': self.commits,
+                'pending': self._pending,
+                'max_pending': self.max_pending,
+                'rejected': self.rejected,
+                'segments': len(self.segments()),
+            }
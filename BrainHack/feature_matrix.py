@@ -0,0 +1,240 @@
+"""
+Encoded feature matrices cached next to the split store.
+
+Fitting the ColumnTransformer and encoding train/val/test is done once per
+split store and preprocessor configuration. The encoded matrices are written
+as memory-mapped .npy arrays (data/indices/indptr for the sparse CSR output,
+or one dense array) and reused by training, validation and evaluation, and by
+later training runs on the same data, which then skip decoding the split
+store and re-encoding altogether.
+
+Layout, under <store_dir>/encoded/:
+
+- encoded.json                   cache key, shapes and whether the matrices are sparse
+- preprocessor.pkl               the fitted ColumnTransformer, for the final pipeline
+- <split>.data.npy, .indices.npy, .indptr.npy   CSR matrix (sparse output)
+- <split>.npy                    dense matrix (dense output)
+
+Targets are not copied; they are read from the split store's y.npy files.
+"""
+import hashlib
+import json
+import os
+import pickle
+
+import numpy as np
+import scipy.sparse as sp
+
+from split_store import SPLITS, load_split, read_store_manifest
+
+ENCODED_DIR = 'encoded'
+METADATA_FILE = 'encoded.json'
+PREPROCESSOR_FILE = 'preprocessor.pkl'
+
+
+def make_preprocessor(numeric_features, categorical_features):
+    """
+    Create the unfitted preprocessing step of the distraction pipeline.
+
+    Args:
+        numeric_features (list): Columns scaled with StandardScaler
+        categorical_features (list): Columns one-hot encoded
+
+    Returns:
+        sklearn.compose.ColumnTransformer: Unfitted preprocessor
+    """
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    return ColumnTransformer(
+        transformers=[
+            ('num', StandardScaler(), numeric_features),
+            ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features)
+        ])
+
+
+def assemble_preprocessor(scaler, numeric_features, categorical_features, categories, sparse):
+    """
+    Build a fitted preprocessor from a fitted scaler and explicit one-hot categories.
+
+    Used to edit a trained pipeline's encoding (retrain_model.py appends
+    categories, compress_model.py removes them) without refitting on data.
+
+    Args:
+        scaler (sklearn.preprocessing.StandardScaler): Fitted scaler for the numeric features
+        numeric_features (list): Columns scaled with the scaler
+        categorical_features (list): Columns one-hot encoded
+        categories (list): Categories per categorical column, in output order
+        sparse (bool): Emit a sparse matrix, like the pipeline being edited
+            (XGBoost treats zeros in sparse input as missing)
+
+    Returns:
+        sklearn.compose.ColumnTransformer: Fitted preprocessor
+    """
+    import pandas as pd
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    # The encoder only needs to see its categories; the scaler is replaced after fitting
+    n_rows = max([len(values) for values in categories] + [1])
+    frame = pd.DataFrame({col: np.zeros(n_rows) for col in numeric_features})
+    for col, values in zip(categorical_features, categories):
+        frame[col] = [values[i % len(values)] for i in range(n_rows)]
+
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', StandardScaler(), numeric_features),
+            ('cat', OneHotEncoder(categories=[list(values) for values in categories], handle_unknown='ignore'),
+             categorical_features)
+        ],
+        sparse_threshold=1.0 if sparse else 0.0)
+    preprocessor.fit(frame)
+    preprocessor.transformers_[0] = ('num', scaler, numeric_features)
+    return preprocessor
+
+
+def cache_key(manifest, preprocessor):
+    """
+    Build the cache key for a split store and an unfitted preprocessor.
+
+    Args:
+        manifest (dict): Split store manifest
+        preprocessor (sklearn.compose.ColumnTransformer): Unfitted preprocessor
+
+    Returns:
+        str: Hex digest that changes when the data, the preprocessor or sklearn changes
+    """
+    import sklearn
+
+    key = hashlib.sha256()
+    key.update(manifest['data_digest'].encode('utf-8'))
+    key.update(repr(preprocessor).encode('utf-8'))
+    key.update(repr(preprocessor.transformers).encode('utf-8'))
+    key.update(sklearn.__version__.encode('utf-8'))
+    return key.hexdigest()
+
+
+def _save_matrix(path, matrix):
+    if sp.issparse(matrix):
+        matrix = matrix.tocsr()
+        np.save(f'{path}.data.npy', matrix.data)
+        np.save(f'{path}.indices.npy', matrix.indices)
+        np.save(f'{path}.indptr.npy', matrix.indptr)
+    else:
+        np.save(f'{path}.npy', np.asarray(matrix))
+
+
+def _load_matrix(path, sparse, shape, mmap_mode):
+    if sparse:
+        data = np.load(f'{path}.data.npy', mmap_mode=mmap_mode)
+        indices = np.load(f'{path}.indices.npy', mmap_mode=mmap_mode)
+        indptr = np.load(f'{path}.indptr.npy', mmap_mode=mmap_mode)
+        return sp.csr_matrix((data, indices, indptr), shape=tuple(shape))
+    return np.load(f'{path}.npy', mmap_mode=mmap_mode)
+
+
+def _read_metadata(encoded_dir):
+    try:
+        with open(os.path.join(encoded_dir, METADATA_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def encode_splits(store_dir, preprocessor):
+    """
+    Fit the preprocessor on the training split and write the encoded matrices.
+
+    Args:
+        store_dir (str): Split store directory
+        preprocessor (sklearn.compose.ColumnTransformer): Unfitted preprocessor
+
+    Returns:
+        dict: The cache metadata
+    """
+    manifest = read_store_manifest(store_dir)
+    encoded_dir = os.path.join(store_dir, ENCODED_DIR)
+    os.makedirs(encoded_dir, exist_ok=True)
+
+    # Invalidate the old cache before overwriting its files
+    metadata_path = os.path.join(encoded_dir, METADATA_FILE)
+    if os.path.exists(metadata_path):
+        os.remove(metadata_path)
+
+    metadata = {'key': cache_key(manifest, preprocessor), 'shapes': {}}
+    preprocessor.fit(load_split(store_dir, 'train', manifest)[0])
+    for split in SPLITS:
+        # Encode one split at a time so only one decoded DataFrame is alive
+        matrix = preprocessor.transform(load_split(store_dir, split, manifest)[0])
+        _save_matrix(os.path.join(encoded_dir, split), matrix)
+        metadata['sparse'] = bool(sp.issparse(matrix))
+        metadata['shapes'][split] = list(matrix.shape)
+
+    with open(os.path.join(encoded_dir, PREPROCESSOR_FILE), 'wb') as f:
+        pickle.dump(preprocessor, f)
+    with open(metadata_path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+    return metadata
+
+
+def load_encoded_splits(store_dir, preprocessor, mmap_mode='r'):
+    """
+    Load the encoded train/val/test matrices, encoding them first if the cache is missing or stale.
+
+    Args:
+        store_dir (str): Split store directory
+        preprocessor (sklearn.compose.ColumnTransformer): Unfitted preprocessor
+        mmap_mode (str): numpy memory-map mode, or None to read the arrays into memory
+
+    Returns:
+        dict: X_train, y_train, X_val, y_val, X_test, y_test (encoded matrices and target arrays),
+            the fitted preprocessor, numeric_features, categorical_features and
+            'cached' (whether the matrices came from the cache)
+    """
+    manifest = read_store_manifest(store_dir)
+    encoded_dir = os.path.join(store_dir, ENCODED_DIR)
+
+    metadata = _read_metadata(encoded_dir)
+    cached = metadata is not None and metadata['key'] == cache_key(manifest, preprocessor)
+    if not cached:
+        encode_splits(store_dir, preprocessor)
+
+    splits = open_encoded_splits(store_dir, mmap_mode)
+    splits['cached'] = cached
+    return splits
+
+
+def open_encoded_splits(store_dir, mmap_mode='r'):
+    """
+    Open already encoded matrices without checking the cache key.
+
+    Used by worker processes once the parent has called load_encoded_splits:
+    with memory mapping, every process shares the same page-cache copy of the
+    matrices instead of receiving its own pickled copy.
+
+    Args:
+        store_dir (str): Split store directory
+        mmap_mode (str): numpy memory-map mode, or None to read the arrays into memory
+
+    Returns:
+        dict: X_train, y_train, X_val, y_val, X_test, y_test, the fitted preprocessor,
+            numeric_features and categorical_features
+    """
+    manifest = read_store_manifest(store_dir)
+    encoded_dir = os.path.join(store_dir, ENCODED_DIR)
+    metadata = _read_metadata(encoded_dir)
+    if metadata is None:
+        raise FileNotFoundError(f"No encoded matrices in {encoded_dir}, call load_encoded_splits first")
+
+    with open(os.path.join(encoded_dir, PREPROCESSOR_FILE), 'rb') as f:
+        splits = {
+            'preprocessor': pickle.load(f),
+            'numeric_features': manifest['numeric_features'],
+            'categorical_features': manifest['categorical_features'],
+        }
+    for split in SPLITS:
+        splits[f'X_{split}'] = _load_matrix(
+            os.path.join(encoded_dir, split), metadata['sparse'], metadata['shapes'][split], mmap_mode
+        )
+        splits[f'y_{split}'] = np.load(os.path.join(store_dir, split, 'y.npy'), mmap_mode=mmap_mode)
+    return splits
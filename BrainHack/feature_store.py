@@ -0,0 +1,443 @@
+"""
+Per-user store of the rolling behavioral features.
+
+Clients used to send pre-aggregated fields (notifications in the last 30
+minutes, unlocks in the last hour, screen time today, ...) with every
+/predict call. The store instead ingests the raw events and keeps these
+windows per user, so /predict can be called with just a user_id and the
+service fills in the rolling features (fill).
+
+Events are dicts with 'user_id', 'type' and 'timestamp':
+
+- notification                -> notifications_last_30min
+- unlock                      -> phone_unlocks_last_hour
+- screen_on / screen_off      -> recent_screen_time_today_minutes
+- session_start / session_stop -> productive_session_duration_minutes,
+  and focus_session               time_since_productive_activity_minutes
+
+Events are validated and their timestamps converted by event_log.parse_event.
+Counts are kept in ring buffers of fixed-width buckets, so recording an event
+is O(1) and a window's count is exact up to one bucket (30 seconds for the
+30-minute window, one minute for the hour). Only events move a ring forward;
+reading the features at a request's timestamp leaves the state untouched, and
+timestamps more than MAX_FUTURE_SECONDS ahead of both the newest event and
+the clock are read as that limit.
+
+The state can be snapshotted to SQLite and restored on restart. Only users
+changed since the last snapshot are written. When events arrive through the
+EventLog, the snapshot records the last sequence number applied, so the
+events committed after it can be replayed from the log.
+"""
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from event_log import event_time, parse_event
+
+ROLLING_FEATURES = [
+    'notifications_last_30min',
+    'phone_unlocks_last_hour',
+    'recent_screen_time_today_minutes',
+    'productive_session_duration_minutes',
+    'time_since_productive_activity_minutes',
+]
+
+SECONDS_PER_DAY = 24 * 60 * 60
+N_BUCKETS = 60
+# Clock skew allowed for request timestamps ahead of the newest event and of the server clock
+MAX_FUTURE_SECONDS = 5 * 60
+
+
+class SlidingWindowCounter:
+    """
+    Count of events in the last window_seconds, kept in a ring buffer of buckets.
+
+    Each slot holds the count of one bucket; recording a newer event clears the
+    slots that left the window and subtracts them from the running total.
+    Counting never changes the buffer.
+    """
+
+    __slots__ = ('bucket_seconds', 'counts', 'head', 'total')
+
+    def __init__(self, window_seconds, n_buckets=N_BUCKETS):
+        """
+        Args:
+            window_seconds (float): Window length
+            n_buckets (int): Number of buckets the window is divided into
+        """
+        self.bucket_seconds = window_seconds / n_buckets
+        self.counts = [0] * n_buckets
+        # Newest bucket seen, as an absolute bucket number
+        self.head = None
+        self.total = 0
+
+    def _advance(self, bucket):
+        n_buckets = len(self.counts)
+        if self.head is None:
+            self.head = bucket
+        elif bucket > self.head:
+            # At most n_buckets slots to clear, however long the gap
+            for expired in range(max(self.head + 1, bucket - n_buckets + 1), bucket + 1):
+                slot = expired % n_buckets
+                self.total -= self.counts[slot]
+                self.counts[slot] = 0
+            self.head = bucket
+
+    def add(self, t, count=1):
+        """
+        Record events at time t.
+
+        Args:
+            t (float): Event time in seconds
+            count (int): Number of events
+        """
+        bucket = int(t // self.bucket_seconds)
+        self._advance(bucket)
+        # Late events are kept while their bucket is still in the window
+        if bucket > self.head - len(self.counts):
+            self.counts[bucket % len(self.counts)] += count
+            self.total += count
+
+    def count(self, t):
+        """
+        Count the events in the window ending at time t.
+
+        Args:
+            t (float): Time in seconds
+
+        Returns:
+            int: Number of events in the window (t - window, t], among those still held
+        """
+        if self.head is None:
+            return 0
+        bucket = int(t // self.bucket_seconds)
+        if bucket == self.head:
+            return self.total
+        # The ring holds buckets (head - n, head]; sum the ones also in (bucket - n, bucket]
+        n_buckets = len(self.counts)
+        return sum(
+            self.counts[held % n_buckets]
+            for held in range(max(self.head, bucket) - n_buckets + 1, min(self.head, bucket) + 1)
+        )
+
+    def to_state(self):
+        return {'head': self.head, 'counts': self.counts}
+
+    def load_state(self, state):
+        self.head = state['head']
+        self.counts = list(state['counts'])
+        self.total = sum(self.counts)
+
+
+class UserFeatures:
+    """
+    Rolling feature state of one user.
+    """
+
+    __slots__ = ('notifications', 'unlocks', 'screen_day', 'screen_seconds', 'screen_on_since',
+                 'session_started', 'last_session_seconds', 'last_session_stopped')
+
+    def __init__(self):
+        self.notifications = SlidingWindowCounter(30 * 60)
+        self.unlocks = SlidingWindowCounter(60 * 60)
+        # Screen time accumulated on screen_day, plus the running screen-on interval
+        self.screen_day = None
+        self.screen_seconds = 0.0
+        self.screen_on_since = None
+        self.session_started = None
+        self.last_session_seconds = None
+        self.last_session_stopped = None
+
+    def _add_screen_time(self, until):
+        # Close the running screen-on interval at `until`, counting only the part on until's day
+        day = int(until // SECONDS_PER_DAY)
+        if self.screen_day != day:
+            self.screen_day, self.screen_seconds = day, 0.0
+        since = max(self.screen_on_since, day * SECONDS_PER_DAY)
+        self.screen_seconds += max(until - since, 0.0)
+
+    def record(self, event):
+        """
+        Apply one event.
+
+        Args:
+            event (dict): Normalized event from parse_event (types without rolling features are ignored)
+        """
+        event_type, t = event['type'], event['t']
+        if event_type == 'notification':
+            self.notifications.add(t)
+        elif event_type == 'unlock':
+            self.unlocks.add(t)
+        elif event_type == 'screen_on':
+            if self.screen_on_since is None:
+                self.screen_on_since = t
+        elif event_type == 'screen_off':
+            if self.screen_on_since is not None:
+                self._add_screen_time(t)
+                self.screen_on_since = None
+        elif event_type == 'session_start':
+            if self.session_started is None:
+                self.session_started = t
+        elif event_type == 'session_stop':
+            if self.session_started is not None:
+                self.last_session_seconds = max(t - self.session_started, 0.0)
+                self.last_session_stopped = t
+                self.session_started = None
+        elif event_type == 'focus_session':
+            # A completed session reported in one event, as the dashboard stores it
+            if self.last_session_stopped is None or t >= self.last_session_stopped:
+                self.last_session_seconds = event['duration']
+                self.last_session_stopped = t
+
+    def features(self, t):
+        """
+        Compute the rolling features at time t.
+
+        Args:
+            t (float): Time in seconds
+
+        Returns:
+            dict: Feature values; the session features are left out until a session was seen
+        """
+        day = int(t // SECONDS_PER_DAY)
+        screen_seconds = self.screen_seconds if self.screen_day == day else 0.0
+        if self.screen_on_since is not None:
+            screen_seconds += max(t - max(self.screen_on_since, day * SECONDS_PER_DAY), 0.0)
+
+        features = {
+            'notifications_last_30min': self.notifications.count(t),
+            'phone_unlocks_last_hour': self.unlocks.count(t),
+            'recent_screen_time_today_minutes': round(screen_seconds / 60, 2),
+        }
+        if self.session_started is not None:
+            features['productive_session_duration_minutes'] = round(max(t - self.session_started, 0.0) / 60, 2)
+            features['time_since_productive_activity_minutes'] = 0.0
+        elif self.last_session_stopped is not None:
+            features['productive_session_duration_minutes'] = round(self.last_session_seconds / 60, 2)
+            features['time_since_productive_activity_minutes'] = round(
+                max(t - self.last_session_stopped, 0.0) / 60, 2
+            )
+        return features
+
+    def to_state(self):
+        return {
+            'notifications': self.notifications.to_state(),
+            'unlocks': self.unlocks.to_state(),
+            'screen_day': self.screen_day,
+            'screen_seconds': self.screen_seconds,
+            'screen_on_since': self.screen_on_since,
+            'session_started': self.session_started,
+            'last_session_seconds': self.last_session_seconds,
+            'last_session_stopped': self.last_session_stopped,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        user = cls()
+        user.notifications.load_state(state['notifications'])
+        user.unlocks.load_state(state['unlocks'])
+        for name in ('screen_day', 'screen_seconds', 'screen_on_since', 'session_started',
+                     'last_session_seconds', 'last_session_stopped'):
+            setattr(user, name, state[name])
+        return user
+
+
+class FeatureStore:
+    """
+    Thread-safe in-memory store of UserFeatures, optionally snapshotted to SQLite.
+    """
+
+    def __init__(self, snapshot_path=None):
+        """
+        Args:
+            snapshot_path (str): SQLite file to restore from and snapshot to (None: memory only)
+        """
+        self.snapshot_path = snapshot_path
+        self._users = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_pid = None
+        self.events = 0
+        # Time of the newest event applied, which bounds how far ahead a request may read
+        self.newest_event = None
+        # Sequence number of the last EventLog event applied
+        self.last_seq = 0
+        self.last_snapshot = None
+        if snapshot_path is not None and os.path.exists(snapshot_path):
+            self.restore()
+
+    def record(self, events):
+        """
+        Validate and apply raw events; nothing is applied if any event is invalid.
+
+        Args:
+            events (list of dict): Raw events
+
+        Returns:
+            int: Number of events applied
+        """
+        return self.apply([parse_event(event) for event in events])
+
+    def apply(self, events, last_seq=None):
+        """
+        Apply normalized events, e.g. as an EventLog subscriber.
+
+        Args:
+            events (list of dict): Events from parse_event
+            last_seq (int): EventLog sequence number of the last event, recorded in snapshots
+
+        Returns:
+            int: Number of events applied
+        """
+        with self._lock:
+            for event in events:
+                user = self._users.get(event['user_id'])
+                if user is None:
+                    user = self._users[event['user_id']] = UserFeatures()
+                user.record(event)
+                self._dirty.add(event['user_id'])
+                if self.newest_event is None or event['t'] > self.newest_event:
+                    self.newest_event = event['t']
+            self.events += len(events)
+            if last_seq is not None:
+                self.last_seq = last_seq
+        return len(events)
+
+    def features(self, user_id, timestamp=None):
+        """
+        Get a user's rolling features.
+
+        Args:
+            user_id (str): User id
+            timestamp (str or float): Time to compute the windows at (default: now); times more
+                than MAX_FUTURE_SECONDS ahead of the newest event and the clock are clamped
+
+        Returns:
+            dict: Feature values, or None for users without events
+        """
+        t = event_time(timestamp)
+        with self._lock:
+            t = min(t, max(self.newest_event or 0.0, time.time()) + MAX_FUTURE_SECONDS)
+            user = self._users.get(str(user_id))
+            return user.features(t) if user is not None else None
+
+    def fill(self, row):
+        """
+        Add the stored rolling features a request row does not carry itself.
+
+        Args:
+            row (dict): Input row; its user_id selects the user and its timestamp
+                (if any) the time the windows end at
+
+        Returns:
+            dict: The row, with stored features filled in; values sent by the client win
+        """
+        user_id = row.get('user_id')
+        if user_id is None or user_id == '':
+            return row
+        try:
+            features = self.features(user_id, row.get('timestamp'))
+        except (TypeError, ValueError):
+            # An unparseable timestamp is the model's problem, not the store's
+            return row
+        if features is None:
+            return row
+        return {**features, **row}
+
+    def snapshot(self):
+        """
+        Write the users changed since the last snapshot to the SQLite file.
+
+        Returns:
+            int: Number of users written
+        """
+        if self.snapshot_path is None:
+            return 0
+        with self._snapshot_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+                states = [(user_id, json.dumps(self._users[user_id].to_state())) for user_id in dirty]
+                last_seq = self.last_seq
+
+            connection = sqlite3.connect(self.snapshot_path)
+            try:
+                with connection:
+                    connection.execute(
+                        'CREATE TABLE IF NOT EXISTS user_features (user_id TEXT PRIMARY KEY, state TEXT NOT NULL)'
+                    )
+                    connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)')
+                    connection.executemany('INSERT OR REPLACE INTO user_features VALUES (?, ?)', states)
+                    connection.execute("INSERT OR REPLACE INTO meta VALUES ('last_seq', ?)", (last_seq,))
+            except sqlite3.Error:
+                # Write them again next time
+                with self._lock:
+                    self._dirty |= dirty
+                raise
+            finally:
+                connection.close()
+            self.last_snapshot = time.time()
+            return len(states)
+
+    def restore(self):
+        """
+        Load every user from the SQLite file, replacing the in-memory state.
+        """
+        connection = sqlite3.connect(self.snapshot_path)
+        try:
+            rows = connection.execute('SELECT user_id, state FROM user_features').fetchall()
+            meta = dict(connection.execute('SELECT key, value FROM meta').fetchall())
+        except sqlite3.OperationalError:
+            # An empty file without the tables
+            rows, meta = [], {}
+        finally:
+            connection.close()
+        with self._lock:
+            self._users = {user_id: UserFeatures.from_state(json.loads(state)) for user_id, state in rows}
+            self._dirty = set()
+            self.last_seq = int(meta.get('last_seq', 0))
+
+    def start_snapshots(self, interval):
+        """
+        Snapshot every `interval` seconds on a daemon thread, and once more at exit (idempotent per process).
+
+        Args:
+            interval (float): Seconds between snapshots
+        """
+        if self.snapshot_path is None or interval <= 0:
+            return
+        with self._snapshot_lock:
+            if self._snapshot_pid == os.getpid():
+                return
+            self._snapshot_pid = os.getpid()
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.snapshot()
+                except sqlite3.Error as e:
+                    print(f"Feature store snapshot failed: {e}")
+
+        threading.Thread(target=run, name='feature-store-snapshot', daemon=True).start()
+        atexit.register(self.snapshot)
+
+    def stats(self):
+        """
+        Get the store counters.
+
+        Returns:
+            dict: Users, events applied, last EventLog sequence number applied,
+                users changed since the last snapshot and its time
+        """
+        with self._lock:
+            return {
+                'users': len(self._users),
+                'events': self.events,
+                'last_seq': self.last_seq,
+                'unsaved_users': len(self._dirty),
+                'last_snapshot': self.last_snapshot,
+            }
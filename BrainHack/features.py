@@ -0,0 +1,133 @@
+"""
+Feature engineering shared by data preparation and prediction.
+
+The raw `timestamp` and `user_id` columns are replaced with compact features
+so the OneHotEncoder no longer creates one column per distinct timestamp
+string and per user:
+
+- `timestamp` -> hour, minute-of-day sin/cos and weekday index (numeric)
+- `user_id`   -> a stable hash bucket (categorical, N_USER_BUCKETS values)
+"""
+import math
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+TIME_FEATURES = ['hour', 'minute_of_day_sin', 'minute_of_day_cos', 'day_index']
+USER_FEATURE = 'user_bucket'
+RAW_FEATURES = ['timestamp', 'user_id']
+
+# Number of hash buckets users are folded into
+N_USER_BUCKETS = 32
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+MINUTES_PER_DAY = 24 * 60
+
+
+def uses_engineered_features(feature_columns):
+    """
+    Check whether a model was trained on the engineered features.
+
+    Args:
+        feature_columns (dict): Dictionary with 'numeric' and 'categorical' column lists
+
+    Returns:
+        bool: True if the feature columns include the engineered features
+    """
+    return USER_FEATURE in feature_columns['categorical'] or TIME_FEATURES[0] in feature_columns['numeric']
+
+
+def user_bucket(user_id):
+    """
+    Map a user id to a stable hash bucket.
+
+    zlib.crc32 is used instead of hash() so buckets match across processes.
+
+    Args:
+        user_id (str): Raw user id
+
+    Returns:
+        str: Bucket label, or 'unknown' if no user id is given
+    """
+    if user_id is None or user_id == '' or user_id != user_id:
+        return 'unknown'
+    return f"bucket_{zlib.crc32(str(user_id).encode('utf-8')) % N_USER_BUCKETS}"
+
+
+def time_features(timestamp):
+    """
+    Derive the numeric time features from a timestamp.
+
+    Args:
+        timestamp (str or datetime): Timestamp in '%Y-%m-%d %H:%M:%S' format
+
+    Returns:
+        dict: Engineered time features, NaN when the timestamp is missing or invalid
+    """
+    if isinstance(timestamp, str):
+        try:
+            timestamp = datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+        except ValueError:
+            timestamp = None
+
+    if not isinstance(timestamp, datetime):
+        return dict.fromkeys(TIME_FEATURES, math.nan)
+
+    minute_of_day = timestamp.hour * 60 + timestamp.minute
+    angle = 2 * math.pi * minute_of_day / MINUTES_PER_DAY
+    return {
+        'hour': float(timestamp.hour),
+        'minute_of_day_sin': math.sin(angle),
+        'minute_of_day_cos': math.cos(angle),
+        'day_index': float(timestamp.weekday()),
+    }
+
+
+def engineer_row(row):
+    """
+    Add the engineered features to a single input row.
+
+    Args:
+        row (dict): Raw input row
+
+    Returns:
+        dict: Copy of the row with the engineered features added and raw columns removed
+    """
+    engineered = {key: value for key, value in row.items() if key not in RAW_FEATURES}
+    engineered.update(time_features(row.get('timestamp')))
+    engineered[USER_FEATURE] = user_bucket(row.get('user_id'))
+    return engineered
+
+
+def add_engineered_features(df):
+    """
+    Add the engineered features to a DataFrame.
+
+    Args:
+        df (pandas.DataFrame): Raw input data
+
+    Returns:
+        pandas.DataFrame: Copy of the data with the engineered features added and raw columns removed
+    """
+    import pandas as pd
+
+    df = df.copy()
+    if 'timestamp' in df.columns:
+        timestamps = pd.to_datetime(df['timestamp'], format=TIMESTAMP_FORMAT, errors='coerce')
+    else:
+        timestamps = pd.Series(pd.NaT, index=df.index)
+
+    minute_of_day = timestamps.dt.hour * 60 + timestamps.dt.minute
+    angle = 2 * np.pi * minute_of_day / MINUTES_PER_DAY
+    df['hour'] = timestamps.dt.hour.astype(float)
+    df['minute_of_day_sin'] = np.sin(angle)
+    df['minute_of_day_cos'] = np.cos(angle)
+    df['day_index'] = timestamps.dt.weekday.astype(float)
+
+    if 'user_id' in df.columns:
+        df[USER_FEATURE] = df['user_id'].map(user_bucket)
+    else:
+        df[USER_FEATURE] = 'unknown'
+
+    return df.drop(columns=[col for col in RAW_FEATURES if col in df.columns])
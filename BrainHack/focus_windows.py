@@ -0,0 +1,166 @@
+"""
+Risk curve over the coming hours, and the best windows for focused work.
+
+predict_with_recommendations answers "is now risky?". To plan ahead, the
+user's context is held as it is now and only the time moves: one candidate
+row per upcoming hour, with time_of_day_hour, day_of_week, is_weekend and
+timestamp set to that hour (models on the engineered features derive their
+time features from the timestamp). All candidates go to the model in one
+call, so a week of 168 hours costs one batch, not 168 predictions.
+
+The scan starts at the hour of the context's timestamp. Without one, it
+starts at the context's own time_of_day_hour and day_of_week: the server's
+clock knows nothing of the user's timezone, so it cannot stand in for them.
+
+Windows are runs of consecutive hours ranked by their mean risk. The best
+ones are picked greedily, lowest mean risk first, without overlapping.
+"""
+from datetime import datetime, time, timedelta, timezone
+
+import numpy as np
+
+from event_log import event_time
+from features import TIMESTAMP_FORMAT
+from predictor import risk_level
+
+HOURS_PER_DAY = 24
+MAX_DAYS = 7
+
+# datetime.weekday() order, spelled like the day_of_week values the model was trained on
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def first_hour(context, today=None):
+    """
+    Pick the hour the scan starts at.
+
+    Args:
+        context (dict): Input row describing the user now
+        today (date): Date the weekday of a context without timestamp is counted from
+            (default: today in UTC)
+
+    Returns:
+        datetime: The timestamp's hour; without a timestamp, time_of_day_hour on the next
+            date (from today) falling on day_of_week
+    """
+    timestamp = context.get('timestamp')
+    if timestamp is not None and timestamp != '':
+        t = datetime.fromtimestamp(event_time(timestamp), timezone.utc).replace(tzinfo=None)
+        return t.replace(minute=0, second=0, microsecond=0)
+
+    hour, day = context.get('time_of_day_hour'), context.get('day_of_week')
+    if hour is None or hour == '' or day not in DAY_NAMES:
+        raise ValueError('Send a timestamp, or time_of_day_hour and day_of_week, to anchor the windows')
+    try:
+        hour = int(float(hour))
+    except (TypeError, ValueError):
+        hour = -1
+    if not 0 <= hour < HOURS_PER_DAY:
+        raise ValueError('time_of_day_hour must be an hour from 0 to 23')
+    today = today or datetime.now(timezone.utc).date()
+    return datetime.combine(today + timedelta(days=(DAY_NAMES.index(day) - today.weekday()) % 7), time(hour))
+
+
+def candidate_rows(context, start, hours):
+    """
+    Build one input row per hour, moving only the time fields of the context.
+
+    Args:
+        context (dict): Input row describing the user now
+        start (datetime): First hour, on the hour
+        hours (int): Number of hours
+
+    Returns:
+        list of tuple: (hour as datetime, input row) per hour
+    """
+    candidates = []
+    for i in range(hours):
+        t = start + timedelta(hours=i)
+        candidates.append((t, {
+            **context,
+            'time_of_day_hour': t.hour,
+            'day_of_week': DAY_NAMES[t.weekday()],
+            'is_weekend': int(t.weekday() >= 5),
+            'timestamp': t.strftime(TIMESTAMP_FORMAT),
+        }))
+    return candidates
+
+
+def lowest_risk_windows(risks, window_hours, top_k):
+    """
+    Find the runs of consecutive hours with the lowest mean risk.
+
+    Args:
+        risks (list of float): Risk per hour
+        window_hours (int): Length of a window in hours
+        top_k (int): Maximum number of windows
+
+    Returns:
+        list of tuple: (index of the first hour, mean risk), lowest risk first, not overlapping
+    """
+    n_windows = len(risks) - window_hours + 1
+    if n_windows < 1:
+        return []
+    totals = np.concatenate([[0.0], np.cumsum(risks)])
+    means = (totals[window_hours:] - totals[:n_windows]) / window_hours
+
+    taken = np.zeros(len(risks), dtype=bool)
+    windows = []
+    # A stable sort keeps the earliest of equally good windows first
+    for i in np.argsort(means, kind='stable'):
+        if not taken[i:i + window_hours].any():
+            taken[i:i + window_hours] = True
+            windows.append((int(i), float(means[i])))
+            if len(windows) == top_k:
+                break
+    return windows
+
+
+def best_focus_windows(predictor, context, days=1, window_hours=2, top_k=3):
+    """
+    Score the coming hours for a user and find the best windows for focused work.
+
+    Args:
+        predictor (DistractionPredictor): Predictor scoring the candidate rows
+        context (dict): Input row describing the user now; its timestamp, or else its
+            time_of_day_hour and day_of_week, set the first hour (see first_hour)
+        days (int): Days to look ahead, 1 (24 hours) to 7 (every hour of every weekday)
+        window_hours (int): Length of a window in hours
+        top_k (int): Maximum number of windows
+
+    Returns:
+        dict: curve (timestamp, day_of_week, time_of_day_hour and risk_percentage per hour) and
+            windows (start, end, hours, risk_percentage and risk_level), lowest risk first
+    """
+    if not 1 <= days <= MAX_DAYS:
+        raise ValueError(f'days must be between 1 and {MAX_DAYS}')
+    hours = days * HOURS_PER_DAY
+    if not 1 <= window_hours <= hours:
+        raise ValueError(f'window_hours must be between 1 and {hours}')
+
+    candidates = candidate_rows(context, first_hour(context), hours)
+    probabilities = predictor.predict_proba([row for _, row in candidates])
+    risks = [round(float(p) * 100, 2) for p in probabilities]
+
+    windows = []
+    for i, risk in lowest_risk_windows(risks, window_hours, top_k):
+        risk = round(risk, 2)
+        windows.append({
+            'start': candidates[i][1]['timestamp'],
+            'end': (candidates[i][0] + timedelta(hours=window_hours)).strftime(TIMESTAMP_FORMAT),
+            'hours': window_hours,
+            'risk_percentage': risk,
+            'risk_level': risk_level(risk),
+        })
+    return {
+        'curve': [
+            {
+                'timestamp': row['timestamp'],
+                'day_of_week': row['day_of_week'],
+                'time_of_day_hour': row['time_of_day_hour'],
+                'risk_percentage': risk,
+            }
+            for (_, row), risk in zip(candidates, risks)
+        ],
+        'windows': windows,
+    }
@@ -0,0 +1,185 @@
+"""
+Per-stage latency metrics for the prediction path.
+
+Each stage (request parsing, DataFrame construction, preprocessing, the XGBoost
+call, ...) records its wall time into a histogram: a running count and sum plus
+a window of recent samples for the p50/p95/p99 quantiles. The metrics are
+rendered in the Prometheus text exposition format for the /metrics endpoint.
+
+Components keep `metrics=None` when instrumentation is disabled and time their
+stages through `stage_timer`, which then returns a shared no-op context
+manager, so disabled metrics cost one attribute check per stage.
+"""
+import bisect
+import contextlib
+import threading
+import time
+from collections import deque
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Cumulative bucket bounds in seconds, from 100 µs to 5 s
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_NO_OP = contextlib.nullcontext()
+
+
+def stage_timer(metrics, stage):
+    """
+    Get a context manager timing a stage, or a no-op one if metrics are disabled.
+
+    Args:
+        metrics (LatencyMetrics): Metrics to record into, or None
+        stage (str): Stage name
+
+    Returns:
+        Context manager
+    """
+    if metrics is None:
+        return _NO_OP
+    return metrics.time(stage)
+
+
+class _Timer:
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _Histogram:
+    __slots__ = ('count', 'sum', 'buckets', 'window')
+
+    def __init__(self, window):
+        self.count = 0
+        self.sum = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.window = deque(maxlen=window)
+
+
+class LatencyMetrics:
+    """
+    Thread-safe per-stage latency histograms.
+    """
+
+    def __init__(self, window=1024):
+        """
+        Args:
+            window (int): Number of recent samples per stage used for the quantiles
+        """
+        self.window = window
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def time(self, stage):
+        """
+        Time a block of code as one observation of a stage.
+
+        Args:
+            stage (str): Stage name
+
+        Returns:
+            Context manager recording the elapsed time on exit
+        """
+        return _Timer(self, stage)
+
+    def observe(self, stage, seconds):
+        """
+        Record one observation.
+
+        Args:
+            stage (str): Stage name
+            seconds (float): Elapsed time
+        """
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = _Histogram(self.window)
+            histogram.count += 1
+            histogram.sum += seconds
+            index = bisect.bisect_left(BUCKETS, seconds)
+            if index < len(BUCKETS):
+                histogram.buckets[index] += 1
+            histogram.window.append(seconds)
+
+    def snapshot(self):
+        """
+        Get the current count, total and quantiles of every stage.
+
+        Returns:
+            dict: Mapping of stage name to count, sum_seconds, cumulative buckets and p50/p95/p99 in seconds
+        """
+        with self._lock:
+            histograms = {
+                stage: (h.count, h.sum, list(h.buckets), sorted(h.window))
+                for stage, h in self._histograms.items()
+            }
+
+        snapshot = {}
+        for stage, (count, total, buckets, samples) in sorted(histograms.items()):
+            cumulative, running = [], 0
+            for bucket_count in buckets:
+                running += bucket_count
+                cumulative.append(running)
+            snapshot[stage] = {
+                'count': count,
+                'sum_seconds': total,
+                'buckets': dict(zip(BUCKETS, cumulative)),
+            }
+            for q in QUANTILES:
+                key = f'p{int(q * 100)}'
+                snapshot[stage][key] = samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+        return snapshot
+
+    def reset(self):
+        """
+        Drop all observations.
+        """
+        with self._lock:
+            self._histograms.clear()
+
+    def render_prometheus(self, name='distraction_stage_latency_seconds'):
+        """
+        Render the histograms in the Prometheus text exposition format.
+
+        Quantiles over the recent window are exported as a separate summary,
+        because a Prometheus metric cannot be both a histogram and a summary.
+
+        Args:
+            name (str): Metric name
+
+        Returns:
+            str: Metrics text
+        """
+        snapshot = self.snapshot()
+        lines = [
+            f'# HELP {name} Latency of each stage of the prediction path.',
+            f'# TYPE {name} histogram',
+        ]
+        for stage, stats in snapshot.items():
+            for bound, cumulative in stats['buckets'].items():
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {stats["count"]}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {stats["sum_seconds"]:.9f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {stats["count"]}')
+
+        summary = f'{name}_recent'
+        lines += [
+            f'# HELP {summary} Quantiles of each stage over the last {self.window} observations.',
+            f'# TYPE {summary} summary',
+        ]
+        for stage, stats in snapshot.items():
+            for q in QUANTILES:
+                lines.append(f'{summary}{{stage="{stage}",quantile="{q}"}} {stats[f"p{int(q * 100)}"]:.9f}')
+            lines.append(f'{summary}_sum{{stage="{stage}"}} {stats["sum_seconds"]:.9f}')
+            lines.append(f'{summary}_count{{stage="{stage}"}} {stats["count"]}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,139 @@
+"""
+Micro-batching for concurrent prediction requests.
+
+XGBoost is much cheaper per row when rows are scored together, so instead of
+one model call per request the MicroBatcher collects the rows of concurrent
+requests for up to `max_wait_ms` or `max_batch_size` rows, scores them with a
+single batched call in a worker thread, and resolves each request's future
+with its own result. If the batched call fails on a bad row (a ValueError),
+the batch's rows are scored one at a time, so that row only fails its own
+request. Any other error, such as the model still loading, fails the whole
+batch at once: retrying it row by row would only repeat it. While one batch
+is being scored the next one keeps filling up, so batches grow on their own
+when the model is the bottleneck.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MicroBatcher:
+    """
+    Collects rows submitted from an asyncio event loop into batched model calls.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=64, max_wait_ms=5.0, row_errors=(ValueError,)):
+        """
+        Args:
+            predict_batch (callable): Scores a list of rows, returning one result per row
+                (e.g. DistractionPredictor.predict_batch)
+            max_batch_size (int): Flush as soon as this many rows are waiting
+            max_wait_ms (float): Longest time the first row of a batch waits for others
+            row_errors (tuple): Exception types caused by a single row's input; only these
+                make a failed batch be retried row by row
+        """
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.row_errors = row_errors
+
+        # One scoring thread: batches run back to back and XGBoost keeps its own threads busy
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='micro-batcher')
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+        self._running = False
+        self.batches = 0
+        self.rows = 0
+        self.fallbacks = 0
+
+    async def submit(self, row):
+        """
+        Queue a row for the next batch and wait for its result.
+
+        Args:
+            row (dict): Input row
+
+        Returns:
+            The result predict_batch produced for this row
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # While a batch is being scored, keep collecting; the next batch starts when it finishes
+        if not self._pending or self._running:
+            return
+
+        batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+        self._running = True
+        # Keep a reference so the task is not garbage collected while it runs
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _score(self, rows):
+        # One (result, exception) pair per row; runs in the scoring thread
+        try:
+            return [(result, None) for result in self.predict_batch(rows)]
+        except Exception as e:
+            if len(rows) == 1 or not isinstance(e, self.row_errors):
+                return [(None, e)] * len(rows)
+        # Unbatched, a bad row would only fail its own request: retry the rows one by one
+        self.fallbacks += 1
+        outcomes = []
+        for row in rows:
+            try:
+                outcomes.append((self.predict_batch([row])[0], None))
+            except Exception as e:
+                outcomes.append((None, e))
+        return outcomes
+
+    async def _run(self, batch):
+        rows = [row for row, _ in batch]
+        try:
+            outcomes = await asyncio.get_running_loop().run_in_executor(self._executor, self._score, rows)
+        except Exception as e:
+            outcomes = [(None, e)] * len(batch)
+        else:
+            self.batches += 1
+            self.rows += len(rows)
+        finally:
+            self._running = False
+
+        for (_, future), (result, error) in zip(batch, outcomes):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        # Rows that arrived meanwhile have already waited a whole batch, so score them right away
+        self._flush()
+
+    def stats(self):
+        """
+        Get the batching counters.
+
+        Returns:
+            dict: Number of batches, rows, the mean batch size and the batches retried row by row so far
+        """
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms,
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_batch_size': round(self.rows / self.batches, 2) if self.batches else 0.0,
+            'fallbacks': self.fallbacks,
+        }
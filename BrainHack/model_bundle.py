@@ -0,0 +1,220 @@
+"""
+Versioned model bundle: a pickle-free artifact format for the distraction model.
+
+A bundle is a directory containing:
+
+- manifest.json       format version, library versions, feature columns and file names
+- booster.ubj         the XGBoost booster in XGBoost's native UBJSON format
+- preprocessing.json  scaler statistics and one-hot category maps as plain arrays
+- trees.npz           the trees as flat NumPy arrays, for scoring without xgboost (see tree_ensemble.py)
+- model.onnx          (optional) the booster converted to ONNX
+
+The booster and preprocessing files can be loaded by any XGBoost version that
+reads UBJSON, without sklearn, and without unpickling arbitrary objects.
+xgboost is imported only when needed: importing it also imports sklearn and
+takes most of a second, which the ONNX and NumPy runtime paths avoid entirely.
+"""
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+from compiled_model import CompiledModel
+from tree_ensemble import TreeEnsemble
+
+BUNDLE_VERSION = 1
+
+MANIFEST_FILE = 'manifest.json'
+BOOSTER_FILE = 'booster.ubj'
+PREPROCESSING_FILE = 'preprocessing.json'
+TREES_FILE = 'trees.npz'
+ONNX_FILE = 'model.onnx'
+
+
+class OnnxModel(CompiledModel):
+    """
+    CompiledModel variant that scores the encoded matrix with ONNX Runtime.
+    """
+
+    def __init__(self, preprocessing, session):
+        """
+        Args:
+            preprocessing (dict): Preprocessing parameters from the bundle
+            session (onnxruntime.InferenceSession): Session for the bundled ONNX model
+        """
+        super().__init__(preprocessing, booster=None)
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+
+    def predict_encoded(self, matrix):
+        """
+        Score an already encoded feature matrix.
+
+        Args:
+            matrix (numpy.ndarray): Feature matrix from transform
+
+        Returns:
+            numpy.ndarray: Probability of distraction (0-1) per row
+        """
+        probabilities = self.session.run(['probabilities'], {self.input_name: matrix})[0]
+        return np.asarray(probabilities)[:, 1]
+
+
+class NumpyModel(CompiledModel):
+    """
+    CompiledModel variant that scores the encoded matrix with the pure NumPy TreeEnsemble.
+    """
+
+    def __init__(self, preprocessing, ensemble):
+        """
+        Args:
+            preprocessing (dict): Preprocessing parameters from the bundle
+            ensemble (TreeEnsemble): The bundled trees
+        """
+        super().__init__(preprocessing, booster=None)
+        self.ensemble = ensemble
+
+    def predict_encoded(self, matrix):
+        """
+        Score an already encoded feature matrix.
+
+        Args:
+            matrix (numpy.ndarray): Feature matrix from transform
+
+        Returns:
+            numpy.ndarray: Probability of distraction (0-1) per row
+        """
+        return self.ensemble.predict_proba(matrix)
+
+
+def _export_onnx(booster_path, n_features, onnx_path):
+    # The converters are optional dependencies (see requirements.txt)
+    import onnxmltools
+    import xgboost as xgb
+    from onnxmltools.convert.common.data_types import FloatTensorType
+
+    classifier = xgb.XGBClassifier()
+    classifier.load_model(booster_path)
+    onnx_model = onnxmltools.convert_xgboost(
+        classifier, initial_types=[('input', FloatTensorType([None, n_features]))]
+    )
+    with open(onnx_path, 'wb') as f:
+        f.write(onnx_model.SerializeToString())
+
+
+def export_bundle(pipeline, feature_columns, bundle_dir, with_onnx=False):
+    """
+    Export a trained pipeline as a versioned model bundle.
+
+    Args:
+        pipeline (sklearn.pipeline.Pipeline): Fitted preprocessor + XGBClassifier pipeline
+        feature_columns (dict): Dictionary with 'numeric' and 'categorical' column lists
+        bundle_dir (str): Directory to write the bundle to (created if needed)
+        with_onnx (bool): Also export the booster to ONNX
+
+    Returns:
+        dict: The bundle manifest
+    """
+    import sklearn
+    import xgboost as xgb
+
+    compiled = CompiledModel.from_pipeline(pipeline, feature_columns)
+    os.makedirs(bundle_dir, exist_ok=True)
+
+    # Keep only the rounds the model actually predicts with (early stopping)
+    booster = compiled.booster
+    if compiled.iteration_range != (0, 0):
+        booster = booster[compiled.iteration_range[0]:compiled.iteration_range[1]]
+    booster_path = os.path.join(bundle_dir, BOOSTER_FILE)
+    booster.save_model(booster_path)
+
+    with open(os.path.join(bundle_dir, PREPROCESSING_FILE), 'w') as f:
+        json.dump(compiled.get_preprocessing(), f)
+
+    TreeEnsemble.from_booster(booster).save(os.path.join(bundle_dir, TREES_FILE))
+
+    files = {'booster': BOOSTER_FILE, 'preprocessing': PREPROCESSING_FILE, 'trees': TREES_FILE}
+    if with_onnx:
+        _export_onnx(booster_path, compiled.n_features, os.path.join(bundle_dir, ONNX_FILE))
+        files['onnx'] = ONNX_FILE
+
+    manifest = {
+        'format_version': BUNDLE_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'xgboost_version': xgb.__version__,
+        'sklearn_version': sklearn.__version__,
+        'feature_columns': {
+            'numeric': list(feature_columns['numeric']),
+            'categorical': list(feature_columns['categorical']),
+        },
+        'n_features': compiled.n_features,
+        'files': files,
+    }
+    with open(os.path.join(bundle_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def read_manifest(bundle_dir):
+    """
+    Read and validate a bundle manifest.
+
+    Args:
+        bundle_dir (str): Bundle directory
+
+    Returns:
+        dict: The bundle manifest
+    """
+    with open(os.path.join(bundle_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+
+    if manifest.get('format_version') != BUNDLE_VERSION:
+        raise ValueError(
+            f"Unsupported model bundle version {manifest.get('format_version')} (expected {BUNDLE_VERSION})"
+        )
+    return manifest
+
+
+def load_bundle(bundle_dir, runtime='xgboost'):
+    """
+    Load a model bundle.
+
+    Args:
+        bundle_dir (str): Bundle directory
+        runtime (str): 'xgboost' to score with the native booster, 'onnx' for ONNX Runtime,
+            'numpy' for the pure NumPy evaluator
+
+    Returns:
+        tuple: (CompiledModel, feature_columns dict)
+    """
+    manifest = read_manifest(bundle_dir)
+    files = manifest['files']
+
+    with open(os.path.join(bundle_dir, files['preprocessing'])) as f:
+        preprocessing = json.load(f)
+
+    if runtime == 'xgboost':
+        import xgboost as xgb
+
+        booster = xgb.Booster()
+        booster.load_model(os.path.join(bundle_dir, files['booster']))
+        model = CompiledModel(preprocessing, booster)
+    elif runtime == 'onnx':
+        if 'onnx' not in files:
+            raise ValueError(f"Model bundle at {bundle_dir} was exported without ONNX")
+        import onnxruntime
+
+        session = onnxruntime.InferenceSession(
+            os.path.join(bundle_dir, files['onnx']), providers=['CPUExecutionProvider']
+        )
+        model = OnnxModel(preprocessing, session)
+    elif runtime == 'numpy':
+        if 'trees' not in files:
+            raise ValueError(f"Model bundle at {bundle_dir} was exported without {TREES_FILE}")
+        model = NumpyModel(preprocessing, TreeEnsemble.load(os.path.join(bundle_dir, files['trees'])))
+    else:
+        raise ValueError(f"Unknown runtime '{runtime}'")
+
+    return model, manifest['feature_columns']
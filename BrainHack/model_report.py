@@ -0,0 +1,59 @@
+"""
+Compare model artifacts by size, load time and per-row prediction latency.
+
+Usage:
+python model_report.py distraction_model.pkl:feature_columns.pkl new_model.pkl:new_feature_columns.pkl
+"""
+import os
+import pickle
+import sys
+import time
+
+from predictor import DistractionPredictor
+from synthetic_data import make_rows
+
+N_ROWS = 200
+
+
+def report(model_path, feature_columns_path):
+    name = model_path
+    # DistractionPredictor resolves relative paths against its own folder, not the cwd
+    model_path = os.path.abspath(model_path)
+    feature_columns_path = os.path.abspath(feature_columns_path)
+    size_kb = os.path.getsize(model_path) / 1024
+    predictor = DistractionPredictor(model_path, feature_columns_path)
+
+    # Time a second load so sklearn/xgboost import cost is not counted
+    start = time.perf_counter()
+    with open(model_path, 'rb') as f:
+        pickle.load(f)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    n_features = predictor.model.named_steps['classifier'].get_booster().num_features()
+    rows = make_rows(predictor.model, predictor.feature_columns, N_ROWS)
+
+    start = time.perf_counter()
+    for row in rows:
+        predictor.predict(row)
+    latency_ms = (time.perf_counter() - start) * 1000 / len(rows)
+
+    return {
+        'model': name,
+        'size_kb': size_kb,
+        'load_ms': load_ms,
+        'n_features': n_features,
+        'latency_ms': latency_ms,
+    }
+
+
+def main(artifacts):
+    print(f"{'model':<40} {'size (KB)':>10} {'load (ms)':>10} {'features':>9} {'ms/row':>8}")
+    for artifact in artifacts:
+        model_path, _, feature_columns_path = artifact.partition(':')
+        result = report(model_path, feature_columns_path or 'feature_columns.pkl')
+        print(f"{result['model']:<40} {result['size_kb']:>10.1f} {result['load_ms']:>10.1f} "
+              f"{result['n_features']:>9} {result['latency_ms']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or ['distraction_model.pkl:feature_columns.pkl'])
@@ -0,0 +1,135 @@
+"""
+In-process LRU + TTL cache for predictions.
+
+Clients often poll /predict with identical inputs, so results are cached under
+the canonicalized feature vector: the same values prepare_input would feed to
+the model, in feature_columns order.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+def canonical_key(row, feature_columns):
+    """
+    Build the cache key for an input row.
+
+    Numeric values are coerced to float (missing -> 0, like prepare_input) and
+    categorical values default to 'unknown', so '14' and 14 share an entry and
+    keys the model ignores do not split the cache.
+
+    Args:
+        row (dict): Input row
+        feature_columns (dict): Dictionary with 'numeric' and 'categorical' column lists
+
+    Returns:
+        tuple: Hashable key, or None if the row cannot be coerced
+    """
+    key = []
+    try:
+        for col in feature_columns['numeric']:
+            value = row.get(col, 0)
+            value = math.nan if value is None else float(value)
+            # NaN != NaN, so store missing values as None to keep keys comparable
+            key.append(None if math.isnan(value) else value)
+    except (TypeError, ValueError):
+        return None
+    for col in feature_columns['categorical']:
+        value = row.get(col, 'unknown')
+        if isinstance(value, (list, dict)):
+            return None
+        key.append(value)
+    return tuple(key)
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache whose entries expire after a fixed time-to-live.
+    """
+
+    def __init__(self, max_size=1024, ttl_seconds=60.0):
+        """
+        Args:
+            max_size (int): Maximum number of cached predictions
+            ttl_seconds (float): Seconds an entry stays valid after it is stored
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """
+        Look up a cached value.
+
+        Args:
+            key (tuple): Cache key from canonical_key
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Store a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key (tuple): Cache key from canonical_key
+            value: Value to cache
+        """
+        if key is None or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Drop all entries, e.g. after the model is reloaded.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Get the cache counters.
+
+        Returns:
+            dict: Size, limits and hit/miss/eviction/expiration counters
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
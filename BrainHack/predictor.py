@@ -1,21 +1,64 @@
-import pandas as pd
+import math
 import pickle
 import os
 
+import numpy as np
+
+from compiled_model import CompiledModel
+from model_bundle import load_bundle
+from features import add_engineered_features, engineer_row, uses_engineered_features
+from prediction_cache import PredictionCache, canonical_key
+from latency_metrics import LatencyMetrics, stage_timer
+
+def risk_level(risk_percentage):
+    """
+    Bucket a risk percentage the way the recommendations do.
+
+    Args:
+        risk_percentage (float): Risk of distraction (0-100)
+
+    Returns:
+        str: 'high' (above 75), 'moderate' (above 50) or 'low'
+    """
+    if risk_percentage > 75:
+        return 'high'
+    if risk_percentage > 50:
+        return 'moderate'
+    return 'low'
+
+
 class DistractionPredictor:
     """
     A class for making distraction predictions using the trained model.
     This class can be imported and used in other projects.
     """
     
-    def __init__(self, model_path='distraction_model.pkl', feature_columns_path='feature_columns.pkl'):
+    def __init__(self, model_path='distraction_model.pkl', feature_columns_path='feature_columns.pkl',
+                 max_batch_size=1000, compiled=False, runtime='xgboost', cache_size=0, cache_ttl=60.0,
+                 metrics=None):
         """
         Initialize the predictor with the trained model and feature columns.
         
         Args:
-            model_path (str): Path to the trained model pickle file
+            model_path (str): Path to the trained model pickle file, or to a model bundle
+                directory exported by train_model.py (always uses compiled inference)
             feature_columns_path (str): Path to the feature columns pickle file
+                (ignored for model bundles, which carry their own feature columns)
+            max_batch_size (int): Maximum number of rows accepted by predict_batch
+            compiled (bool): Encode inputs with NumPy and call the XGBoost booster directly,
+                bypassing pandas and the sklearn preprocessing pipeline
+            runtime (str): Runtime for model bundles, 'xgboost', 'onnx' or 'numpy'
+            cache_size (int): Number of predictions to keep in an LRU cache (0 disables caching)
+            cache_ttl (float): Seconds a cached prediction stays valid
+            metrics (LatencyMetrics or bool): Record the latency of each prediction stage
+                (True creates a new LatencyMetrics; None or False disables timing)
         """
+        self.max_batch_size = max_batch_size
+        self.compiled = compiled
+        self.runtime = runtime
+        self.cache = PredictionCache(cache_size, cache_ttl) if cache_size > 0 else None
+        self.metrics = LatencyMetrics() if metrics is True else (metrics or None)
+        
         # Get the absolute path if relative paths are provided
         if not os.path.isabs(model_path):
             model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), model_path)
@@ -23,30 +66,70 @@ class DistractionPredictor:
         if not os.path.isabs(feature_columns_path):
             feature_columns_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), feature_columns_path)
         
-        # Load the model
-        with open(model_path, 'rb') as f:
-            self.model = pickle.load(f)
+        self.model_path = model_path
+        self.feature_columns_path = feature_columns_path
+        self._load()
+    
+    def _load(self):
+        if os.path.isdir(self.model_path):
+            # Model bundles hold no sklearn pipeline, only the compiled inference path
+            self.model = None
+            self.compiled_model, self.feature_columns = load_bundle(self.model_path, runtime=self.runtime)
+        else:
+            # Load the model
+            with open(self.model_path, 'rb') as f:
+                self.model = pickle.load(f)
+            
+            # Load the feature columns
+            with open(self.feature_columns_path, 'rb') as f:
+                self.feature_columns = pickle.load(f)
+            
+            # Build the fast path once so each prediction only encodes and scores
+            self.compiled_model = (
+                CompiledModel.from_pipeline(self.model, self.feature_columns) if self.compiled else None
+            )
         
-        # Load the feature columns
-        with open(feature_columns_path, 'rb') as f:
-            self.feature_columns = pickle.load(f)
+        # Models trained on engineered features expect raw timestamp/user_id to be derived first
+        self.engineered = uses_engineered_features(self.feature_columns)
+        # Built on the first explain call for pickled models without the compiled path
+        self._explainer = self.compiled_model
+    
+    def reload(self):
+        """
+        Reload the model files this predictor was created with and invalidate cached predictions.
+        """
+        self._load()
+        if self.cache is not None:
+            self.cache.clear()
     
     def prepare_input(self, data):
         """
         Prepare the input data for prediction.
         
         Args:
-            data (dict or pandas.DataFrame): Input data for prediction
+            data (dict, list of dict or pandas.DataFrame): Input data for prediction
             
         Returns:
             pandas.DataFrame: Prepared input data
         """
+        # Only the pipeline path needs pandas; the compiled path and model bundles never import it
+        import pandas as pd
+        
         # Convert dict to DataFrame if necessary
         if isinstance(data, dict):
             input_df = pd.DataFrame([data])
+        elif isinstance(data, list):
+            # Fill keys missing from individual rows with the same defaults used below,
+            # so every row is treated exactly as it would be on its own
+            defaults = dict.fromkeys(self.feature_columns['numeric'], 0)
+            defaults.update(dict.fromkeys(self.feature_columns['categorical'], 'unknown'))
+            input_df = pd.DataFrame([{**defaults, **row} for row in data])
         else:
             input_df = data.copy()
         
+        if self.engineered:
+            input_df = add_engineered_features(input_df)
+        
         # Ensure all required numeric columns exist
         for col in self.feature_columns['numeric']:
             if col in input_df.columns:
@@ -63,6 +146,41 @@ class DistractionPredictor:
         
         return input_df
     
+    def _engineer_rows(self, rows):
+        # Derive the engineered features for the compiled path, which skips prepare_input
+        if not self.engineered:
+            return rows
+        return [engineer_row(row) for row in rows]
+    
+    def _cache_key(self, row):
+        # Key on the values the model actually sees, after feature engineering
+        if self.engineered:
+            row = engineer_row(row)
+        return canonical_key(row, self.feature_columns)
+    
+    def _score(self, rows):
+        # Score a list of rows or a DataFrame with a single call to the model,
+        # timing each stage when metrics are enabled
+        if self.compiled_model is not None:
+            if not isinstance(rows, list):
+                rows = rows.to_dict('records')
+            with stage_timer(self.metrics, 'encode'):
+                matrix = self.compiled_model.transform(self._engineer_rows(rows))
+            with stage_timer(self.metrics, 'model'):
+                return self.compiled_model.predict_encoded(matrix)
+        
+        # Prepare all rows at once and score them in one vectorized call
+        with stage_timer(self.metrics, 'prepare_input'):
+            input_df = self.prepare_input(rows)
+        if self.metrics is None:
+            return self.model.predict_proba(input_df)[:, 1]
+        
+        # Run the pipeline steps separately so the ColumnTransformer and XGBoost are timed apart
+        with stage_timer(self.metrics, 'preprocess'):
+            features = self.model[:-1].transform(input_df)
+        with stage_timer(self.metrics, 'model'):
+            return self.model[-1].predict_proba(features)[:, 1]
+    
     def predict(self, data):
         """
         Make a prediction using the trained model.
@@ -73,35 +191,149 @@ class DistractionPredictor:
         Returns:
             float: Probability of distraction (0-1)
         """
-        # Prepare the input data
-        input_df = self.prepare_input(data)
+        key = None
+        if self.cache is not None and isinstance(data, dict):
+            key = self._cache_key(data)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
         
-        # Make prediction
-        prediction = float(self.model.predict_proba(input_df)[0, 1])
+        prediction = float(self._score([data] if isinstance(data, dict) else data)[0])
+        
+        if key is not None:
+            self.cache.put(key, prediction)
         
         return prediction
     
-    def predict_with_recommendations(self, data):
+    def predict_proba(self, rows):
         """
-        Make a prediction and generate recommendations based on the risk level.
+        Score any number of rows, for offline use.
+        
+        Unlike predict_batch, there is no batch size limit and no cache.
         
         Args:
-            data (dict or pandas.DataFrame): Input data for prediction
+            rows (list of dict or pandas.DataFrame): Input rows for prediction
             
         Returns:
-            dict: Dictionary containing risk_percentage, recommendation, and alternative
+            numpy.ndarray: Probability of distraction per row
         """
-        # Get the prediction
-        prediction = self.predict(data)
+        if len(rows) == 0:
+            return np.empty(0)
+        return np.asarray(self._score(rows), dtype=float)
+    
+    def predict_batch(self, rows):
+        """
+        Score many rows with a single call to the model.
         
+        Args:
+            rows (list of dict or pandas.DataFrame): Input rows for prediction
+            
+        Returns:
+            list: One dict per row containing risk_percentage, recommendation, and alternative
+        """
+        if len(rows) > self.max_batch_size:
+            raise ValueError(f"Batch of {len(rows)} rows exceeds the maximum batch size of {self.max_batch_size}")
+        if len(rows) == 0:
+            return []
+        
+        if self.cache is None:
+            predictions = self._score(rows)
+        else:
+            # Only score the rows that are not cached
+            if not isinstance(rows, list):
+                rows = rows.to_dict('records')
+            keys = [self._cache_key(row) for row in rows]
+            predictions = [self.cache.get(key) for key in keys]
+            missing = [i for i, prediction in enumerate(predictions) if prediction is None]
+            if missing:
+                for i, prediction in zip(missing, self._score([rows[i] for i in missing])):
+                    predictions[i] = float(prediction)
+                    self.cache.put(keys[i], predictions[i])
+        
+        return [self.get_recommendation(float(prediction)) for prediction in predictions]
+    
+    def explain(self, data, top_k=5, approximate=False):
+        """
+        Explain predictions by the contribution of each input column to the log-odds.
+        
+        Contributions are XGBoost's TreeSHAP values on the encoded row, with the
+        one-hot slots of a categorical column summed back into the column. Rows are
+        explained with one booster call, and explanations are cached alongside the
+        predictions, under their own keys: the probability an explanation implies is
+        recomputed from the contributions, so it is never served as the row's prediction.
+        
+        Args:
+            data (dict or list of dict): One input row, or a batch of rows
+            top_k (int): Number of drivers to return per row, largest absolute contribution first
+            approximate (bool): Use the Saabas approximation instead of exact TreeSHAP (several times faster)
+            
+        Returns:
+            dict or list: Per row, the predict_with_recommendations fields plus base_value (log-odds
+                of the average row) and drivers, a list of dicts with feature, value and contribution
+        """
+        rows = [data] if isinstance(data, dict) else list(data)
+        if len(rows) > self.max_batch_size:
+            raise ValueError(f"Batch of {len(rows)} rows exceeds the maximum batch size of {self.max_batch_size}")
+        
+        rows = self._engineer_rows(rows)
+        keys = [canonical_key(row, self.feature_columns) for row in rows]
+        # Exact and approximate explanations of a row are cached apart
+        kind = 'explain_approximate' if approximate else 'explain'
+        entries = [None] * len(rows)
+        if self.cache is not None:
+            entries = [self.cache.get((kind,) + key if key is not None else None) for key in keys]
+        missing = [i for i, entry in enumerate(entries) if entry is None]
+        if missing:
+            if self._explainer is None:
+                self._explainer = CompiledModel.from_pipeline(self.model, self.feature_columns)
+            with stage_timer(self.metrics, 'encode'):
+                matrix = self._explainer.transform([rows[i] for i in missing])
+            with stage_timer(self.metrics, 'explain'):
+                contributions, bias = self._explainer.explain_encoded(matrix, approximate)
+            for j, i in enumerate(missing):
+                entries[i] = (contributions[j], float(bias[j]))
+                if self.cache is not None and keys[i] is not None:
+                    self.cache.put((kind,) + keys[i], entries[i])
+        
+        explanations = [
+            self._explanation(key, contributions, bias, top_k) for key, (contributions, bias) in zip(keys, entries)
+        ]
+        return explanations[0] if isinstance(data, dict) else explanations
+    
+    @staticmethod
+    def _probability(contributions, bias):
+        return 1 / (1 + math.exp(-(bias + float(contributions.sum()))))
+    
+    def _explanation(self, key, contributions, bias, top_k):
+        # The canonical key holds the values the model saw, in the same column order as the contributions
+        columns = self.feature_columns['numeric'] + self.feature_columns['categorical']
+        result = self.get_recommendation(self._probability(contributions, bias))
+        result['base_value'] = round(bias, 4)
+        result['drivers'] = [
+            {'feature': columns[j], 'value': key[j], 'contribution': round(float(contributions[j]), 4)}
+            for j in np.argsort(-np.abs(contributions), kind='stable')[:top_k]
+        ]
+        return result
+    
+    def get_recommendation(self, prediction):
+        """
+        Turn a probability of distraction into a risk percentage and recommendations.
+        
+        Args:
+            prediction (float): Probability of distraction (0-1)
+            
+        Returns:
+            dict: Dictionary containing risk_percentage, recommendation, and alternative
+        """
         # Format as percentage
         risk_percentage = round(prediction * 100, 2)
         
         # Generate recommendations based on risk level
-        if risk_percentage > 75:
+        level = risk_level(risk_percentage)
+        if level == 'high':
             recommendation = "High risk of distraction. Consider avoiding your phone for the next 15 minutes."
             alternative = "Try a 5-minute walk or deep breathing exercise instead."
-        elif risk_percentage > 50:
+        elif level == 'moderate':
             recommendation = "Moderate risk of distraction. Be mindful of your phone usage."
             alternative = "Set a timer if you need to use your phone."
         else:
@@ -112,4 +344,19 @@ class DistractionPredictor:
             'risk_percentage': risk_percentage,
             'recommendation': recommendation,
             'alternative': alternative
-        }
\ No newline at end of file
+        }
+    
+    def predict_with_recommendations(self, data):
+        """
+        Make a prediction and generate recommendations based on the risk level.
+        
+        Args:
+            data (dict or pandas.DataFrame): Input data for prediction
+            
+        Returns:
+            dict: Dictionary containing risk_percentage, recommendation, and alternative
+        """
+        # Get the prediction
+        prediction = self.predict(data)
+        
+        return self.get_recommendation(prediction)
@@ -1,67 +1,37 @@
-import pandas as pd
-import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.compose import ColumnTransformer
-import pickle
+import argparse
 
-# Load the data
-data = pd.read_csv('distraction_data.csv')
+from split_store import SPLITS, scan, write_store
 
-# Basic data exploration
-print(data.head())
-print(f"Dataset shape: {data.shape}")
-print("Number of rows:", len(data))
+# The raw CSV is streamed in chunks, so the event log can be larger than RAM
+# (see split_store.py for the passes and the on-disk layout)
+parser = argparse.ArgumentParser(description='Prepare the train/val/test splits from the raw distraction data.')
+parser.add_argument('--input', default='distraction_data.csv', help='Raw CSV (default: distraction_data.csv)')
+parser.add_argument('--output', default='data_splits', help='Split store directory (default: data_splits)')
+parser.add_argument('--chunksize', type=int, default=100_000, help='Rows read per chunk (default: 100000)')
+args = parser.parse_args()
+
+# First pass: fill statistics and split sizes
+print(f"Scanning {args.input} in chunks of {args.chunksize} rows...")
+stats = scan(args.input, args.chunksize)
+n_rows = sum(stats['split_rows'].values())
+print("Number of rows:", n_rows)
 
 # Check for missing values
 print("\nMissing values per column:")
-print(data.isnull().sum())
-
-# Fill missing values (if any)
-# For numeric columns
-numeric_cols = data.select_dtypes(include=['int64', 'float64']).columns
-data[numeric_cols] = data[numeric_cols].fillna(data[numeric_cols].median())
-
-# For categorical columns
-categorical_cols = data.select_dtypes(include=['object']).columns
-data[categorical_cols] = data[categorical_cols].fillna(data[categorical_cols].mode().iloc[0])
-
-# Split features and target
-X = data.drop(['fell_into_distraction', 'distraction_duration_minutes'], axis=1)
-y = data['fell_into_distraction']
-
-# Split categorical and numerical features
-categorical_features = X.select_dtypes(include=['object']).columns.tolist()
-numeric_features = X.select_dtypes(include=['int64', 'float64']).columns.tolist()
-
-print(f"\nCategorical features: {categorical_features}")
-print(f"Numeric features: {numeric_features}")
-
-# Create preprocessing pipeline
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('num', StandardScaler(), numeric_features),
-        ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features)
-    ])
-
-# First split: 80% train, 20% temp (validation + test)
-X_train, X_temp, y_train, y_temp = train_test_split(X, y, test_size=0.2, random_state=42)
+for col, count in stats['missing'].items():
+    print(f"{col:<45} {count}")
 
-# Second split: Split the temp into half validation and half test (each 10% of original data)
-X_val, X_test, y_val, y_test = train_test_split(X_temp, y_temp, test_size=0.5, random_state=42)
+# Second pass: fill missing values with the approximate medians/modes, replace the
+# high-cardinality timestamp and user_id columns with compact engineered features,
+# and write each row to the split picked by the hash of its values
+manifest = write_store(args.input, args.output, args.chunksize, stats)
 
-print(f"\nTraining set size: {len(X_train)} ({len(X_train)/len(X)*100:.1f}%)")
-print(f"Validation set size: {len(X_val)} ({len(X_val)/len(X)*100:.1f}%)")
-print(f"Test set size: {len(X_test)} ({len(X_test)/len(X)*100:.1f}%)")
+print(f"\nCategorical features: {manifest['categorical_features']}")
+print(f"Numeric features: {manifest['numeric_features']}")
 
-# Save the splits and preprocessing information
-with open('data_splits.pkl', 'wb') as f:
-    pickle.dump({
-        'X_train': X_train, 'y_train': y_train,
-        'X_val': X_val, 'y_val': y_val,
-        'X_test': X_test, 'y_test': y_test,
-        'numeric_features': numeric_features,
-        'categorical_features': categorical_features
-    }, f)
+labels = {'train': 'Training', 'val': 'Validation', 'test': 'Test'}
+for split in SPLITS:
+    size = manifest['split_rows'][split]
+    print(f"{labels[split]} set size: {size} ({size / max(n_rows, 1) * 100:.1f}%)")
 
-print("\nData preparation completed and splits saved!")
\ No newline at end of file
+print(f"\nData preparation completed and splits saved to '{args.output}'!")
@@ -0,0 +1,268 @@
+"""
+Incremental (warm-start) retraining from new session data.
+
+Instead of retraining from scratch, the existing model keeps its trees and
+boosting continues on the new rows only (XGBoost `xgb_model=` continuation).
+The preprocessing statistics are updated with the new rows first:
+
+- the StandardScaler statistics with partial_fit (streaming mean/variance update)
+- the OneHotEncoder categories, extended with values first seen in the new rows
+
+Both change the feature space the existing trees were grown in, so the trees
+are rewritten to match: numeric split thresholds are mapped through the old
+and new scaling (the raw threshold is unchanged), and feature indices are
+remapped because new categories are appended to each column's block. After the
+rewrite, the old trees score the updated encoding like the old model scored
+the old one, and the new trees are added on top. (One exception: with sparse
+encoded input XGBoost treats a stored zero as missing, i.e. a raw value equal
+to the scaler mean, and that point moves with the updated mean.)
+
+Usage:
+python retrain_model.py --new-data new_sessions.csv --rounds 50
+"""
+import argparse
+import copy
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from feature_matrix import assemble_preprocessor, make_preprocessor
+from split_store import load_store, read_store_manifest, scan, write_store
+
+# Relative margin below a remapped split threshold (4 float32 ulps)
+THRESHOLD_TOLERANCE = 4 * float(np.finfo(np.float32).eps)
+
+
+def extend_preprocessor(preprocessor, X_new):
+    """
+    Update a fitted ColumnTransformer with the statistics of new rows.
+
+    Args:
+        preprocessor (sklearn.compose.ColumnTransformer): Fitted 'num' StandardScaler + 'cat' OneHotEncoder
+        X_new (pandas.DataFrame): New rows
+
+    Returns:
+        tuple: (updated ColumnTransformer, numpy.ndarray mapping old to new output feature indices)
+    """
+    transformers = {name: (transformer, columns) for name, transformer, columns in preprocessor.transformers_}
+    scaler, numeric_columns = transformers['num']
+    encoder, categorical_columns = transformers['cat']
+
+    # Streaming update of the running mean and variance
+    scaler = copy.deepcopy(scaler)
+    scaler.partial_fit(X_new[numeric_columns])
+
+    # Append new categories after the known ones, so each known category keeps its position in its block
+    categories = []
+    for col, known in zip(categorical_columns, encoder.categories_):
+        known = list(known)
+        seen = set(known)
+        added = [value for value in pd.unique(X_new[col]) if value not in seen]
+        categories.append(known + added)
+
+    updated = assemble_preprocessor(
+        scaler, numeric_columns, categorical_columns, categories, preprocessor.sparse_output_
+    )
+
+    index_map = np.arange(len(numeric_columns)).tolist()
+    offset = len(numeric_columns)
+    for known, extended in zip(encoder.categories_, categories):
+        index_map.extend(range(offset, offset + len(known)))
+        offset += len(extended)
+    return updated, np.asarray(index_map)
+
+
+def remap_booster(booster, index_map, old_scaler, new_scaler, n_features):
+    """
+    Rewrite a booster's trees for an updated preprocessor.
+
+    Args:
+        booster (xgboost.Booster): Booster trained on the old encoding
+        index_map (numpy.ndarray): Old to new feature index, from extend_preprocessor
+        old_scaler (sklearn.preprocessing.StandardScaler): Scaler the booster was trained with
+        new_scaler (sklearn.preprocessing.StandardScaler): Updated scaler
+        n_features (int): Number of features in the new encoding
+
+    Returns:
+        xgboost.Booster: Booster that scores the new encoding like the old one scored the old encoding
+    """
+    import xgboost as xgb
+
+    model = json.loads(booster.save_raw('json'))
+    learner = model['learner']
+    learner['learner_model_param']['num_feature'] = str(n_features)
+
+    n_numeric = len(old_scaler.mean_)
+    for tree in learner['gradient_booster']['model']['trees']:
+        tree['tree_param']['num_feature'] = str(n_features)
+        indices, conditions = tree['split_indices'], tree['split_conditions']
+        for node, left_child in enumerate(tree['left_children']):
+            if left_child == -1:
+                # Leaves store their value in split_conditions
+                continue
+            feature = indices[node]
+            if feature < n_numeric:
+                old = conditions[node]
+                raw = old * old_scaler.scale_[feature] + old_scaler.mean_[feature]
+                new = (raw - new_scaler.mean_[feature]) / new_scaler.scale_[feature]
+                # hist splits sit exactly on an observed value, which goes right (x < threshold goes left).
+                # The float32 round trip can land on either side of it, so move the threshold a few ulps down.
+                conditions[node] = float(new - THRESHOLD_TOLERANCE * max(abs(new), abs(old), 1.0))
+            indices[node] = int(index_map[feature])
+
+    remapped = xgb.Booster()
+    remapped.load_model(bytearray(json.dumps(model).encode('utf-8')))
+    return remapped
+
+
+def warm_start(pipeline, X_new, y_new, X_val, y_val, rounds=50, params=None):
+    """
+    Continue boosting an existing pipeline on new rows.
+
+    Args:
+        pipeline (sklearn.pipeline.Pipeline): Fitted preprocessor + XGBClassifier pipeline
+        X_new (pandas.DataFrame): New training rows
+        y_new (array-like): New training targets
+        X_val (pandas.DataFrame): Validation rows for early stopping
+        y_val (array-like): Validation targets
+        rounds (int): Maximum number of boosting rounds to add
+        params (dict): Extra XGBClassifier parameters
+
+    Returns:
+        sklearn.pipeline.Pipeline: The updated pipeline
+    """
+    import xgboost as xgb
+    from sklearn.pipeline import Pipeline
+
+    preprocessor = pipeline.named_steps['preprocessor']
+    classifier = pipeline.named_steps['classifier']
+
+    updated, index_map = extend_preprocessor(preprocessor, X_new)
+    X_new_encoded = updated.transform(X_new)
+
+    # Continue from the rounds the old model predicts with (early stopping)
+    start, end = classifier._get_iteration_range(None)
+    booster = classifier.get_booster()
+    if (start, end) != (0, 0):
+        booster = booster[start:end]
+    booster = remap_booster(
+        booster, index_map,
+        preprocessor.named_transformers_['num'], updated.named_transformers_['num'],
+        X_new_encoded.shape[1],
+    )
+
+    params = {**classifier.get_params(), **(params or {}), 'n_estimators': rounds, 'early_stopping_rounds': 10}
+    continued = xgb.XGBClassifier(**params)
+    continued.fit(X_new_encoded, y_new, eval_set=[(updated.transform(X_val), y_val)],
+                  xgb_model=booster, verbose=False)
+
+    return Pipeline(steps=[('preprocessor', updated), ('classifier', continued)])
+
+
+def full_retrain(X_train, y_train, X_val, y_val, numeric_features, categorical_features, params=None):
+    """
+    Train a pipeline from scratch, the way train_model.py does.
+
+    Returns:
+        sklearn.pipeline.Pipeline: The fitted pipeline
+    """
+    import xgboost as xgb
+    from sklearn.pipeline import Pipeline
+
+    preprocessor = make_preprocessor(numeric_features, categorical_features).fit(X_train)
+    classifier = xgb.XGBClassifier(eval_metric='logloss', early_stopping_rounds=10, **(params or {}))
+    classifier.fit(preprocessor.transform(X_train), y_train,
+                   eval_set=[(preprocessor.transform(X_val), y_val)], verbose=False)
+    return Pipeline(steps=[('preprocessor', preprocessor), ('classifier', classifier)])
+
+
+def prepare_new_data(csv_path, store_dir, base_manifest):
+    # Fill the new rows with the base data's statistics, so both are prepared identically
+    stats = scan(csv_path)
+    stats['fill_values'] = {**stats['fill_values'], **base_manifest['fill_values']}
+    write_store(csv_path, store_dir, stats=stats)
+    return load_store(store_dir, mmap_mode=None)
+
+
+def auc(pipeline, X, y):
+    from sklearn.metrics import roc_auc_score
+
+    return round(float(roc_auc_score(y, pipeline.predict_proba(X)[:, 1])), 5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--new-data', required=True, help='CSV with the new sessions, in the raw data format')
+    parser.add_argument('--base-store', default='data_splits', help='Split store the model was trained on')
+    parser.add_argument('--new-store', default='new_data_splits', help='Split store to prepare the new rows into')
+    parser.add_argument('--model', default='distraction_model.pkl')
+    parser.add_argument('--rounds', type=int, default=50, help='Maximum boosting rounds to add (default: 50)')
+    parser.add_argument('--params', help='JSON file with XGBoost parameters, e.g. tuning/best_params.json')
+    parser.add_argument('--output', default='distraction_model_incremental.pkl')
+    parser.add_argument('--report', default='retrain_report.json')
+    parser.add_argument('--skip-full', action='store_true', help='Skip the full retrain used for comparison')
+    args = parser.parse_args()
+
+    params = {}
+    if args.params:
+        with open(args.params) as f:
+            params = json.load(f)
+
+    base_manifest = read_store_manifest(args.base_store)
+    new = prepare_new_data(args.new_data, args.new_store, base_manifest)
+    with open(args.model, 'rb') as f:
+        pipeline = pickle.load(f)
+    print(f"New rows: {len(new['X_train'])} train, {len(new['X_val'])} validation, {len(new['X_test'])} test")
+
+    # Validate and test on old and new rows together, so forgetting the old data shows up
+    base = load_store(args.base_store, mmap_mode=None)
+    X_val = pd.concat([base['X_val'], new['X_val']], ignore_index=True)
+    y_val = np.concatenate([base['y_val'], new['y_val']])
+    X_test = pd.concat([base['X_test'], new['X_test']], ignore_index=True)
+    y_test = np.concatenate([base['y_test'], new['y_test']])
+
+    start = time.perf_counter()
+    incremental = warm_start(pipeline, new['X_train'], new['y_train'], X_val, y_val, args.rounds, params)
+    incremental_seconds = time.perf_counter() - start
+
+    report = {
+        'new_train_rows': len(new['X_train']),
+        'rounds_before': int(pipeline.named_steps['classifier']._get_iteration_range(None)[1]),
+        'rounds_after': int(incremental.named_steps['classifier']._get_iteration_range(None)[1]),
+        'incremental_seconds': round(incremental_seconds, 3),
+        'auc_before': auc(pipeline, X_test, y_test),
+        'auc_incremental': auc(incremental, X_test, y_test),
+        'auc_before_new_rows': auc(pipeline, new['X_test'], new['y_test']),
+        'auc_incremental_new_rows': auc(incremental, new['X_test'], new['y_test']),
+    }
+
+    if not args.skip_full:
+        start = time.perf_counter()
+        full = full_retrain(
+            pd.concat([base['X_train'], new['X_train']], ignore_index=True),
+            np.concatenate([base['y_train'], new['y_train']]),
+            X_val, y_val, base_manifest['numeric_features'], base_manifest['categorical_features'], params,
+        )
+        report['full_seconds'] = round(time.perf_counter() - start, 3)
+        report['auc_full'] = auc(full, X_test, y_test)
+        report['auc_full_new_rows'] = auc(full, new['X_test'], new['y_test'])
+        report['auc_drift_vs_full'] = round(report['auc_incremental'] - report['auc_full'], 5)
+        report['speedup_vs_full'] = round(report['full_seconds'] / incremental_seconds, 2)
+
+    with open(args.output, 'wb') as f:
+        pickle.dump(incremental, f)
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for key, value in report.items():
+        print(f"{key:<28} {value}")
+    print(f"\nUpdated model saved to '{args.output}'. The feature columns are unchanged; "
+          f"replace {os.path.basename(args.model)} with it to deploy.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+"""
+Shared serving layer for the distraction prediction API.
+
+Every entry point (BrainHack/app.py, BrainHack/app_cors_enabled.py,
+flask_app/app.py and flask_app/asgi_app.py) builds an InferenceService around
+DistractionPredictor and exposes it through create_app (Flask) or
+create_asgi_app (ASGI), so input handling, fast paths and error responses are
+implemented once.
+
+create_app is imported on first use, so the ASGI entry point starts without
+importing Flask.
+"""
+from serving.service import InferenceService, ModelNotReadyError
+from serving.asgi import create_asgi_app
+
+__all__ = ['InferenceService', 'ModelNotReadyError', 'create_app', 'create_asgi_app']
+
+
+def __getattr__(name):
+    if name == 'create_app':
+        from serving.flask_routes import create_app
+        return create_app
+    raise AttributeError(f"module 'serving' has no attribute '{name}'")
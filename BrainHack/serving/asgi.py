@@ -0,0 +1,222 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from latency_metrics import stage_timer
+from serving.payloads import (
+    PROMETHEUS_CONTENT_TYPE, parse_row, parse_rows, parse_explain_options, parse_focus_window_options, error_body,
+    batch_too_large_body,
+)
+from serving.service import error_response
+
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def send_body(send, body, content_type, status=200, headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type.encode()), (b'content-length', str(len(body)).encode()),
+                    *headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_json(send, payload, status=200, headers=()):
+    await send_body(send, json.dumps(payload).encode('utf-8'), 'application/json', status, headers)
+
+
+async def send_error(send, error, message):
+    body, status, headers = error_response(error, message)
+    await send_json(send, body, status, [(name.lower().encode(), value.encode()) for name, value in headers.items()])
+
+
+def header(scope, name):
+    headers = dict(scope['headers'])
+    return headers.get(name, b'').decode('latin-1')
+
+
+def content_type(scope):
+    return header(scope, b'content-type')
+
+
+def create_asgi_app(service, batcher=None):
+    """
+    Build a dependency-free ASGI app serving an InferenceService.
+
+    Args:
+        service (InferenceService): Service that scores the requests
+        batcher (MicroBatcher): Optional batcher around service.predict_batch; when given,
+            concurrent /predict requests are scored together in one model call
+
+    Returns:
+        callable: The ASGI application
+    """
+
+    async def predict(scope, receive, send):
+        with stage_timer(service.metrics, 'request_predict'):
+            try:
+                body = await read_body(receive)
+                with stage_timer(service.metrics, 'parse'):
+                    data = parse_row(content_type(scope), body)
+            except ValueError as e:
+                await send_error(send, e, 'The payload could not be parsed.')
+                return
+
+            try:
+                if batcher is not None:
+                    result = await batcher.submit(data)
+                else:
+                    result = await asyncio.get_running_loop().run_in_executor(None, service.predict, data)
+                await send_json(send, result)
+            except Exception as e:
+                await send_error(send, e, 'Check the feature values.')
+
+    async def predict_batch(scope, receive, send):
+        with stage_timer(service.metrics, 'request_predict_batch'):
+            try:
+                body = await read_body(receive)
+                with stage_timer(service.metrics, 'parse'):
+                    rows = parse_rows(content_type(scope), body)
+            except ValueError as e:
+                await send_error(send, e, 'The batch payload could not be parsed.')
+                return
+
+            if len(rows) > service.max_batch_size:
+                await send_json(send, batch_too_large_body(len(rows), service.max_batch_size), status=413)
+                return
+
+            try:
+                predictions = await asyncio.get_running_loop().run_in_executor(None, service.predict_batch, rows)
+                await send_json(send, {'predictions': predictions})
+            except Exception as e:
+                await send_error(send, e, 'Check the feature values of every row.')
+
+    async def explain(scope, receive, send, batch):
+        with stage_timer(service.metrics, 'request_explain_batch' if batch else 'request_explain'):
+            query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+            try:
+                top_k, approximate = parse_explain_options({key: values[0] for key, values in query.items()})
+                body = await read_body(receive)
+                payload = (parse_rows if batch else parse_row)(content_type(scope), body)
+            except ValueError as e:
+                await send_error(send, e, 'The payload or query could not be parsed.')
+                return
+
+            if batch and len(payload) > service.max_batch_size:
+                await send_json(send, batch_too_large_body(len(payload), service.max_batch_size), status=413)
+                return
+
+            try:
+                if batch:
+                    result = {'explanations': await asyncio.get_running_loop().run_in_executor(
+                        None, service.explain_batch, payload, top_k, approximate
+                    )}
+                else:
+                    result = await asyncio.get_running_loop().run_in_executor(
+                        None, service.explain, payload, top_k, approximate
+                    )
+                await send_json(send, result)
+            except Exception as e:
+                await send_error(send, e, 'Check the feature values.')
+
+    async def focus_windows(scope, receive, send):
+        with stage_timer(service.metrics, 'request_focus_windows'):
+            query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+            try:
+                options = parse_focus_window_options({key: values[0] for key, values in query.items()})
+                data = parse_row(content_type(scope), await read_body(receive))
+                result = await asyncio.get_running_loop().run_in_executor(
+                    None, service.focus_windows, data, *options
+                )
+                await send_json(send, result)
+            except Exception as e:
+                await send_error(send, e, 'Check the payload, the query parameters and the timestamp.')
+
+    async def admin_reload(scope, receive, send):
+        try:
+            body = await read_body(receive)
+            payload = json.loads(body) if body.strip() else {}
+            if not isinstance(payload, dict):
+                raise ValueError('Expected a JSON object')
+        except ValueError as e:
+            await send_json(send, error_body(e, 'The reload payload could not be parsed.'), status=400)
+            return
+
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        wait = query.get('wait', [''])[0].lower() in ('1', 'true', 'yes')
+        # A waiting reload loads the model, so keep it off the event loop
+        result, status = await asyncio.get_running_loop().run_in_executor(
+            None, service.admin_reload, header(scope, b'authorization'), payload, wait
+        )
+        await send_json(send, result, status=status)
+
+    async def ingest_events(scope, receive, send):
+        body = await read_body(receive)
+        # Appending waits for the group commit, so keep it off the event loop
+        result, status = await asyncio.get_running_loop().run_in_executor(
+            None, service.ingest_events, content_type(scope), body
+        )
+        await send_json(send, result, status, [(b'retry-after', b'1')] if status == 429 else ())
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    service.start()
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+
+        path, method = scope['path'], scope['method']
+        if path == '/predict' and method == 'POST':
+            await predict(scope, receive, send)
+        elif path == '/predict/batch' and method == 'POST':
+            await predict_batch(scope, receive, send)
+        elif path == '/explain' and method == 'POST':
+            await explain(scope, receive, send, batch=False)
+        elif path == '/explain/batch' and method == 'POST':
+            await explain(scope, receive, send, batch=True)
+        elif path == '/focus-windows' and method == 'POST':
+            await focus_windows(scope, receive, send)
+        elif path == '/health' and method == 'GET':
+            await send_json(send, *service.health())
+        elif path == '/metrics' and method == 'GET':
+            await send_body(send, service.render_metrics().encode('utf-8'), PROMETHEUS_CONTENT_TYPE)
+        elif path == '/events' and method == 'POST':
+            await ingest_events(scope, receive, send)
+        elif path.startswith('/features/') and method == 'GET':
+            await send_json(send, *service.user_features(path[len('/features/'):]))
+        elif path.startswith('/dashboard/') and method == 'GET':
+            query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+            await send_json(send, *service.dashboard_metrics(path[len('/dashboard/'):],
+                                                             query.get('timestamp', [None])[0]))
+        elif path == '/stats/dashboard' and method == 'GET':
+            await send_json(send, service.dashboard_stats())
+        elif path == '/stats/events' and method == 'GET':
+            await send_json(send, service.event_log_stats())
+        elif path == '/stats/features' and method == 'GET':
+            await send_json(send, service.feature_store_stats())
+        elif path == '/stats/cache' and method == 'GET':
+            await send_json(send, service.cache_stats())
+        elif path == '/stats/batcher' and method == 'GET' and batcher is not None:
+            await send_json(send, batcher.stats())
+        elif path == '/admin/reload' and method == 'POST':
+            await admin_reload(scope, receive, send)
+        elif path == '/admin/reload' and method == 'GET':
+            await send_json(send, *service.admin_reload_status(header(scope, b'authorization')))
+        else:
+            await send_json(send, {'error': 'Not found'}, status=404)
+
+    return app
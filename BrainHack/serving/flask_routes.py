@@ -0,0 +1,178 @@
+from flask import Flask, request, jsonify, render_template
+
+from latency_metrics import stage_timer
+from serving.payloads import (
+    PROMETHEUS_CONTENT_TYPE, parse_row, parse_rows, parse_explain_options, parse_focus_window_options,
+    batch_too_large_body,
+)
+from serving.service import error_response
+
+
+def error_reply(error, message):
+    body, status, headers = error_response(error, message)
+    return jsonify(body), status, headers
+
+
+def read_row():
+    # The same parser as the ASGI app, so a malformed body is a ValueError (400) in both
+    return parse_row(request.content_type or '', request.get_data())
+
+
+def create_app(service, template_folder=None):
+    """
+    Build the Flask app serving an InferenceService.
+
+    Entry points add their own extras (CORS, extra pages, worker stats) to the
+    returned app.
+
+    Args:
+        service (InferenceService): Service that scores the requests
+        template_folder (str): Absolute path of the folder holding index.html
+
+    Returns:
+        flask.Flask: The app
+    """
+    app = Flask(__name__, template_folder=template_folder)
+    app.config['INFERENCE_SERVICE'] = service
+
+    @app.before_request
+    def start_background_work():
+        # Once per process, so every gunicorn worker forked from a preloading master loads and watches too
+        service.start()
+
+    @app.route('/')
+    def home():
+        return render_template('index.html')
+
+    @app.route('/predict', methods=['POST'])
+    def predict():
+        with stage_timer(service.metrics, 'request_predict'):
+            try:
+                # Get data from form or JSON
+                with stage_timer(service.metrics, 'parse'):
+                    data = read_row()
+            except ValueError as e:
+                return error_reply(e, 'The payload could not be parsed.')
+
+            try:
+                result = service.predict(data)
+                with stage_timer(service.metrics, 'serialize'):
+                    return jsonify(result)
+            except Exception as e:
+                return error_reply(e, 'Check the feature values.')
+
+    @app.route('/predict/batch', methods=['POST'])
+    def predict_batch():
+        with stage_timer(service.metrics, 'request_predict_batch'):
+            try:
+                with stage_timer(service.metrics, 'parse'):
+                    rows = parse_rows(request.content_type or '', request.get_data())
+            except ValueError as e:
+                return error_reply(e, 'The batch payload could not be parsed.')
+
+            if len(rows) > service.max_batch_size:
+                return jsonify(batch_too_large_body(len(rows), service.max_batch_size)), 413
+
+            try:
+                predictions = service.predict_batch(rows)
+                with stage_timer(service.metrics, 'serialize'):
+                    return jsonify({'predictions': predictions})
+            except Exception as e:
+                return error_reply(e, 'Check the feature values of every row.')
+
+    @app.route('/explain', methods=['POST'])
+    def explain():
+        with stage_timer(service.metrics, 'request_explain'):
+            try:
+                top_k, approximate = parse_explain_options(request.args.to_dict())
+                data = read_row()
+            except ValueError as e:
+                return error_reply(e, 'The payload or query could not be parsed.')
+
+            try:
+                return jsonify(service.explain(data, top_k, approximate))
+            except Exception as e:
+                return error_reply(e, 'Check the feature values.')
+
+    @app.route('/explain/batch', methods=['POST'])
+    def explain_batch():
+        with stage_timer(service.metrics, 'request_explain_batch'):
+            try:
+                top_k, approximate = parse_explain_options(request.args.to_dict())
+                rows = parse_rows(request.content_type or '', request.get_data())
+            except ValueError as e:
+                return error_reply(e, 'The batch payload or query could not be parsed.')
+
+            if len(rows) > service.max_batch_size:
+                return jsonify(batch_too_large_body(len(rows), service.max_batch_size)), 413
+
+            try:
+                return jsonify({'explanations': service.explain_batch(rows, top_k, approximate)})
+            except Exception as e:
+                return error_reply(e, 'Check the feature values.')
+
+    @app.route('/focus-windows', methods=['POST'])
+    def focus_windows():
+        with stage_timer(service.metrics, 'request_focus_windows'):
+            try:
+                days, window_hours, top_k = parse_focus_window_options(request.args.to_dict())
+                data = read_row()
+                return jsonify(service.focus_windows(data, days, window_hours, top_k))
+            except Exception as e:
+                return error_reply(e, 'Check the payload, the query parameters and the timestamp.')
+
+    @app.route('/health', methods=['GET'])
+    def health_check():
+        body, status = service.health()
+        return jsonify(body), status
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return service.render_metrics(), 200, {'Content-Type': PROMETHEUS_CONTENT_TYPE}
+
+    @app.route('/events', methods=['POST'])
+    def ingest_events():
+        body, status = service.ingest_events(request.content_type or '', request.get_data())
+        return jsonify(body), status, {'Retry-After': '1'} if status == 429 else {}
+
+    @app.route('/features/<user_id>', methods=['GET'])
+    def user_features(user_id):
+        body, status = service.user_features(user_id)
+        return jsonify(body), status
+
+    @app.route('/dashboard/<user_id>', methods=['GET'])
+    def dashboard_metrics(user_id):
+        body, status = service.dashboard_metrics(user_id, request.args.get('timestamp'))
+        return jsonify(body), status
+
+    @app.route('/stats/dashboard', methods=['GET'])
+    def dashboard_stats():
+        return jsonify(service.dashboard_stats())
+
+    @app.route('/stats/events', methods=['GET'])
+    def event_log_stats():
+        return jsonify(service.event_log_stats())
+
+    @app.route('/stats/features', methods=['GET'])
+    def feature_store_stats():
+        return jsonify(service.feature_store_stats())
+
+    @app.route('/stats/cache', methods=['GET'])
+    def cache_stats():
+        return jsonify(service.cache_stats())
+
+    @app.route('/admin/reload', methods=['POST'])
+    def admin_reload():
+        body, status = service.admin_reload(
+            request.headers.get('Authorization'),
+            request.get_json(silent=True) or {},
+            wait=request.args.get('wait', '').lower() in ('1', 'true', 'yes'),
+        )
+        return jsonify(body), status
+
+    @app.route('/admin/reload', methods=['GET'])
+    def admin_reload_status():
+        body, status = service.admin_reload_status(request.headers.get('Authorization'))
+        return jsonify(body), status
+
+    return app
@@ -0,0 +1,166 @@
+import hashlib
+import math
+import os
+import threading
+import time
+
+
+class CanaryError(ValueError):
+    """Raised when a candidate model fails validation on the canary rows."""
+
+
+def _artifact_files(path):
+    # A model bundle is a directory; hash and watch every file in it
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+        )
+    return [path]
+
+
+def model_version(model_path, feature_columns_path):
+    """
+    Identify a model artifact by the content of its files.
+
+    Args:
+        model_path (str): Model pickle or bundle directory
+        feature_columns_path (str): Feature columns pickle (ignored for bundles)
+
+    Returns:
+        str: First 12 hex digits of a SHA-256 over the artifact files
+    """
+    paths = _artifact_files(model_path)
+    if not os.path.isdir(model_path):
+        paths.append(feature_columns_path)
+
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def artifact_signature(model_path, feature_columns_path):
+    """
+    Cheap change detector for the watcher: modification time and size of every artifact file.
+
+    Returns:
+        tuple: Signature that changes when any file is replaced or rewritten (None for missing files)
+    """
+    paths = _artifact_files(model_path)
+    if not os.path.isdir(model_path):
+        paths.append(feature_columns_path)
+
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+def validate_predictor(candidate, canary_rows, current=None, max_shift=None):
+    """
+    Score the canary rows with a candidate predictor before it serves traffic.
+
+    The candidate must score every row, in one batch and one row on its own,
+    with finite risk percentages between 0 and 100. When the current predictor
+    is given, the mean absolute change in risk percentage is reported, and the
+    candidate is rejected when it exceeds max_shift.
+
+    Args:
+        candidate (DistractionPredictor): Newly loaded predictor
+        canary_rows (list of dict): Representative input rows
+        current (DistractionPredictor): Predictor serving traffic now
+        max_shift (float): Largest accepted mean absolute change, in percentage points
+
+    Returns:
+        dict: Number of rows checked and the mean/max absolute change
+
+    Raises:
+        CanaryError: If the candidate fails any check
+    """
+    report = {'rows': len(canary_rows)}
+    if not canary_rows:
+        return report
+
+    try:
+        results = candidate.predict_batch(canary_rows)
+        single = candidate.predict_with_recommendations(canary_rows[0])
+    except Exception as e:
+        raise CanaryError(f'Candidate model failed to score the canary rows: {e}') from e
+
+    risks = [result['risk_percentage'] for result in results]
+    if len(risks) != len(canary_rows):
+        raise CanaryError(f'Candidate model returned {len(risks)} results for {len(canary_rows)} canary rows')
+    if not all(math.isfinite(risk) and 0 <= risk <= 100 for risk in risks):
+        raise CanaryError('Candidate model returned risk percentages outside 0-100')
+    if abs(single['risk_percentage'] - risks[0]) > 0.01:
+        raise CanaryError('Candidate model scores a single row differently from the same row in a batch')
+
+    if current is not None:
+        previous = [result['risk_percentage'] for result in current.predict_batch(canary_rows)]
+        shifts = [abs(new - old) for new, old in zip(risks, previous)]
+        report['mean_shift'] = round(sum(shifts) / len(shifts), 3)
+        report['max_shift'] = round(max(shifts), 3)
+        if max_shift is not None and report['mean_shift'] > max_shift:
+            raise CanaryError(
+                f"Mean risk change of {report['mean_shift']} points on the canary rows exceeds {max_shift}"
+            )
+    return report
+
+
+class ModelWatcher:
+    """
+    Reload the service whenever its model files change on disk.
+
+    Polls the modification time and size of the model files from a daemon
+    thread. Threads do not survive fork, so start() is cheap to call on every
+    request and starts the thread once per process (e.g. once per gunicorn
+    worker after a preloading master forked it).
+    """
+
+    def __init__(self, service, interval):
+        """
+        Args:
+            service (InferenceService): Service to reload
+            interval (float): Seconds between checks
+        """
+        self.service = service
+        self.interval = interval
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='model-watcher', daemon=True).start()
+
+    def _signature(self):
+        predictor = self.service.predictor
+        return artifact_signature(predictor.model_path, predictor.feature_columns_path)
+
+    def _run(self):
+        seen = self._signature()
+        while True:
+            time.sleep(self.interval)
+            signature = self._signature()
+            if signature == seen:
+                continue
+            # A failed reload is not retried until the files change again, and a reload
+            # that already switched to other paths (/admin/reload) needs no second one
+            changed_paths = [entry[0] for entry in signature] != [entry[0] for entry in seen]
+            seen = signature
+            if changed_paths:
+                continue
+            try:
+                self.service.reload()
+            except Exception:
+                pass
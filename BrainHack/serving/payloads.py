@@ -0,0 +1,96 @@
+import json
+from urllib.parse import parse_qsl
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def parse_row(content_type, body):
+    """
+    Parse a single-row request body.
+
+    Args:
+        content_type (str): Request content type
+        body (bytes): Raw request body
+
+    Returns:
+        dict: Input row from a JSON object or URL-encoded form
+    """
+    if content_type.startswith('application/json'):
+        row = json.loads(body)
+    else:
+        row = dict(parse_qsl(body.decode('utf-8')))
+
+    if not isinstance(row, dict):
+        raise ValueError('Expected a JSON object or form data')
+    return row
+
+
+def parse_rows(content_type, body):
+    """
+    Parse a batch request body.
+
+    Args:
+        content_type (str): Request content type
+        body (bytes): Raw request body
+
+    Returns:
+        list: Input rows from a JSON array or an NDJSON body (one object per line)
+    """
+    if content_type.startswith('application/json'):
+        rows = json.loads(body)
+    else:
+        rows = [json.loads(line) for line in body.decode('utf-8').splitlines() if line.strip()]
+
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError('Expected a JSON array or NDJSON stream of objects')
+    return rows
+
+
+def _positive_int(query, name, default):
+    try:
+        value = int(query.get(name, default))
+    except ValueError:
+        raise ValueError(f'{name} must be an integer') from None
+    if value < 1:
+        raise ValueError(f'{name} must be at least 1')
+    return value
+
+
+def parse_explain_options(query):
+    """
+    Parse the query parameters of /explain and /explain/batch.
+
+    Args:
+        query (dict): Query parameters as strings
+
+    Returns:
+        tuple: (top_k, approximate)
+    """
+    return _positive_int(query, 'top_k', 5), query.get('approximate', '').lower() in ('1', 'true', 'yes')
+
+
+def parse_focus_window_options(query):
+    """
+    Parse the query parameters of /focus-windows.
+
+    Args:
+        query (dict): Query parameters as strings
+
+    Returns:
+        tuple: (days, window_hours, top_k)
+    """
+    return _positive_int(query, 'days', 1), _positive_int(query, 'window_hours', 2), _positive_int(query, 'top_k', 3)
+
+
+def error_body(error, message='An error occurred while processing your request.'):
+    return {
+        'error': str(error),
+        'message': message
+    }
+
+
+def batch_too_large_body(size, max_batch_size):
+    return error_body(
+        f'Batch of {size} rows exceeds the maximum batch size of {max_batch_size}',
+        'Split the batch into smaller requests.'
+    )
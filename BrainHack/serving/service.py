@@ -0,0 +1,679 @@
+import functools
+import hmac
+import os
+import threading
+import time
+
+from dashboard_store import DashboardStore
+from event_log import EventLog, EventLogFull, parse_event
+from feature_store import FeatureStore
+from focus_windows import best_focus_windows
+from latency_metrics import LatencyMetrics
+from predictor import DistractionPredictor
+from serving.model_reload import ModelWatcher, model_version, validate_predictor
+from serving.payloads import error_body, parse_rows
+from synthetic_data import make_rows
+
+# Synthetic canary rows generated from the first model when no CANARY_PATH is given
+DEFAULT_CANARY_ROWS = 32
+
+
+def env_flag(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes')
+
+
+class ModelNotReadyError(RuntimeError):
+    """
+    Raised when a request cannot be scored because the model has not finished loading.
+    """
+
+
+def error_response(error, message):
+    """
+    Map an error raised while parsing or scoring a request to a response.
+
+    Every entry point answers through this, so the same input gets the same
+    status whichever app serves it. A ValueError is the client's fault: a body,
+    query or feature value that cannot be parsed.
+
+    Args:
+        error (Exception): The error
+        message (str): Message for a bad request
+
+    Returns:
+        tuple: (body, status, headers)
+    """
+    if isinstance(error, ModelNotReadyError):
+        return error_body(error, 'Retry shortly.'), 503, {'Retry-After': '1'}
+    if isinstance(error, ValueError):
+        return error_body(error, message), 400, {}
+    return error_body(error), 500, {}
+
+
+class InferenceService:
+    """
+    The prediction service behind every HTTP entry point.
+
+    Wraps a DistractionPredictor configured with the fast paths that are
+    enabled (compiled inference, prediction cache); request batching is added
+    by the ASGI entry point with a MicroBatcher around predict_batch.
+
+    The model can be loaded on a background thread (BACKGROUND_MODEL_LOAD), so
+    the server accepts connections right away: /health reports 'loading'
+    with a 503 until the model is ready, and prediction requests wait for it
+    for up to load_timeout seconds.
+
+    With a FeatureStore, raw user events posted to /events are aggregated
+    server-side, and requests carrying a user_id get the user's rolling
+    features filled in where they do not send them. With a DashboardStore,
+    the focus sessions and breaks among them keep the productivity
+    dashboard's metrics up to date.
+
+    The predictor can be replaced while serving (reload): a new one is loaded
+    and validated on canary rows next to the current one, then swapped in
+    with a single reference assignment. Requests already running keep the
+    predictor they started with, so nothing blocks or fails during a reload.
+    """
+
+    def __init__(self, predictor=None, canary_rows=None, max_canary_shift=None, admin_token=None,
+                 watch_interval=0, loader=None, load_timeout=30.0, max_batch_size=1000, feature_store=None,
+                 snapshot_interval=60.0, event_log=None, max_events=10000, dashboard=None):
+        """
+        Args:
+            predictor (DistractionPredictor): Loaded predictor (None when loader is given)
+            canary_rows (list of dict): Rows every reloaded model must score (default: synthetic
+                rows from the predictor's model, none for model bundles)
+            max_canary_shift (float): Reject reloaded models whose mean risk on the canary rows
+                moves by more than this many percentage points (None: no limit)
+            admin_token (str): Token required by the /admin endpoints (None disables them)
+            watch_interval (float): Seconds between checks of the model files for changes (0 disables)
+            loader (callable): Returns the predictor; called on a background thread by start()
+            load_timeout (float): Seconds a request waits for a background load before failing
+            max_batch_size (int): Batch size limit reported until the predictor is loaded
+            feature_store (FeatureStore): Per-user rolling features filled into requests with a
+                user_id (None disables /events and the filling)
+            snapshot_interval (float): Seconds between feature store snapshots (0 disables)
+            event_log (EventLog): Write-ahead log /events appends to before the events reach the
+                feature store (None: events go straight to the feature store)
+            max_events (int): Maximum number of events accepted by one /events request
+            dashboard (DashboardStore): Rollups of the productivity dashboard metrics, updated from
+                /events (None disables /dashboard)
+        """
+        self.predictor = None
+        self.model_version = None
+        self.loaded_at = None
+        self.load_seconds = None
+        self.load_error = None
+        self.canary_rows = canary_rows
+        self.max_canary_shift = max_canary_shift
+        self.admin_token = admin_token
+        self.last_reload = None
+        self.loader = loader
+        self.load_timeout = load_timeout
+        self._max_batch_size = max_batch_size
+        self.feature_store = feature_store
+        # Set once the model is loaded or its background load failed
+        self._load_finished = threading.Event()
+        self._load_lock = threading.Lock()
+        self._loader_pid = None
+        self._reload_lock = threading.Lock()
+        self.watcher = ModelWatcher(self, watch_interval) if watch_interval > 0 else None
+        self.snapshot_interval = snapshot_interval
+        self.event_log = event_log
+        self.event_log_error = None
+        self.max_events = max_events
+        self.dashboard = dashboard
+        if event_log is not None and feature_store is not None:
+            event_log.subscribe(feature_store.apply, position=lambda: feature_store.last_seq)
+        if event_log is not None and dashboard is not None:
+            event_log.subscribe(dashboard.apply, position=lambda: dashboard.last_seq)
+        if predictor is not None:
+            self._install(predictor)
+
+    @classmethod
+    def from_env(cls, model_path, feature_columns_path, compiled=False):
+        """
+        Build the service from environment variables.
+
+        MODEL_PATH and FEATURE_COLUMNS_PATH override the given paths and
+        MODEL_RUNTIME picks the runtime for model bundles ('xgboost', 'onnx'
+        or 'numpy'); COMPILED_INFERENCE, MAX_BATCH_SIZE, PREDICTION_CACHE_SIZE
+        and PREDICTION_CACHE_TTL configure the fast paths, and LATENCY_METRICS
+        (default true) enables the per-stage timings served on /metrics.
+        BACKGROUND_MODEL_LOAD loads the model on a background thread and
+        MODEL_LOAD_TIMEOUT bounds how long requests wait for it.
+        FEATURE_STORE enables the per-user feature store, FEATURE_STORE_PATH
+        persists it to a SQLite file every FEATURE_STORE_SNAPSHOT_INTERVAL
+        seconds (default 60). EVENT_LOG_DIR puts a write-ahead log in front of
+        it, bounded by EVENT_LOG_MAX_PENDING events (EVENT_LOG_FSYNC, default
+        true, syncs each group commit); MAX_EVENTS_PER_REQUEST limits /events.
+        DASHBOARD_DB keeps the dashboard rollups in that SQLite file.
+        Hot reload is configured with ADMIN_TOKEN, MODEL_WATCH_INTERVAL,
+        CANARY_PATH (JSON array or NDJSON file of input rows) and
+        MAX_CANARY_SHIFT.
+
+        Args:
+            model_path (str): Default model pickle or bundle path (relative paths are
+                resolved against the BrainHack directory, like DistractionPredictor)
+            feature_columns_path (str): Default feature columns pickle path
+            compiled (bool): Default for COMPILED_INFERENCE
+
+        Returns:
+            InferenceService: The configured service
+        """
+        # Overrides are relative to the working directory, defaults to the predictor module
+        if 'MODEL_PATH' in os.environ:
+            model_path = os.path.abspath(os.environ['MODEL_PATH'])
+        if 'FEATURE_COLUMNS_PATH' in os.environ:
+            feature_columns_path = os.path.abspath(os.environ['FEATURE_COLUMNS_PATH'])
+
+        max_batch_size = int(os.environ.get('MAX_BATCH_SIZE', 1000))
+        loader = functools.partial(
+            DistractionPredictor,
+            model_path,
+            feature_columns_path,
+            max_batch_size=max_batch_size,
+            compiled=env_flag('COMPILED_INFERENCE', compiled),
+            runtime=os.environ.get('MODEL_RUNTIME', 'xgboost'),
+            cache_size=int(os.environ.get('PREDICTION_CACHE_SIZE', 0)),
+            cache_ttl=float(os.environ.get('PREDICTION_CACHE_TTL', 60)),
+            metrics=LatencyMetrics() if env_flag('LATENCY_METRICS', True) else None,
+        )
+
+        canary_rows = None
+        canary_path = os.environ.get('CANARY_PATH')
+        if canary_path:
+            content_type = 'application/x-ndjson' if canary_path.endswith('.ndjson') else 'application/json'
+            with open(canary_path, 'rb') as f:
+                canary_rows = parse_rows(content_type, f.read())
+        max_canary_shift = os.environ.get('MAX_CANARY_SHIFT')
+        background = env_flag('BACKGROUND_MODEL_LOAD', False)
+        feature_store_path = os.environ.get('FEATURE_STORE_PATH') or None
+        feature_store = (
+            FeatureStore(os.path.abspath(feature_store_path) if feature_store_path else None)
+            if feature_store_path or env_flag('FEATURE_STORE', False) else None
+        )
+        dashboard_path = os.environ.get('DASHBOARD_DB') or None
+        event_log_dir = os.environ.get('EVENT_LOG_DIR') or None
+        event_log = EventLog(
+            os.path.abspath(event_log_dir),
+            max_pending=int(os.environ.get('EVENT_LOG_MAX_PENDING', 100000)),
+            fsync=env_flag('EVENT_LOG_FSYNC', True),
+        ) if event_log_dir else None
+        service = cls(
+            None if background else loader(),
+            canary_rows=canary_rows,
+            max_canary_shift=float(max_canary_shift) if max_canary_shift else None,
+            admin_token=os.environ.get('ADMIN_TOKEN') or None,
+            watch_interval=float(os.environ.get('MODEL_WATCH_INTERVAL', 0)),
+            loader=loader if background else None,
+            load_timeout=float(os.environ.get('MODEL_LOAD_TIMEOUT', 30)),
+            max_batch_size=max_batch_size,
+            feature_store=feature_store,
+            snapshot_interval=float(os.environ.get('FEATURE_STORE_SNAPSHOT_INTERVAL', 60)),
+            event_log=event_log,
+            max_events=int(os.environ.get('MAX_EVENTS_PER_REQUEST', 10000)),
+            dashboard=DashboardStore(os.path.abspath(dashboard_path)) if dashboard_path else None,
+        )
+        if background:
+            # Start loading now; a process forked before the load finished restarts it in start()
+            service.start_loading()
+        return service
+
+    def _install(self, predictor):
+        # Make a loaded predictor the serving one
+        if self.canary_rows is None:
+            self.canary_rows = (
+                make_rows(predictor.model, predictor.feature_columns, DEFAULT_CANARY_ROWS)
+                if predictor.model is not None else []
+            )
+        self.model_version = model_version(predictor.model_path, predictor.feature_columns_path)
+        self.loaded_at = time.time()
+        self.predictor = predictor
+        self._load_finished.set()
+
+    def _load_in_background(self):
+        started = time.perf_counter()
+        try:
+            predictor = self.loader()
+        except Exception as e:
+            self.load_error = str(e)
+            print(f"Error loading model: {e}")
+            self._load_finished.set()
+            return
+        self.load_seconds = round(time.perf_counter() - started, 3)
+        self._install(predictor)
+
+    @property
+    def ready(self):
+        return self.predictor is not None
+
+    def start(self):
+        """
+        Start this process's background work (idempotent, called before every request).
+
+        Starts the background model load (start_loading), the model watcher
+        once the model is loaded, the feature store snapshots and the event
+        log writer. Threads do not survive a fork, so gunicorn workers forked
+        from a preloading master start their own.
+        """
+        if self.feature_store is not None:
+            self.feature_store.start_snapshots(self.snapshot_interval)
+        if self.event_log is not None and self.event_log_error is None:
+            try:
+                self.event_log.start()
+            except (OSError, RuntimeError) as e:
+                self.event_log_error = str(e)
+                print(f"Event log unavailable: {e}")
+        if self.ready:
+            self.start_watcher()
+        else:
+            self.start_loading()
+
+    def start_loading(self):
+        """
+        Start the background model load, unless the model is loaded or a load is running in this process.
+        """
+        if self.ready or self.loader is None:
+            return
+        with self._load_lock:
+            if self._loader_pid == os.getpid():
+                return
+            self._loader_pid = os.getpid()
+        threading.Thread(target=self._load_in_background, name='model-load', daemon=True).start()
+
+    def wait_until_ready(self, timeout=None):
+        """
+        Wait for the model to be loaded.
+
+        Args:
+            timeout (float): Seconds to wait (default: load_timeout)
+
+        Returns:
+            DistractionPredictor: The serving predictor
+        """
+        self._load_finished.wait(self.load_timeout if timeout is None else timeout)
+        predictor = self.predictor
+        if predictor is None:
+            if self.load_error is not None:
+                raise ModelNotReadyError(f'The model failed to load: {self.load_error}')
+            raise ModelNotReadyError('The model is still loading')
+        return predictor
+
+    @property
+    def max_batch_size(self):
+        predictor = self.predictor
+        return predictor.max_batch_size if predictor is not None else self._max_batch_size
+
+    @property
+    def metrics(self):
+        # Shared with the predictor, so HTTP and model stages land in one registry (none while loading)
+        predictor = self.predictor
+        return predictor.metrics if predictor is not None else None
+
+    def predict(self, data):
+        """
+        Score one input row.
+
+        Args:
+            data (dict): Input row
+
+        Returns:
+            dict: Dictionary containing risk_percentage, recommendation, and alternative
+        """
+        if self.feature_store is not None:
+            data = self.feature_store.fill(data)
+        return self.wait_until_ready().predict_with_recommendations(data)
+
+    def predict_batch(self, rows):
+        """
+        Score many input rows with one model call.
+
+        Args:
+            rows (list of dict): Input rows
+
+        Returns:
+            list: One result dict per row
+        """
+        if self.feature_store is not None:
+            rows = [self.feature_store.fill(row) for row in rows]
+        return self.wait_until_ready().predict_batch(rows)
+
+    def explain(self, data, top_k=5, approximate=False):
+        """
+        Score one input row and explain the score by its top drivers.
+
+        Args:
+            data (dict): Input row
+            top_k (int): Number of drivers to return
+            approximate (bool): Use the Saabas approximation instead of exact TreeSHAP
+
+        Returns:
+            dict: The /predict fields plus base_value and drivers
+        """
+        if self.feature_store is not None:
+            data = self.feature_store.fill(data)
+        return self.wait_until_ready().explain(data, top_k, approximate)
+
+    def explain_batch(self, rows, top_k=5, approximate=False):
+        """
+        Explain many input rows with one booster call.
+
+        Args:
+            rows (list of dict): Input rows
+            top_k (int): Number of drivers to return per row
+            approximate (bool): Use the Saabas approximation instead of exact TreeSHAP
+
+        Returns:
+            list: One explanation dict per row
+        """
+        if self.feature_store is not None:
+            rows = [self.feature_store.fill(row) for row in rows]
+        return self.wait_until_ready().explain(rows, top_k, approximate)
+
+    def focus_windows(self, data, days=1, window_hours=2, top_k=3):
+        """
+        Score every hour of the coming days for one user context with one model call.
+
+        Args:
+            data (dict): Input row describing the user now
+            days (int): Days to look ahead (1 to 7)
+            window_hours (int): Length of a window in hours
+            top_k (int): Maximum number of windows
+
+        Returns:
+            dict: Risk curve and the lowest-risk windows, as returned by best_focus_windows
+        """
+        if self.feature_store is not None:
+            # Fill the rolling features once, as of now: the candidates only move the time fields
+            data = self.feature_store.fill(data)
+        return best_focus_windows(self.wait_until_ready(), data, days, window_hours, top_k)
+
+    def health(self):
+        """
+        Get the health check response.
+
+        Returns:
+            tuple: (service status, HTTP status: 200 once the model is loaded, 503 before)
+        """
+        if self.ready:
+            return {
+                'status': 'healthy',
+                'message': 'The API is running correctly',
+                'model': self.model_info()
+            }, 200
+        if self.load_error is not None:
+            return {'status': 'unhealthy', 'message': f'The model failed to load: {self.load_error}'}, 503
+        return {'status': 'loading', 'message': 'The model is loading'}, 503
+
+    def model_info(self):
+        """
+        Describe the model currently serving traffic.
+
+        Returns:
+            dict: Content version, model path, load time (UTC, ISO 8601) and, for
+                background loads, how long loading took
+        """
+        return {
+            'version': self.model_version,
+            'path': self.predictor.model_path,
+            'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.loaded_at)),
+            'load_seconds': self.load_seconds
+        }
+
+    def start_watcher(self):
+        """
+        Start watching the model files in this process, if MODEL_WATCH_INTERVAL is set (idempotent).
+        """
+        if self.watcher is not None:
+            self.watcher.start()
+
+    def _load_predictor(self, model_path, feature_columns_path):
+        # Same settings as the current predictor; the cache starts empty and metrics are shared
+        current = self.predictor
+        return DistractionPredictor(
+            model_path,
+            feature_columns_path,
+            max_batch_size=current.max_batch_size,
+            compiled=current.compiled,
+            runtime=current.runtime,
+            cache_size=current.cache.max_size if current.cache is not None else 0,
+            cache_ttl=current.cache.ttl_seconds if current.cache is not None else 60.0,
+            metrics=current.metrics,
+        )
+
+    def reload(self, model_path=None, feature_columns_path=None):
+        """
+        Load a model next to the current one, validate it on the canary rows and swap it in.
+
+        Reloads run one at a time. On failure the current model keeps serving.
+
+        Args:
+            model_path (str): New model pickle or bundle (default: reload the current path)
+            feature_columns_path (str): New feature columns pickle (default: the current path)
+
+        Returns:
+            dict: Reload status ('succeeded' or 'failed'), also kept in last_reload
+        """
+        with self._reload_lock:
+            current = self.predictor
+            model_path = os.path.abspath(model_path) if model_path else current.model_path
+            feature_columns_path = (
+                os.path.abspath(feature_columns_path) if feature_columns_path else current.feature_columns_path
+            )
+            status = {
+                'state': 'loading',
+                'model_path': model_path,
+                'previous_version': self.model_version,
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            }
+            self.last_reload = status
+            started = time.perf_counter()
+            try:
+                version = model_version(model_path, feature_columns_path)
+                candidate = self._load_predictor(model_path, feature_columns_path)
+                status['canary'] = validate_predictor(candidate, self.canary_rows, current, self.max_canary_shift)
+            except Exception as e:
+                status.update(state='failed', error=str(e), seconds=round(time.perf_counter() - started, 3))
+                return status
+
+            # Swap: requests read self.predictor once, so they see either the old or the new model
+            self.predictor = candidate
+            self.model_version = version
+            self.loaded_at = time.time()
+            status.update(state='succeeded', version=version, seconds=round(time.perf_counter() - started, 3))
+            return status
+
+    def reload_in_background(self, model_path=None, feature_columns_path=None):
+        """
+        Start a reload on a background thread.
+
+        Returns:
+            bool: False if another reload is already running
+        """
+        if self._reload_lock.locked():
+            return False
+        threading.Thread(
+            target=self.reload, args=(model_path, feature_columns_path), name='model-reload', daemon=True
+        ).start()
+        return True
+
+    def authorized(self, authorization):
+        """
+        Check an Authorization header against ADMIN_TOKEN.
+
+        Args:
+            authorization (str): Header value, 'Bearer <token>'
+
+        Returns:
+            bool: True if the admin endpoints are enabled and the token matches
+        """
+        if not self.admin_token or not authorization:
+            return False
+        scheme, _, token = authorization.partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(token.strip(), self.admin_token)
+
+    def admin_reload(self, authorization, payload, wait=False):
+        """
+        Handle POST /admin/reload for both the Flask and the ASGI app.
+
+        Args:
+            authorization (str): Authorization header value
+            payload (dict): Optional 'model_path' and 'feature_columns_path'
+            wait (bool): Reload before responding instead of in the background
+
+        Returns:
+            tuple: (response body, HTTP status)
+        """
+        if not self.authorized(authorization):
+            return error_body('Unauthorized', 'Set ADMIN_TOKEN and send it as a Bearer token.'), 401
+        if not self.ready:
+            return error_body('The model is still loading', 'Retry once GET /health reports healthy.'), 503
+
+        paths = (payload.get('model_path'), payload.get('feature_columns_path'))
+        if wait:
+            status = self.reload(*paths)
+            return status, 200 if status['state'] == 'succeeded' else 422
+        if not self.reload_in_background(*paths):
+            return error_body('A reload is already running', 'Poll GET /admin/reload for its result.'), 409
+        return {'state': 'loading', 'message': 'Poll GET /admin/reload for the result.'}, 202
+
+    def admin_reload_status(self, authorization):
+        """
+        Handle GET /admin/reload: the current model and the last reload.
+
+        Returns:
+            tuple: (response body, HTTP status)
+        """
+        if not self.authorized(authorization):
+            return error_body('Unauthorized', 'Set ADMIN_TOKEN and send it as a Bearer token.'), 401
+        return {'model': self.model_info() if self.ready else None, 'last_reload': self.last_reload}, 200
+
+    def ingest_events(self, content_type, body):
+        """
+        Handle POST /events for both the Flask and the ASGI app.
+
+        Events are validated before any is recorded, then appended to the event
+        log (when configured), which passes them on to the feature store and
+        the dashboard rollups.
+
+        Args:
+            content_type (str): Request content type
+            body (bytes): JSON array or NDJSON stream of events
+
+        Returns:
+            tuple: (response body, HTTP status; 429 when the event log is falling behind)
+        """
+        if self.event_log is None and self.feature_store is None and self.dashboard is None:
+            return error_body('Event ingestion is disabled',
+                              'Set EVENT_LOG_DIR, FEATURE_STORE, FEATURE_STORE_PATH or DASHBOARD_DB.'), 404
+        try:
+            events = [parse_event(event) for event in parse_rows(content_type, body)]
+        except ValueError as e:
+            return error_body(e, 'No events were recorded.'), 400
+        if len(events) > self.max_events:
+            return error_body(f'{len(events)} events exceed the limit of {self.max_events} per request',
+                              'Split the events into smaller requests.'), 413
+
+        if self.event_log is None:
+            for store in (self.feature_store, self.dashboard):
+                if store is not None:
+                    store.apply(events)
+            return {'accepted': len(events)}, 200
+        if self.event_log_error is not None:
+            return error_body(self.event_log_error, 'No events were recorded.'), 503
+        try:
+            last_seq = self.event_log.append(events)
+        except EventLogFull as e:
+            return error_body(e, 'The event log is falling behind, retry shortly.'), 429
+        except (OSError, TimeoutError) as e:
+            return error_body(e, 'The events may not have been recorded.'), 503
+        return {'accepted': len(events), 'last_seq': last_seq}, 200
+
+    def user_features(self, user_id):
+        """
+        Handle GET /features/<user_id>: the rolling features /predict would fill in now.
+
+        Returns:
+            tuple: (response body, HTTP status)
+        """
+        if self.feature_store is None:
+            return error_body('The feature store is disabled', 'Set FEATURE_STORE or FEATURE_STORE_PATH.'), 404
+        features = self.feature_store.features(user_id)
+        if features is None:
+            return error_body(f'No events for user {user_id}', 'Send events to POST /events first.'), 404
+        return {'user_id': user_id, 'features': features}, 200
+
+    def dashboard_metrics(self, user_id, timestamp=None):
+        """
+        Handle GET /dashboard/<user_id>: the productivity dashboard's metrics.
+
+        Args:
+            user_id (str): User id
+            timestamp (str): Time the windows end at (default: now)
+
+        Returns:
+            tuple: (response body, HTTP status)
+        """
+        if self.dashboard is None:
+            return error_body('The dashboard rollups are disabled', 'Set DASHBOARD_DB.'), 404
+        try:
+            metrics = self.dashboard.metrics(user_id, timestamp)
+        except ValueError as e:
+            return error_body(e, 'Send the timestamp as %Y-%m-%d %H:%M:%S or seconds since the epoch.'), 400
+        return {'user_id': user_id, **metrics}, 200
+
+    def dashboard_stats(self):
+        """
+        Get the dashboard rollup counters.
+
+        Returns:
+            dict: Dashboard store counters, or {'enabled': False} when it is off
+        """
+        if self.dashboard is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.dashboard.stats()}
+
+    def event_log_stats(self):
+        """
+        Get the event log counters.
+
+        Returns:
+            dict: Event log counters, or {'enabled': False} when it is off
+        """
+        if self.event_log is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.event_log.stats(), 'error': self.event_log_error}
+
+    def feature_store_stats(self):
+        """
+        Get the feature store counters.
+
+        Returns:
+            dict: Feature store counters, or {'enabled': False} when it is off
+        """
+        if self.feature_store is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.feature_store.stats()}
+
+    def cache_stats(self):
+        """
+        Get the prediction cache counters.
+
+        Returns:
+            dict: Cache counters, or {'enabled': False} when caching is off
+        """
+        if self.predictor is None or self.predictor.cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.predictor.cache.stats()}
+
+    def render_metrics(self):
+        """
+        Get the latency metrics in the Prometheus text format.
+
+        Returns:
+            str: Metrics text, empty when latency metrics are disabled
+        """
+        if self.metrics is None:
+            return ''
+        return self.metrics.render_prometheus()
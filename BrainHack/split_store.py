@@ -0,0 +1,350 @@
+"""
+Streaming, out-of-core preparation of the train/val/test splits.
+
+The raw CSV is read in chunks, twice:
+
+1. The first pass collects fill statistics in bounded memory: an approximate
+   median per numeric column (from a fixed-size uniform reservoir sample) and
+   an approximate mode per categorical column (Misra-Gries frequent values),
+   plus the number of rows each split will receive.
+2. The second pass fills, engineers and writes every chunk straight into
+   preallocated memory-mapped .npy files.
+
+Rows are assigned to train/val/test by a deterministic hash of their raw
+values, so splitting needs no in-memory shuffle and a row always lands in the
+same split, whichever chunk it arrives in.
+
+On disk, a split store is a directory:
+
+- manifest.json         format version, feature lists, fill values, category vocabularies,
+                        row counts and a digest of the data
+- <split>/<column>.npy  one column per file; numeric columns as float64,
+                        categorical columns as int32 codes into the vocabulary
+- <split>/y.npy         the target
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from features import add_engineered_features
+
+STORE_VERSION = 1
+
+SPLITS = ('train', 'val', 'test')
+# Percent of the hash space given to each split: 80% train, 10% validation, 10% test
+SPLIT_BOUNDS = (80, 90, 100)
+
+TARGET = 'fell_into_distraction'
+DROPPED_COLUMNS = ['distraction_duration_minutes']
+# Text columns are object dtype before pandas 3 and the string dtype from pandas 3 on
+TEXT_DTYPES = ['object', 'string']
+
+RESERVOIR_SIZE = 65536
+MAX_TRACKED_VALUES = 1024
+MANIFEST_FILE = 'manifest.json'
+
+
+def assign_splits(chunk, numeric_columns):
+    """
+    Assign each row to a split by a deterministic hash of its raw values.
+
+    Args:
+        chunk (pandas.DataFrame): Raw rows
+        numeric_columns (list): Numeric columns, hashed as float64 so the hash does not
+            depend on whether a chunk's column was parsed as int or float
+
+    Returns:
+        numpy.ndarray: Split index per row (0 = train, 1 = val, 2 = test)
+    """
+    chunk = chunk.astype({col: np.float64 for col in numeric_columns})
+    buckets = pd.util.hash_pandas_object(chunk, index=False).to_numpy() % 100
+    return np.searchsorted(SPLIT_BOUNDS, buckets, side='right')
+
+
+class ReservoirMedian:
+    """
+    Approximate median from a uniform random sample of bounded size.
+
+    Each value gets a random key and the reservoir keeps the values with the
+    smallest keys, which is a uniform sample of everything seen so far. The
+    median is exact while fewer than `size` values have been seen.
+    """
+
+    def __init__(self, size=RESERVOIR_SIZE, seed=0):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.values = np.empty(0)
+        self.keys = np.empty(0)
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        values = np.concatenate([self.values, values])
+        keys = np.concatenate([self.keys, self.rng.random(len(values) - len(self.values))])
+        if len(values) > self.size:
+            keep = np.argpartition(keys, self.size)[:self.size]
+            values, keys = values[keep], keys[keep]
+        self.values, self.keys = values, keys
+
+    def median(self):
+        return float(np.median(self.values)) if len(self.values) else 0.0
+
+
+class FrequentValues:
+    """
+    Approximate mode with the Misra-Gries frequent items summary.
+
+    At most `max_tracked` values are counted; any value that occurs in more
+    than 1/max_tracked of the rows is guaranteed to be among them.
+    """
+
+    def __init__(self, max_tracked=MAX_TRACKED_VALUES):
+        self.max_tracked = max_tracked
+        self.counts = {}
+
+    def update(self, values):
+        for value, count in values.dropna().value_counts().items():
+            self.counts[value] = self.counts.get(value, 0) + int(count)
+        if len(self.counts) > self.max_tracked:
+            cutoff = sorted(self.counts.values(), reverse=True)[self.max_tracked]
+            self.counts = {value: count - cutoff for value, count in self.counts.items() if count > cutoff}
+
+    def mode(self):
+        # Break ties by value, like DataFrame.mode
+        if not self.counts:
+            return 'unknown'
+        return min(self.counts.items(), key=lambda item: (-item[1], item[0]))[0]
+
+
+def read_chunks(csv_path, chunksize, numeric_columns, categorical_columns):
+    """
+    Read the raw CSV in chunks with consistent column types.
+
+    Args:
+        csv_path (str): Path to the raw CSV
+        chunksize (int): Rows per chunk
+        numeric_columns (list): Columns coerced to numbers (unparseable values become NaN)
+        categorical_columns (list): Columns read as strings
+
+    Yields:
+        pandas.DataFrame: Raw rows
+    """
+    dtype = dict.fromkeys(categorical_columns, str)
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=dtype):
+        for col in numeric_columns:
+            chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
+        yield chunk
+
+
+def scan(csv_path, chunksize=100_000):
+    """
+    First pass: collect fill statistics and split sizes.
+
+    Args:
+        csv_path (str): Path to the raw CSV
+        chunksize (int): Rows per chunk
+
+    Returns:
+        dict: Raw column kinds, fill values, missing counts and rows per split
+    """
+    sample = pd.read_csv(csv_path, nrows=1000)
+    numeric_columns = sample.select_dtypes(include=['int64', 'float64']).columns.tolist()
+    categorical_columns = sample.select_dtypes(include=TEXT_DTYPES).columns.tolist()
+
+    medians = {col: ReservoirMedian(seed=i) for i, col in enumerate(numeric_columns)}
+    frequent = {col: FrequentValues() for col in categorical_columns}
+    missing = dict.fromkeys(numeric_columns + categorical_columns, 0)
+    split_rows = np.zeros(len(SPLITS), dtype=np.int64)
+
+    for chunk in read_chunks(csv_path, chunksize, numeric_columns, categorical_columns):
+        split_rows += np.bincount(assign_splits(chunk, numeric_columns), minlength=len(SPLITS))
+        for col in numeric_columns:
+            values = chunk[col].to_numpy(dtype=np.float64)
+            medians[col].update(values)
+            missing[col] += int(np.isnan(values).sum())
+        for col in categorical_columns:
+            frequent[col].update(chunk[col])
+            missing[col] += int(chunk[col].isna().sum())
+
+    fill_values = {col: median.median() for col, median in medians.items()}
+    fill_values.update({col: counter.mode() for col, counter in frequent.items()})
+    return {
+        'numeric_columns': numeric_columns,
+        'categorical_columns': categorical_columns,
+        'fill_values': fill_values,
+        'missing': missing,
+        'split_rows': dict(zip(SPLITS, split_rows.tolist())),
+    }
+
+
+def prepare_chunk(chunk, stats):
+    """
+    Fill missing values and add the engineered features to a raw chunk.
+
+    Args:
+        chunk (pandas.DataFrame): Raw rows from read_chunks
+        stats (dict): Result of scan
+
+    Returns:
+        pandas.DataFrame: Prepared rows, including the target
+    """
+    chunk = chunk.fillna(stats['fill_values'])
+    # Replace the high-cardinality timestamp and user_id columns with compact engineered features
+    return add_engineered_features(chunk)
+
+
+def write_store(csv_path, store_dir, chunksize=100_000, stats=None):
+    """
+    Prepare the raw CSV into a columnar split store, one chunk at a time.
+
+    Args:
+        csv_path (str): Path to the raw CSV
+        store_dir (str): Directory to write the store to (created if needed)
+        chunksize (int): Rows per chunk
+        stats (dict): Result of scan, computed if not given
+
+    Returns:
+        dict: The store manifest
+    """
+    if stats is None:
+        stats = scan(csv_path, chunksize)
+    split_rows = stats['split_rows']
+
+    numeric_features = categorical_features = None
+    columns = {}
+    vocabularies = {}
+    offsets = dict.fromkeys(SPLITS, 0)
+
+    for chunk in read_chunks(csv_path, chunksize, stats['numeric_columns'], stats['categorical_columns']):
+        split_index = assign_splits(chunk, stats['numeric_columns'])
+        prepared = prepare_chunk(chunk, stats)
+        features = prepared.drop(columns=[TARGET] + [col for col in DROPPED_COLUMNS if col in prepared.columns])
+
+        if numeric_features is None:
+            # The feature lists follow the first prepared chunk, like select_dtypes on the full frame
+            numeric_features = features.select_dtypes(include=['int64', 'float64']).columns.tolist()
+            categorical_features = features.select_dtypes(include=TEXT_DTYPES).columns.tolist()
+            vocabularies = {col: {} for col in categorical_features}
+            for split in SPLITS:
+                os.makedirs(os.path.join(store_dir, split), exist_ok=True)
+                n_rows = split_rows[split]
+                columns[split] = {
+                    col: np.lib.format.open_memmap(
+                        os.path.join(store_dir, split, f'{col}.npy'), mode='w+',
+                        dtype=np.float64 if col in numeric_features else np.int32, shape=(n_rows,)
+                    )
+                    for col in numeric_features + categorical_features
+                }
+                columns[split]['y'] = np.lib.format.open_memmap(
+                    os.path.join(store_dir, split, 'y.npy'), mode='w+', dtype=np.int64, shape=(n_rows,)
+                )
+
+        encoded = {col: features[col].to_numpy(dtype=np.float64) for col in numeric_features}
+        for col in categorical_features:
+            vocabulary = vocabularies[col]
+            encoded[col] = np.fromiter(
+                (vocabulary.setdefault(value, len(vocabulary)) for value in features[col]),
+                dtype=np.int32, count=len(features),
+            )
+        encoded['y'] = prepared[TARGET].to_numpy(dtype=np.int64)
+
+        for i, split in enumerate(SPLITS):
+            mask = split_index == i
+            n_rows = int(mask.sum())
+            start = offsets[split]
+            for col, values in encoded.items():
+                columns[split][col][start:start + n_rows] = values[mask]
+            offsets[split] = start + n_rows
+
+    # Content digest of the written arrays, so caches derived from the store
+    # (see feature_matrix.py) can tell when the data changed
+    digest = hashlib.sha256()
+    for split in sorted(columns):
+        for col in sorted(columns[split]):
+            array = columns[split][col]
+            array.flush()
+            digest.update(f'{split}/{col}'.encode('utf-8'))
+            digest.update(array)
+
+    manifest = {
+        'format_version': STORE_VERSION,
+        'numeric_features': numeric_features or [],
+        'categorical_features': categorical_features or [],
+        'target': TARGET,
+        'fill_values': stats['fill_values'],
+        'categories': {col: list(vocabulary) for col, vocabulary in vocabularies.items()},
+        'split_rows': split_rows,
+        'data_digest': digest.hexdigest(),
+    }
+    with open(os.path.join(store_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_store_manifest(store_dir):
+    """
+    Read and validate a split store manifest.
+
+    Args:
+        store_dir (str): Store directory
+
+    Returns:
+        dict: The store manifest
+    """
+    with open(os.path.join(store_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != STORE_VERSION:
+        raise ValueError(
+            f"Unsupported split store version {manifest.get('format_version')} (expected {STORE_VERSION})"
+        )
+    return manifest
+
+
+def load_split(store_dir, split, manifest=None, mmap_mode='r'):
+    """
+    Load one split as a DataFrame and target Series.
+
+    Args:
+        store_dir (str): Store directory
+        split (str): 'train', 'val' or 'test'
+        manifest (dict): Store manifest, read if not given
+        mmap_mode (str): numpy memory-map mode, or None to read the arrays into memory
+
+    Returns:
+        tuple: (pandas.DataFrame of features, pandas.Series target)
+    """
+    if manifest is None:
+        manifest = read_store_manifest(store_dir)
+    path = os.path.join(store_dir, split)
+
+    data = {}
+    for col in manifest['numeric_features']:
+        data[col] = np.load(os.path.join(path, f'{col}.npy'), mmap_mode=mmap_mode)
+    for col in manifest['categorical_features']:
+        codes = np.load(os.path.join(path, f'{col}.npy'), mmap_mode=mmap_mode)
+        data[col] = np.asarray(manifest['categories'][col], dtype=object)[codes]
+    y = pd.Series(np.load(os.path.join(path, 'y.npy'), mmap_mode=mmap_mode), name=manifest['target'])
+    return pd.DataFrame(data), y
+
+
+def load_store(store_dir, mmap_mode='r'):
+    """
+    Load every split, in the layout data_splits.pkl used to have.
+
+    Args:
+        store_dir (str): Store directory
+        mmap_mode (str): numpy memory-map mode, or None to read the arrays into memory
+
+    Returns:
+        dict: X_train, y_train, X_val, y_val, X_test, y_test, numeric_features and categorical_features
+    """
+    manifest = read_store_manifest(store_dir)
+    splits = {
+        'numeric_features': manifest['numeric_features'],
+        'categorical_features': manifest['categorical_features'],
+    }
+    for split in SPLITS:
+        splits[f'X_{split}'], splits[f'y_{split}'] = load_split(store_dir, split, manifest, mmap_mode)
+    return splits
@@ -0,0 +1,79 @@
+"""
+Synthetic input rows for benchmarks and reports.
+
+Rows follow the schema in feature_columns.pkl: numeric columns get plausible
+random values and categorical columns are drawn from the categories the
+fitted OneHotEncoder knows, so every row exercises the full encoding path.
+"""
+import random
+from datetime import datetime, timedelta
+
+from features import TIME_FEATURES, USER_FEATURE, uses_engineered_features
+
+# Rough value ranges for the numeric inputs, anything else falls back to 0-100
+NUMERIC_RANGES = {
+    'time_of_day_hour': (0, 23),
+    'productive_session_duration_minutes': (0, 180),
+    'time_since_productive_activity_minutes': (0, 480),
+    'stress_level': (1, 5),
+    'fatigue_level': (1, 5),
+    'notifications_last_30min': (0, 15),
+    'phone_unlocks_last_hour': (0, 30),
+    'device_battery_level': (0, 100),
+    'recent_screen_time_today_minutes': (0, 720),
+    'is_weekend': (0, 1),
+}
+
+
+def encoder_categories(model):
+    """
+    Get the categories the pipeline's OneHotEncoder was fitted on.
+
+    Args:
+        model (sklearn.pipeline.Pipeline): Fitted preprocessor + classifier pipeline
+
+    Returns:
+        dict: Mapping of categorical column name to list of known categories
+    """
+    preprocessor = model.named_steps['preprocessor']
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == 'cat':
+            return {col: list(categories) for col, categories in zip(columns, transformer.categories_)}
+    return {}
+
+
+def make_rows(model, feature_columns, n_rows, seed=0):
+    """
+    Generate synthetic input rows matching the model's feature columns.
+
+    Args:
+        model (sklearn.pipeline.Pipeline): Fitted preprocessor + classifier pipeline
+        feature_columns (dict): Dictionary with 'numeric' and 'categorical' column lists
+        n_rows (int): Number of rows to generate
+        seed (int): Random seed, so runs are reproducible
+
+    Returns:
+        list: List of input dicts
+    """
+    rng = random.Random(seed)
+    categories = encoder_categories(model)
+    engineered = uses_engineered_features(feature_columns)
+    start = datetime(2023, 1, 1)
+
+    rows = []
+    for _ in range(n_rows):
+        row = {}
+        for col in feature_columns['numeric']:
+            if engineered and col in TIME_FEATURES:
+                continue
+            low, high = NUMERIC_RANGES.get(col, (0, 100))
+            row[col] = rng.randint(low, high)
+        for col in feature_columns['categorical']:
+            if col in categories and col != USER_FEATURE:
+                row[col] = str(rng.choice(categories[col]))
+        if engineered:
+            # Engineered models derive these features from the raw columns
+            row['timestamp'] = (start + timedelta(minutes=rng.randint(0, 60 * 24 * 365))).strftime('%Y-%m-%d %H:%M:%S')
+            row['user_id'] = f"user_{rng.randint(1, 1000)}"
+        rows.append(row)
+    return rows
@@ -0,0 +1,20 @@
+import json
+
+from benchmark import compare, run
+
+
+def test_results_are_json_and_comparable():
+    results = run(batch_sizes=[1, 5], repeats=2, with_cold_load=False)
+    results = json.loads(json.dumps(results))
+
+    assert set(results['predict']) == {'pipeline', 'compiled'}
+    assert set(results['predict']['compiled']['batch']) == {'1', '5'}
+    assert results['flask']['predict']['median_ms'] > 0
+    assert results['memory']['max_rss_mb'] > 0
+
+    # A run compared with itself has no regressions; a 2x slowdown is flagged
+    assert not any(regressed for *_, regressed in compare(results, results))
+    slower = json.loads(json.dumps(results))
+    slower['predict']['pipeline']['single_row']['median_ms'] *= 2
+    flagged = [metric for metric, *_, regressed in compare(results, slower) if regressed]
+    assert flagged == ['predict.pipeline.single_row.median_ms']
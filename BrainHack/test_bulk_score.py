@@ -0,0 +1,52 @@
+import csv
+import importlib.util
+
+import pytest
+
+from bulk_score import bulk_score
+from predictor import DistractionPredictor
+from synthetic_data import make_rows
+
+
+def test_bulk_score_matches_predict_batch_in_order(tmp_path):
+    predictor = DistractionPredictor()
+    rows = make_rows(predictor.model, predictor.feature_columns, 300, seed=3)
+    input_path = tmp_path / 'activity.csv'
+    with open(input_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    # Small blocks split the file into many chunks, scored by two processes
+    output_path = tmp_path / 'scores.csv'
+    result = bulk_score(str(input_path), str(output_path), workers=2, block_bytes=4096, keep=['user_id'])
+    assert result['rows'] == 300
+    assert result['chunks'] > 4
+
+    with open(output_path, newline='') as f:
+        scored = list(csv.DictReader(f))
+    expected = predictor.predict_batch(rows)
+    assert [row['user_id'] for row in scored] == [row['user_id'] for row in rows]
+    assert [float(row['risk_percentage']) for row in scored] == [e['risk_percentage'] for e in expected]
+    assert {row['risk_level'] for row in scored} <= {'high', 'moderate', 'low'}
+    assert [row['risk_level'] == 'high' for row in scored] == [e['risk_percentage'] > 75 for e in expected]
+
+    # The in-process path writes the same file
+    single_path = tmp_path / 'single.csv'
+    bulk_score(str(input_path), str(single_path), workers=1, block_bytes=4096, keep=['user_id'])
+    assert single_path.read_bytes() == output_path.read_bytes()
+
+
+def test_header_only_input_gets_a_header(tmp_path):
+    input_path = tmp_path / 'empty.csv'
+    input_path.write_text('user_id,stress_level\n')
+    output_path = tmp_path / 'scores.csv'
+
+    assert bulk_score(str(input_path), str(output_path), workers=1)['rows'] == 0
+    assert output_path.read_text() == 'user_id,risk_percentage,risk_level\n'
+
+
+@pytest.mark.skipif(importlib.util.find_spec('pyarrow') is not None, reason='pyarrow is installed')
+def test_parquet_without_pyarrow_says_so(tmp_path):
+    with pytest.raises(ImportError, match='pip install pyarrow'):
+        bulk_score(str(tmp_path / 'activity.parquet'), str(tmp_path / 'scores.csv'), workers=1)
@@ -0,0 +1,40 @@
+import random
+
+import numpy as np
+
+from predictor import DistractionPredictor
+from synthetic_data import make_rows
+
+
+def make_messy_rows(predictor, n_rows, seed=0):
+    # The shared synthetic rows, with missing fields, unseen categories and
+    # numbers sent as strings mixed in
+    rng = random.Random(seed)
+    rows = make_rows(predictor.model, predictor.feature_columns, n_rows, seed=seed)
+    for row in rows:
+        for col in list(row):
+            roll = rng.random()
+            if roll < 0.1:
+                del row[col]
+            elif roll < 0.2:
+                row[col] = 'never_seen_before' if col in predictor.feature_columns['categorical'] else str(row[col])
+    return rows
+
+
+def test_compiled_matches_pipeline():
+    predictor = DistractionPredictor()
+    compiled = DistractionPredictor(compiled=True)
+    rows = make_messy_rows(predictor, 200)
+
+    expected = np.array([predictor.predict(row) for row in rows])
+    actual = np.array([compiled.predict(row) for row in rows])
+
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-6)
+
+
+def test_compiled_batch_matches_pipeline():
+    predictor = DistractionPredictor()
+    compiled = DistractionPredictor(compiled=True)
+    rows = make_messy_rows(predictor, 200, seed=1)
+
+    assert compiled.predict_batch(rows) == predictor.predict_batch(rows)
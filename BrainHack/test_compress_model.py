@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+
+from compress_model import compress_pipeline
+from split_store import load_store, write_store
+from test_retrain_model import fit_pipeline
+from test_split_store import make_csv
+
+
+def trained(tmp_path):
+    make_csv(tmp_path / 'data.csv', n_rows=600)
+    write_store(tmp_path / 'data.csv', tmp_path / 'store')
+    splits = load_store(tmp_path / 'store', mmap_mode=None)
+    return fit_pipeline(splits), splits['X_val']
+
+
+def n_trees(pipeline):
+    return pipeline.named_steps['classifier'].get_booster().num_boosted_rounds()
+
+
+def tree_depths(pipeline):
+    booster = pipeline.named_steps['classifier'].get_booster()
+    trees = json.loads(booster.save_raw('json'))['learner']['gradient_booster']['model']['trees']
+
+    def depth(tree, node):
+        left, right = tree['left_children'][node], tree['right_children'][node]
+        return 0 if left == -1 else 1 + max(depth(tree, left), depth(tree, right))
+
+    return [depth(tree, 0) for tree in trees]
+
+
+def test_lossless_steps_keep_predictions(tmp_path):
+    pipeline, X = trained(tmp_path)
+    expected = pipeline.predict_proba(X)[:, 1]
+
+    # Only unused one-hot categories are removed, and a depth limit no tree reaches changes nothing
+    compressed = compress_pipeline(pipeline, max_depth=50)
+    n_features = compressed.named_steps['classifier'].get_booster().num_features()
+    assert n_features < pipeline.named_steps['classifier'].get_booster().num_features()
+    np.testing.assert_allclose(compressed.predict_proba(X)[:, 1], expected, rtol=1e-6)
+
+
+def test_lossy_steps_shrink_the_model(tmp_path):
+    pipeline, X = trained(tmp_path)
+    expected = pipeline.predict_proba(X)[:, 1]
+
+    quantized = compress_pipeline(pipeline, quantize_bits=10)
+    np.testing.assert_allclose(quantized.predict_proba(X)[:, 1], expected, atol=1e-3)
+
+    shallow = compress_pipeline(pipeline, max_depth=1)
+    booster = shallow.named_steps['classifier'].get_booster()
+    assert all(tree.count('leaf=') <= 2 for tree in booster.get_dump())
+
+    # Dropped trees move the base score, not the average prediction
+    pruned = compress_pipeline(pipeline, min_contribution=1.0)
+    assert n_trees(pruned) == 1
+    assert abs(pruned.predict_proba(X)[:, 1].mean() - expected.mean()) < 0.1
+
+
+def test_depth_limit_keeps_predictions_close(tmp_path):
+    pipeline, X = trained(tmp_path)
+    expected = pipeline.predict_proba(X)[:, 1]
+
+    # Collapsed leaves hold the mean of the leaves they replace; a node's base
+    # weight (before the learning rate) moved probabilities about twice as much
+    max_depth = max(tree_depths(pipeline)) - 1
+    shallow = compress_pipeline(pipeline, max_depth=max_depth)
+    assert max(tree_depths(shallow)) == max_depth
+    change = np.abs(shallow.predict_proba(X)[:, 1] - expected)
+    assert change.mean() < 0.06
+    assert change.max() < 0.25
@@ -0,0 +1,71 @@
+from dashboard_store import DashboardStore
+from event_log import EventLog, parse_event
+
+
+def session(start, end, interrupted=False, user_id='u1'):
+    return {'user_id': user_id, 'type': 'focus_session', 'start_time': start, 'end_time': end,
+            'interrupted': interrupted}
+
+
+def rest(timestamp, user_id='u1'):
+    return {'user_id': user_id, 'type': 'break', 'timestamp': timestamp, 'duration': 600}
+
+
+EVENTS = [
+    session('2024-03-12 08:00:00', '2024-03-12 10:00:00', interrupted=True),
+    session('2024-03-13 08:00:00', '2024-03-13 13:00:00', interrupted=True),
+    # Split between the 13th and the 14th
+    session('2024-03-13 23:00:00', '2024-03-14 01:00:00'),
+    session('2024-03-14 09:00:00', '2024-03-14 11:00:00'),
+    session('2024-03-14 11:00:00', '2024-03-14 11:30:00', interrupted=True),
+    rest('2024-03-13 15:00:00'),
+    rest('2024-03-14 10:00:00'),
+    rest('2024-03-14 11:45:00'),
+    # Arrives late and is outside the week
+    session('2024-03-01 08:00:00', '2024-03-01 16:00:00'),
+]
+
+
+def test_rollups_compute_dashboard_metrics(tmp_path):
+    store = DashboardStore(str(tmp_path / 'dashboard.sqlite'))
+    assert store.apply([parse_event(event) for event in EVENTS]) == 9
+
+    # The session of the 12th ended more than 24 hours ago; 6 focus hours make the 13th productive
+    assert store.metrics('u1', '2024-03-14 12:00:00') == {
+        'distractionRiskLevel': {'percentage': 50, 'interruptedSessions': 2, 'totalSessions': 4},
+        'dailyStatistics': {'focusTimeHours': 3.5, 'breaksTaken': 2},
+        'weeklyStatistics': {'productiveDays': 1, 'averageFocusTimeHours': 1.6},
+        'productivityScore': 41,
+    }
+    # A week later everything has left the windows; unknown users read as zeros
+    later = store.metrics('u1', '2024-03-21 12:00:00')
+    assert later == store.metrics('nobody', '2024-03-14 12:00:00')
+    assert later['productivityScore'] == 0 and later['distractionRiskLevel']['totalSessions'] == 0
+
+
+def test_dashboard_endpoint_catches_up_from_event_log(tmp_path):
+    from predictor import DistractionPredictor
+    from serving import InferenceService, create_app
+
+    def service():
+        return InferenceService(DistractionPredictor(), event_log=EventLog(str(tmp_path / 'log')),
+                                dashboard=DashboardStore(str(tmp_path / 'dashboard.sqlite')))
+
+    first = service()
+    client = create_app(first).test_client()
+    assert client.post('/events', json=EVENTS).get_json() == {'accepted': 9, 'last_seq': 9}
+    expected = client.get('/dashboard/u1?timestamp=2024-03-14 12:00:00').get_json()
+    assert expected['user_id'] == 'u1' and expected['productivityScore'] == 41
+    assert client.get('/dashboard/u1?timestamp=yesterday').status_code == 400
+    first.event_log.close()
+
+    # Losing the rollups loses nothing: they are rebuilt from the log on start
+    for path in tmp_path.glob('dashboard.sqlite*'):
+        path.unlink()
+    second = service()
+    second.start()
+    client = create_app(second).test_client()
+    assert client.get('/dashboard/u1?timestamp=2024-03-14 12:00:00').get_json() == expected
+    stats = client.get('/stats/dashboard').get_json()
+    assert (stats['last_seq'], stats['events']) == (9, 9)
+    second.event_log.close()
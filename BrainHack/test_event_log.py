@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+from event_log import EventLog, EventLogFull, parse_event
+
+
+def make_events(n, user_id='u1'):
+    return [parse_event({'user_id': user_id, 'type': 'unlock', 'timestamp': 1_700_000_000 + i}) for i in range(n)]
+
+
+def test_parse_event_validates_and_normalizes():
+    session = parse_event({'user_id': 7, 'type': 'focus_session', 'start_time': '2024-03-14 09:00:00',
+                           'end_time': '2024-03-14 09:50:00', 'interrupted': True})
+    assert (session['user_id'], session['duration'], session['interrupted']) == ('7', 3000.0, True)
+    for event in ({'type': 'unlock'}, {'user_id': 'u1', 'type': 'nap'},
+                  {'user_id': 'u1', 'type': 'break', 'duration': -5},
+                  {'user_id': 'u1', 'type': 'focus_session', 'end_time': '2024-03-14 09:50:00'}):
+        with pytest.raises(ValueError):
+            parse_event(event)
+
+
+def test_group_commit_replay_and_recovery(tmp_path):
+    log = EventLog(str(tmp_path / 'log'), segment_bytes=2000)
+    received = []
+    log.subscribe(lambda events, last_seq: received.append((len(events), last_seq)))
+    log.start()
+
+    threads = [threading.Thread(target=log.append, args=(make_events(10, f'u{i}'),)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert log.append(make_events(5)) == 85
+    # Concurrent appends share commits, subscribers see every event in order
+    assert log.stats()['commits'] <= 9 and log.stats()['segments'] > 1
+    assert sum(n for n, _ in received) == 85 and received[-1][1] == 85
+
+    # A torn last line (a crash mid-write) is dropped when the log is reopened,
+    # and subscribers catch up from their position
+    _, last_segment = log.segments()[-1]
+    with open(last_segment, 'ab') as f:
+        f.write(b'{"user_id": "u1", "ty')
+    log.close()
+    reopened = EventLog(str(tmp_path / 'log'))
+    replayed = []
+    reopened.subscribe(lambda events, last_seq: replayed.extend(events), position=lambda: 80)
+    reopened.start()
+    assert reopened.last_seq == 85 and len(replayed) == 5
+    assert reopened.append(make_events(1)) == 86
+
+
+def test_full_queue_pushes_back(tmp_path):
+    log = EventLog(str(tmp_path / 'log'), max_pending=10)
+    release = threading.Event()
+    log.subscribe(lambda events, last_seq: release.wait())
+    log.start()
+
+    writer = threading.Thread(target=log.append, args=(make_events(8),))
+    writer.start()
+    while log.stats()['pending'] < 8:
+        pass
+    with pytest.raises(EventLogFull):
+        log.append(make_events(5))
+    release.set()
+    writer.join()
+    assert log.append(make_events(5)) == 13 and log.stats()['rejected'] == 5
+
+
+def test_events_endpoint_recovers_feature_store_from_log(tmp_path):
+    from feature_store import FeatureStore
+    from predictor import DistractionPredictor
+    from serving import InferenceService, create_app
+
+    def service():
+        return InferenceService(DistractionPredictor(), feature_store=FeatureStore(str(tmp_path / 'features.sqlite')),
+                                event_log=EventLog(str(tmp_path / 'log')), max_events=50)
+
+    def unlocks(minutes):
+        return [{'user_id': 'u1', 'type': 'unlock', 'timestamp': f'2024-03-14 09:{minute:02d}:00'} for minute in minutes]
+
+    first = service()
+    client = create_app(first).test_client()
+    assert client.post('/events', json=unlocks(range(60))).status_code == 413
+    assert client.post('/events', json=unlocks(range(0, 20))).get_json() == {'accepted': 20, 'last_seq': 20}
+    first.feature_store.snapshot()
+    assert client.post('/events', json=unlocks(range(20, 30))).get_json()['last_seq'] == 30
+    expected = first.feature_store.features('u1', '2024-03-14 09:45:00')
+    assert expected['phone_unlocks_last_hour'] == 30
+    first.event_log.close()
+
+    # The snapshot holds the first 20 events, the log replays the other 10
+    second = service()
+    second.start()
+    assert second.feature_store.features('u1', '2024-03-14 09:45:00') == expected
+    second.event_log.close()
@@ -0,0 +1,54 @@
+import math
+
+import pytest
+
+from model_bundle import export_bundle
+from predictor import DistractionPredictor
+from synthetic_data import make_rows
+
+
+def sigmoid(x):
+    return 1 / (1 + math.exp(-x))
+
+
+def test_contributions_add_up_to_the_prediction():
+    predictor = DistractionPredictor()
+    rows = make_rows(predictor.model, predictor.feature_columns, 50, seed=7)
+    columns = predictor.feature_columns['numeric'] + predictor.feature_columns['categorical']
+    explanations = predictor.explain(rows, top_k=len(columns))
+
+    for row, explanation, probability in zip(rows, explanations, predictor.predict_proba(rows)):
+        assert explanation['risk_percentage'] == predictor.get_recommendation(float(probability))['risk_percentage']
+        # With every column returned, base value plus contributions is the model's log-odds
+        total = explanation['base_value'] + sum(driver['contribution'] for driver in explanation['drivers'])
+        assert sigmoid(total) == pytest.approx(probability, abs=1e-4)
+        assert sorted(driver['feature'] for driver in explanation['drivers']) == sorted(columns)
+        magnitudes = [abs(driver['contribution']) for driver in explanation['drivers']]
+        assert magnitudes == sorted(magnitudes, reverse=True)
+
+    # Single rows, the compiled path and the cache all give the same explanations
+    assert predictor.explain(rows[0], top_k=3) == {**explanations[0], 'drivers': explanations[0]['drivers'][:3]}
+    compiled = DistractionPredictor(compiled=True, cache_size=100)
+    assert compiled.explain(rows[:10], top_k=3) == predictor.explain(rows[:10], top_k=3)
+    assert compiled.explain(rows[:10], top_k=3) == predictor.explain(rows[:10], top_k=3)
+    assert compiled.cache.stats()['hits'] == 10
+
+
+def test_explanations_leave_predictions_to_the_model():
+    predictor = DistractionPredictor()
+    cached = DistractionPredictor(cache_size=100)
+    rows = make_rows(predictor.model, predictor.feature_columns, 20, seed=8)
+
+    # A prediction cached after an explanation is still the model's own probability
+    cached.explain(rows)
+    assert [cached.predict(row) for row in rows] == [predictor.predict(row) for row in rows]
+
+
+def test_bundle_runtimes_without_a_booster_refuse(tmp_path):
+    predictor = DistractionPredictor()
+    export_bundle(predictor.model, predictor.feature_columns, str(tmp_path), with_onnx=False)
+    row = make_rows(predictor.model, predictor.feature_columns, 1)[0]
+
+    assert DistractionPredictor(str(tmp_path)).explain(row) == predictor.explain(row)
+    with pytest.raises(RuntimeError, match='booster'):
+        DistractionPredictor(str(tmp_path), runtime='numpy').explain(row)
@@ -0,0 +1,27 @@
+import numpy as np
+
+from feature_matrix import load_encoded_splits, make_preprocessor
+from split_store import load_store, write_store
+from test_split_store import make_csv
+
+
+def test_encoded_matrices_are_cached_and_match_the_preprocessor(tmp_path):
+    make_csv(tmp_path / 'data.csv')
+    manifest = write_store(tmp_path / 'data.csv', tmp_path / 'store')
+    features = manifest['numeric_features'], manifest['categorical_features']
+
+    first = load_encoded_splits(tmp_path / 'store', make_preprocessor(*features))
+    second = load_encoded_splits(tmp_path / 'store', make_preprocessor(*features))
+    assert not first['cached'] and second['cached']
+
+    splits = load_store(tmp_path / 'store')
+    expected = make_preprocessor(*features).fit(splits['X_train'])
+    for split in ('train', 'val', 'test'):
+        matrix = second[f'X_{split}']
+        assert (abs(matrix - expected.transform(splits[f'X_{split}'])) > 1e-12).nnz == 0
+        np.testing.assert_array_equal(second[f'y_{split}'], splits[f'y_{split}'])
+
+    # New data invalidates the cache
+    make_csv(tmp_path / 'data.csv', seed=1)
+    write_store(tmp_path / 'data.csv', tmp_path / 'store')
+    assert not load_encoded_splits(tmp_path / 'store', make_preprocessor(*features))['cached']
@@ -0,0 +1,93 @@
+import time
+
+from feature_store import FeatureStore, SlidingWindowCounter
+
+
+def events(user_id, *pairs):
+    return [{'user_id': user_id, 'type': event_type, 'timestamp': timestamp} for event_type, timestamp in pairs]
+
+
+def test_sliding_window_expires_old_buckets():
+    counter = SlidingWindowCounter(60, n_buckets=6)
+    for t in (0, 5, 15, 59):
+        counter.add(t)
+    assert counter.count(59) == 4
+    # The 0-10 s bucket leaves the window first
+    assert counter.count(65) == 2
+    # A late event still inside the window counts, one older than the window does not
+    counter.add(62)
+    counter.add(1)
+    assert counter.count(69) == 3
+    assert counter.count(1000) == 0
+
+
+def test_reading_ahead_does_not_drop_later_events():
+    counter = SlidingWindowCounter(60, n_buckets=6)
+    counter.add(0)
+    assert counter.count(1000) == 0
+    counter.add(5)
+    assert counter.count(9) == 2
+
+    store = FeatureStore()
+    store.record(events('u1', *[('notification', '2026-10-18 10:00:00')] * 3))
+    assert store.features('u1', '2026-10-18 10:05:00')['notifications_last_30min'] == 3
+    store.fill({'user_id': 'u1', 'timestamp': '2026-10-19 10:05:00'})
+    store.record(events('u1', *[('notification', '2026-10-18 10:06:00')] * 2))
+    assert store.features('u1', '2026-10-18 10:07:00')['notifications_last_30min'] == 5
+
+    # Far-future request times are read as a few minutes from now
+    store.record([{'user_id': 'u2', 'type': 'notification', 'timestamp': time.time()}])
+    assert store.features('u2', time.time() + 10 * 365 * 86400)['notifications_last_30min'] == 1
+
+
+def test_rolling_features_and_snapshot(tmp_path):
+    store = FeatureStore(str(tmp_path / 'features.sqlite'))
+    store.record(events(
+        'u1',
+        ('notification', '2024-03-14 09:00:00'),
+        ('notification', '2024-03-14 09:20:00'),
+        ('unlock', '2024-03-14 09:10:00'),
+        # 30 minutes of screen time before midnight, 15 after
+        ('screen_on', '2024-03-13 23:30:00'),
+        ('screen_off', '2024-03-14 00:15:00'),
+        ('screen_on', '2024-03-14 09:25:00'),
+        ('session_start', '2024-03-14 08:00:00'),
+        ('session_stop', '2024-03-14 08:45:00'),
+    ))
+
+    features = store.features('u1', '2024-03-14 09:35:00')
+    assert features == {
+        'notifications_last_30min': 1,
+        'phone_unlocks_last_hour': 1,
+        'recent_screen_time_today_minutes': 25.0,
+        'productive_session_duration_minutes': 45.0,
+        'time_since_productive_activity_minutes': 50.0,
+    }
+
+    # Values sent by the client win, unknown users are left alone
+    row = store.fill({'user_id': 'u1', 'timestamp': '2024-03-14 09:35:00', 'phone_unlocks_last_hour': 7})
+    assert row['phone_unlocks_last_hour'] == 7 and row['notifications_last_30min'] == 1
+    assert store.fill({'user_id': 'u2'}) == {'user_id': 'u2'}
+
+    assert store.snapshot() == 1
+    assert store.snapshot() == 0
+    assert FeatureStore(store.snapshot_path).features('u1', '2024-03-14 09:35:00') == features
+
+
+def test_predict_fills_features_from_events():
+    from predictor import DistractionPredictor
+    from serving import InferenceService, create_app
+
+    service = InferenceService(DistractionPredictor(), feature_store=FeatureStore())
+    client = create_app(service).test_client()
+    timestamp = '2024-03-14 09:35:00'
+    user_events = events('u1', *[('notification', f'2024-03-14 09:{minute:02d}:00') for minute in range(10, 30)])
+
+    assert client.post('/events', json=[{'user_id': 'u1', 'type': 'nap'}]).status_code == 400
+    assert client.post('/events', json=user_events).get_json() == {'accepted': 20}
+    assert client.get('/features/u1').status_code == 200
+
+    filled = client.post('/predict', json={'user_id': 'u1', 'timestamp': timestamp}).get_json()
+    sent = client.post('/predict', json={'user_id': 'u1', 'timestamp': timestamp,
+                                         **service.feature_store.features('u1', timestamp)}).get_json()
+    assert filled == sent
@@ -0,0 +1,61 @@
+from datetime import date, datetime
+
+import pytest
+
+from focus_windows import best_focus_windows, candidate_rows, first_hour, lowest_risk_windows
+from predictor import DistractionPredictor
+from synthetic_data import make_rows
+
+
+def test_windows_do_not_overlap():
+    # Window means: 3, 1, 5, 4.5, 0, 1.5; the 1.5 and 3 windows overlap better ones
+    assert lowest_risk_windows([5, 1, 1, 9, 0, 0, 3], 2, 3) == [(4, 0.0), (1, 1.0)]
+    assert lowest_risk_windows([2, 2, 2], 1, 2) == [(0, 2.0), (1, 2.0)]
+    assert lowest_risk_windows([1, 2], 3, 1) == []
+
+
+def test_scan_starts_at_the_users_own_hour():
+    assert first_hour({'timestamp': '2024-03-08 21:40:00', 'time_of_day_hour': 3}) == datetime(2024, 3, 8, 21)
+    # Without a timestamp: the client's hour on the next date with its weekday, whatever the server's timezone
+    friday = date(2024, 3, 8)
+    assert first_hour({'time_of_day_hour': '14', 'day_of_week': 'Wednesday'}, friday) == datetime(2024, 3, 13, 14)
+    assert first_hour({'time_of_day_hour': 9, 'day_of_week': 'Friday'}, friday) == datetime(2024, 3, 8, 9)
+    for context in ({}, {'time_of_day_hour': 9}, {'time_of_day_hour': 24, 'day_of_week': 'Friday'},
+                    {'time_of_day_hour': 'noon', 'day_of_week': 'Friday'}):
+        with pytest.raises(ValueError):
+            first_hour(context, friday)
+
+
+def test_week_is_scored_in_one_call():
+    predictor = DistractionPredictor(compiled=True)
+    context = {**make_rows(predictor.model, predictor.feature_columns, 1, seed=9)[0],
+               'timestamp': '2024-03-08 21:40:00'}
+    calls = []
+    score = predictor._score
+    predictor._score = lambda rows: calls.append(len(rows)) or score(rows)
+
+    result = best_focus_windows(predictor, context, days=7, window_hours=3, top_k=4)
+
+    assert calls == [168]
+    curve = result['curve']
+    assert curve[0]['timestamp'] == '2024-03-08 21:00:00' and curve[0]['day_of_week'] == 'Friday'
+    assert {(hour['day_of_week'], hour['time_of_day_hour']) for hour in curve} == {
+        (day, hour) for day in ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+        for hour in range(24)
+    }
+    # Each hour scores like a single prediction of its candidate row
+    rows = [row for _, row in candidate_rows(context, datetime(2024, 3, 8, 21), 168)]
+    assert [hour['risk_percentage'] for hour in curve] == [
+        predictor.predict_with_recommendations(row)['risk_percentage'] for row in rows
+    ]
+
+    risks = [hour['risk_percentage'] for hour in curve]
+    windows = result['windows']
+    assert len(windows) == 4
+    assert [window['risk_percentage'] for window in windows] == sorted(window['risk_percentage'] for window in windows)
+    best = min(range(166), key=lambda i: sum(risks[i:i + 3]))
+    assert windows[0]['start'] == curve[best]['timestamp']
+    assert windows[0]['risk_percentage'] == pytest.approx(sum(risks[best:best + 3]) / 3, abs=0.01)
+
+    with pytest.raises(ValueError):
+        best_focus_windows(predictor, context, days=8)
@@ -0,0 +1,36 @@
+from latency_metrics import LatencyMetrics, stage_timer
+from predictor import DistractionPredictor
+
+
+def test_quantiles_and_prometheus_text():
+    metrics = LatencyMetrics(window=100)
+    for ms in range(1, 101):
+        metrics.observe('model', ms / 1000)
+
+    stats = metrics.snapshot()['model']
+    assert stats['count'] == 100
+    assert stats['p50'] == 0.051 and stats['p99'] == 0.1
+    assert stats['buckets'][0.05] == 50
+
+    text = metrics.render_prometheus()
+    assert '# TYPE distraction_stage_latency_seconds histogram' in text
+    assert 'distraction_stage_latency_seconds_bucket{stage="model",le="+Inf"} 100' in text
+    assert 'distraction_stage_latency_seconds_recent{stage="model",quantile="0.95"} 0.096000000' in text
+
+
+def test_disabled_metrics_are_a_no_op():
+    with stage_timer(None, 'model'):
+        pass
+    assert DistractionPredictor().metrics is None
+
+
+def test_predictor_records_each_stage():
+    row = {'time_of_day_hour': 14, 'location': 'home'}
+    pipeline = DistractionPredictor(metrics=True)
+    compiled = DistractionPredictor(compiled=True, metrics=True)
+
+    assert pipeline.predict(row) == DistractionPredictor().predict(row)
+    compiled.predict_batch([row, row])
+
+    assert set(pipeline.metrics.snapshot()) == {'prepare_input', 'preprocess', 'model'}
+    assert set(compiled.metrics.snapshot()) == {'encode', 'model'}
@@ -0,0 +1,63 @@
+import asyncio
+import importlib.util
+import os
+
+FLASK_APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'flask_app')
+
+
+def load_test_module():
+    spec = importlib.util.spec_from_file_location('load_test', os.path.join(FLASK_APP_DIR, 'load_test.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_histogram_percentiles_within_one_percent():
+    load_test = load_test_module()
+    histogram = load_test.LatencyHistogram()
+    for ms in range(1, 1001):
+        histogram.record(ms / 1000)
+    assert abs(histogram.percentile(0.5) - 0.5) <= 0.005
+    assert abs(histogram.percentile(0.99) - 0.99) <= 0.01
+    restored = load_test.LatencyHistogram.from_dict(histogram.to_dict())
+    assert restored.percentile(0.9) == histogram.percentile(0.9)
+
+
+def test_open_loop_latency_counts_the_stall_and_errors():
+    load_test = load_test_module()
+    handled = []
+
+    async def handle(reader, writer):
+        # Answers in 1 ms, but stalls 300 ms on the 20th request and fails the 40th
+        while True:
+            try:
+                head = await reader.readuntil(b'\r\n\r\n')
+            except asyncio.IncompleteReadError:
+                break
+            length = int(head.lower().split(b'content-length:')[1].split(b'\r\n')[0])
+            await reader.readexactly(length)
+            handled.append(1)
+            await asyncio.sleep(0.3 if len(handled) == 20 else 0.001)
+            status = b'503 Service Unavailable' if len(handled) == 40 else b'200 OK'
+            # Every 10th answer closes the connection, which the client reopens
+            close = b'Connection: close\r\n' if len(handled) % 10 == 0 else b''
+            writer.write(b'HTTP/1.1 ' + status + b'\r\nContent-Length: 2\r\n' + close + b'\r\n{}')
+            await writer.drain()
+            if close:
+                break
+        writer.close()
+
+    async def run():
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await load_test.run_load(f'http://127.0.0.1:{port}/predict', load_test.load_payloads(),
+                                            connections=1, duration=1.0, rate=100, warmup=0)
+
+    result = asyncio.run(run())
+    assert result['errors'] == {'HTTP 503': 1}
+    assert result['requests'] == len(handled) == 100
+    # The requests due during the stall waited for it: the corrected latency shows it, the service time does not
+    assert result['latency_ms']['max'] >= 300
+    assert result['latency_ms']['p90'] > 50
+    assert result['service_time_ms']['p90'] < 20
@@ -0,0 +1,70 @@
+import asyncio
+
+from micro_batcher import MicroBatcher
+
+
+def test_concurrent_rows_share_batches():
+    calls = []
+
+    def predict_batch(rows):
+        calls.append(len(rows))
+        return [row['x'] * 2 for row in rows]
+
+    async def main():
+        batcher = MicroBatcher(predict_batch, max_batch_size=8, max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.submit({'x': i}) for i in range(20)))
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(main())
+
+    # Every caller gets its own row's result, from far fewer model calls than rows
+    assert results == [i * 2 for i in range(20)]
+    assert max(calls) <= 8
+    assert stats['rows'] == 20 and stats['batches'] == len(calls) < 20
+
+
+def test_errors_reach_every_caller():
+    def predict_batch(rows):
+        raise ValueError('model failed')
+
+    async def main():
+        batcher = MicroBatcher(predict_batch, max_batch_size=4, max_wait_ms=1)
+        return await asyncio.gather(*(batcher.submit({}) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(main()))
+
+
+def test_a_bad_row_only_fails_its_own_request():
+    def predict_batch(rows):
+        return [float(row['stress_level']) for row in rows]
+
+    async def main():
+        batcher = MicroBatcher(predict_batch, max_batch_size=8, max_wait_ms=20)
+        rows = [{'stress_level': str(i)} for i in range(5)] + [{'stress_level': 'abc'}]
+        return await asyncio.gather(*(batcher.submit(row) for row in rows), return_exceptions=True), batcher.stats()
+
+    results, stats = asyncio.run(main())
+
+    assert results[:5] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert isinstance(results[5], ValueError)
+    assert stats['fallbacks'] == 1
+
+
+def test_errors_not_caused_by_a_row_fail_the_batch_at_once():
+    calls = []
+
+    def predict_batch(rows):
+        calls.append(len(rows))
+        raise RuntimeError('The model is still loading')
+
+    async def main():
+        batcher = MicroBatcher(predict_batch, max_batch_size=8, max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.submit({}) for _ in range(6)), return_exceptions=True)
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(main())
+
+    # One model call, not one more per row
+    assert calls == [6]
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert stats['fallbacks'] == 0
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from model_bundle import export_bundle
+from predictor import DistractionPredictor
+from synthetic_data import make_rows
+
+
+def check_bundle(bundle_dir, runtime, with_onnx):
+    predictor = DistractionPredictor()
+    export_bundle(predictor.model, predictor.feature_columns, bundle_dir, with_onnx=with_onnx)
+    rows = make_rows(predictor.model, predictor.feature_columns, 200)
+    expected = np.array([predictor.predict(row) for row in rows])
+
+    bundled = DistractionPredictor(bundle_dir, runtime=runtime)
+    assert bundled.feature_columns == predictor.feature_columns
+    actual = np.array([bundled.predict(row) for row in rows])
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-6)
+
+
+def test_xgboost_bundle_matches_pipeline(tmp_path):
+    check_bundle(str(tmp_path), 'xgboost', with_onnx=False)
+
+
+def test_onnx_bundle_matches_pipeline(tmp_path):
+    pytest.importorskip('onnxmltools')
+    pytest.importorskip('onnxruntime')
+    check_bundle(str(tmp_path), 'onnx', with_onnx=True)
+
+
+def test_numpy_bundle_matches_pipeline(tmp_path):
+    check_bundle(str(tmp_path), 'numpy', with_onnx=False)
+
+
+def test_numpy_ensemble_matches_booster_on_batches(tmp_path):
+    from tree_ensemble import TreeEnsemble
+
+    predictor = DistractionPredictor(compiled=True)
+    rows = make_rows(predictor.model, predictor.feature_columns, 500, seed=1)
+    matrix = predictor.compiled_model.transform(rows)
+    # Also exercise missing values on every feature
+    matrix[::3, ::2] = np.nan
+
+    ensemble = TreeEnsemble.from_booster(predictor.compiled_model.booster)
+    ensemble.save(tmp_path / 'trees.npz')
+    ensemble = TreeEnsemble.load(tmp_path / 'trees.npz')
+    np.testing.assert_allclose(
+        ensemble.predict_proba(matrix), predictor.compiled_model.predict_encoded(matrix), rtol=0, atol=1e-6
+    )
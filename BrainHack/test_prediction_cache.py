@@ -0,0 +1,28 @@
+import time
+
+from prediction_cache import PredictionCache, canonical_key
+
+FEATURE_COLUMNS = {'numeric': ['stress_level', 'fatigue_level'], 'categorical': ['location']}
+
+
+def test_canonical_key_normalizes_inputs():
+    assert canonical_key({'stress_level': '3', 'location': 'home', 'extra': 1}, FEATURE_COLUMNS) == \
+        canonical_key({'stress_level': 3.0, 'fatigue_level': 0, 'location': 'home'}, FEATURE_COLUMNS)
+    assert canonical_key({'stress_level': 'high'}, FEATURE_COLUMNS) is None
+
+
+def test_lru_eviction_and_ttl():
+    cache = PredictionCache(max_size=2, ttl_seconds=0.05)
+    cache.put('a', 0.1)
+    cache.put('b', 0.2)
+    assert cache.get('a') == 0.1
+    cache.put('c', 0.3)
+
+    # 'b' was least recently used
+    assert cache.get('b') is None
+    assert cache.get('c') == 0.3
+
+    time.sleep(0.06)
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['expirations']) == (2, 2, 1, 1)
@@ -0,0 +1,59 @@
+import numpy as np
+import xgboost as xgb
+from sklearn.pipeline import Pipeline
+
+from feature_matrix import make_preprocessor
+from retrain_model import extend_preprocessor, remap_booster, warm_start
+from split_store import load_store, write_store
+from test_split_store import make_csv
+
+
+def fit_pipeline(splits):
+    preprocessor = make_preprocessor(splits['numeric_features'], splits['categorical_features'])
+    classifier = xgb.XGBClassifier(n_estimators=20, max_depth=3, eval_metric='logloss')
+    classifier.fit(preprocessor.fit_transform(splits['X_train']), splits['y_train'])
+    return Pipeline(steps=[('preprocessor', preprocessor), ('classifier', classifier)])
+
+
+def new_rows(splits):
+    # Shifted stress levels and a location the model has never seen
+    X_new = splits['X_test'].copy()
+    X_new['stress_level'] = X_new['stress_level'] + 2
+    X_new.loc[X_new.index[::3], 'location'] = 'library'
+    return X_new
+
+
+def test_remapped_trees_score_the_new_encoding_like_the_old_one(tmp_path):
+    make_csv(tmp_path / 'data.csv', n_rows=600)
+    write_store(tmp_path / 'data.csv', tmp_path / 'store')
+    splits = load_store(tmp_path / 'store', mmap_mode=None)
+    pipeline = fit_pipeline(splits)
+    preprocessor = pipeline.named_steps['preprocessor']
+
+    updated, index_map = extend_preprocessor(preprocessor, new_rows(splits))
+    categories = dict(zip(updated.transformers_[1][2], updated.named_transformers_['cat'].categories_))
+    assert list(categories['location'][-1:]) == ['library']
+    assert not np.allclose(updated.named_transformers_['num'].mean_, preprocessor.named_transformers_['num'].mean_)
+
+    X = splits['X_val']
+    encoded = updated.transform(X)
+    booster = remap_booster(
+        pipeline.named_steps['classifier'].get_booster(), index_map,
+        preprocessor.named_transformers_['num'], updated.named_transformers_['num'], encoded.shape[1],
+    )
+    np.testing.assert_allclose(
+        booster.inplace_predict(encoded), pipeline.predict_proba(X)[:, 1], rtol=1e-5, atol=1e-6
+    )
+
+
+def test_warm_start_adds_trees(tmp_path):
+    make_csv(tmp_path / 'data.csv', n_rows=600)
+    write_store(tmp_path / 'data.csv', tmp_path / 'store')
+    splits = load_store(tmp_path / 'store', mmap_mode=None)
+    pipeline = fit_pipeline(splits)
+
+    X_new = new_rows(splits)
+    updated = warm_start(pipeline, X_new, splits['y_test'], splits['X_val'], splits['y_val'], rounds=5)
+
+    assert updated.named_steps['classifier'].get_booster().num_boosted_rounds() > 20
+    assert updated.predict_proba(X_new).shape == (len(X_new), 2)
@@ -0,0 +1,252 @@
+import asyncio
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from predictor import DistractionPredictor
+from synthetic_data import make_rows
+
+BRAINHACK_DIR = os.path.dirname(os.path.abspath(__file__))
+FLASK_APP_DIR = os.path.join(BRAINHACK_DIR, '..', 'flask_app')
+
+FLASK_ENTRY_POINTS = [
+    os.path.join(BRAINHACK_DIR, 'app.py'),
+    os.path.join(BRAINHACK_DIR, 'app_cors_enabled.py'),
+    os.path.join(FLASK_APP_DIR, 'app.py'),
+]
+ASGI_ENTRY_POINT = os.path.join(FLASK_APP_DIR, 'asgi_app.py')
+
+
+def load_entry_point(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope='module')
+def entry_points():
+    # Point every entry point at the same model
+    patch = pytest.MonkeyPatch()
+    patch.setenv('MODEL_PATH', os.path.join(BRAINHACK_DIR, 'distraction_model.pkl'))
+    patch.setenv('FEATURE_COLUMNS_PATH', os.path.join(BRAINHACK_DIR, 'feature_columns.pkl'))
+    try:
+        flask_apps = [
+            load_entry_point(path, f'serving_entry_point_{i}').app for i, path in enumerate(FLASK_ENTRY_POINTS)
+        ]
+        asgi_app = load_entry_point(ASGI_ENTRY_POINT, 'serving_entry_point_asgi').app
+    finally:
+        patch.undo()
+    return flask_apps, asgi_app
+
+
+@pytest.fixture(scope='module')
+def reference():
+    return DistractionPredictor()
+
+
+# Bodies every entry point must answer with a 400: malformed JSON, not an object, a non-numeric feature
+BAD_BODIES = [b'{bad', b'[1, 2]', b'{"stress_level": "abc"}']
+
+
+def asgi_request(app, path, body):
+    # Minimal ASGI client: one JSON request, collect the status, headers and JSON response
+    async def call():
+        scope = {'type': 'http', 'path': path, 'method': 'POST',
+                 'headers': [(b'content-type', b'application/json')]}
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        await app(scope, receive, send)
+        return messages[0]['status'], dict(messages[0]['headers']), json.loads(messages[1]['body'])
+
+    return asyncio.run(call())
+
+
+def asgi_post(app, path, payload):
+    status, _, body = asgi_request(app, path, json.dumps(payload).encode('utf-8'))
+    return status, body
+
+
+def test_entry_points_agree(entry_points, reference):
+    flask_apps, asgi_app = entry_points
+    rows = make_rows(reference.model, reference.feature_columns, 16, seed=3)
+    expected = [reference.predict_with_recommendations(row) for row in rows]
+
+    for app in flask_apps:
+        client = app.test_client()
+        assert [client.post('/predict', json=row).get_json() for row in rows] == expected
+        assert client.post('/predict/batch', json=rows).get_json() == {'predictions': expected}
+
+    assert [asgi_post(asgi_app, '/predict', row) for row in rows] == [(200, result) for result in expected]
+    assert asgi_post(asgi_app, '/predict/batch', rows) == (200, {'predictions': expected})
+
+
+def test_explain_endpoints_agree(entry_points, reference):
+    flask_apps, asgi_app = entry_points
+    rows = make_rows(reference.model, reference.feature_columns, 8, seed=4)
+    expected = reference.explain(rows, top_k=3)
+
+    for app in flask_apps:
+        client = app.test_client()
+        assert [client.post('/explain?top_k=3', json=row).get_json() for row in rows] == expected
+        assert client.post('/explain/batch?top_k=3', json=rows).get_json() == {'explanations': expected}
+        assert client.post('/explain?top_k=none', json=rows[0]).status_code == 400
+
+    assert [asgi_post(asgi_app, '/explain', row) for row in rows] == [
+        (200, result) for result in reference.explain(rows)
+    ]
+    assert asgi_post(asgi_app, '/explain/batch', rows) == (200, {'explanations': reference.explain(rows)})
+
+
+def test_focus_windows_endpoints_agree(entry_points, reference):
+    from focus_windows import best_focus_windows
+
+    flask_apps, asgi_app = entry_points
+    row = {**make_rows(reference.model, reference.feature_columns, 1, seed=6)[0], 'timestamp': '2024-03-04 09:15:00'}
+    expected = best_focus_windows(reference, row, days=2, window_hours=3)
+
+    for app in flask_apps:
+        client = app.test_client()
+        assert client.post('/focus-windows?days=2&window_hours=3', json=row).get_json() == expected
+        assert client.post('/focus-windows?days=8', json=row).status_code == 400
+        assert client.post('/focus-windows?days=soon', json=row).status_code == 400
+        untimed = {key: value for key, value in row.items() if key not in ('timestamp', 'day_of_week')}
+        assert client.post('/focus-windows', json=untimed).status_code == 400
+
+    assert asgi_post(asgi_app, '/focus-windows', row) == (200, best_focus_windows(reference, row))
+
+
+def test_form_and_json_inputs_agree(entry_points, reference):
+    flask_apps, _ = entry_points
+    row = make_rows(reference.model, reference.feature_columns, 1, seed=5)[0]
+    form = {key: str(value) for key, value in row.items()}
+
+    for app in flask_apps:
+        client = app.test_client()
+        assert client.post('/predict', data=form).get_json() == client.post('/predict', json=row).get_json()
+
+
+def test_error_responses_agree(entry_points):
+    flask_apps, asgi_app = entry_points
+
+    for app in flask_apps:
+        client = app.test_client()
+        assert client.post('/predict/batch', json={'not': 'a list'}).status_code == 400
+        assert client.get('/health').get_json()['status'] == 'healthy'
+
+    assert asgi_post(asgi_app, '/predict/batch', {'not': 'a list'})[0] == 400
+    assert asgi_post(asgi_app, '/predict', ['not', 'an object'])[0] == 400
+
+
+@pytest.mark.parametrize('path', ['/predict', '/explain', '/focus-windows?days=1'])
+def test_bad_bodies_are_client_errors(entry_points, path):
+    flask_apps, asgi_app = entry_points
+
+    for body in BAD_BODIES:
+        for app in flask_apps:
+            assert app.test_client().post(path, data=body, content_type='application/json').status_code == 400
+        assert asgi_request(asgi_app, path.split('?')[0], body)[0] == 400
+
+
+def test_bad_batch_rows_are_client_errors(entry_points, reference):
+    flask_apps, asgi_app = entry_points
+    rows = [*make_rows(reference.model, reference.feature_columns, 2, seed=7), {'stress_level': 'abc'}]
+
+    for app in flask_apps:
+        response = app.test_client().post('/predict/batch', json=rows)
+        assert response.status_code == 400 and 'abc' in response.get_json()['error']
+    assert asgi_post(asgi_app, '/predict/batch', rows)[0] == 400
+
+
+def test_admin_reload_swaps_validated_models(tmp_path, reference):
+    import pickle
+    import shutil
+    import time
+
+    from serving import InferenceService, create_app, create_asgi_app
+
+    model_path = tmp_path / 'model.pkl'
+    shutil.copy(reference.model_path, model_path)
+    service = InferenceService(DistractionPredictor(str(model_path), reference.feature_columns_path),
+                               admin_token='secret')
+    client = create_app(service).test_client()
+    auth = {'Authorization': 'Bearer secret'}
+    row = make_rows(reference.model, reference.feature_columns, 1, seed=7)[0]
+    version = client.get('/health').get_json()['model']['version']
+
+    assert client.post('/admin/reload').status_code == 401
+    assert client.post('/admin/reload', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+    # An artifact that cannot be loaded is rejected and the current model keeps serving
+    broken = tmp_path / 'broken.pkl'
+    broken.write_bytes(b'not a pickle')
+    response = client.post('/admin/reload?wait=1', headers=auth, json={'model_path': str(broken)})
+    assert response.status_code == 422 and response.get_json()['state'] == 'failed'
+    assert client.get('/health').get_json()['model']['version'] == version
+    assert client.post('/predict', json=row).get_json() == reference.predict_with_recommendations(row)
+
+    # Same model, re-pickled feature columns: a new version with identical predictions
+    feature_columns_path = tmp_path / 'feature_columns.pkl'
+    with open(feature_columns_path, 'wb') as f:
+        pickle.dump(reference.feature_columns, f, protocol=2)
+    assert client.post('/admin/reload', headers=auth,
+                       json={'feature_columns_path': str(feature_columns_path)}).status_code == 202
+    for _ in range(100):
+        status = client.get('/admin/reload', headers=auth).get_json()
+        if status['last_reload']['state'] != 'loading':
+            break
+        time.sleep(0.05)
+    assert status['last_reload']['state'] == 'succeeded'
+    assert status['last_reload']['canary'] == {'rows': 32, 'mean_shift': 0.0, 'max_shift': 0.0}
+    assert client.get('/health').get_json()['model']['version'] == status['model']['version'] != version
+    assert client.post('/predict', json=row).get_json() == reference.predict_with_recommendations(row)
+
+
+def test_asgi_entry_point_does_not_import_flask():
+    # A fresh interpreter, since this test module has imported Flask already
+    code = ("import sys; import asgi_app; "
+            "print(sorted(m for m in sys.modules if m.split('.')[0] in ('flask', 'werkzeug')))")
+    result = subprocess.run([sys.executable, '-c', code], cwd=FLASK_APP_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == '[]'
+
+
+def test_background_load_reports_readiness(reference):
+    import threading
+
+    from serving import InferenceService, create_app, create_asgi_app
+
+    release = threading.Event()
+
+    def loader():
+        release.wait()
+        return DistractionPredictor()
+
+    service = InferenceService(loader=loader, load_timeout=0.05)
+    service.start()
+    client = create_app(service).test_client()
+    row = make_rows(reference.model, reference.feature_columns, 1, seed=9)[0]
+
+    # The app answers while the model loads: not ready yet, and requests time out with a 503
+    response = client.get('/health')
+    assert response.status_code == 503 and response.get_json()['status'] == 'loading'
+    response = client.post('/predict', json=row)
+    assert response.status_code == 503 and response.headers['Retry-After'] == '1'
+    status, headers, _ = asgi_request(create_asgi_app(service), '/predict', json.dumps(row).encode('utf-8'))
+    assert status == 503 and headers[b'retry-after'] == b'1'
+
+    release.set()
+    service.wait_until_ready(timeout=30)
+    response = client.get('/health')
+    assert response.status_code == 200 and response.get_json()['model']['load_seconds'] is not None
+    assert client.post('/predict', json=row).get_json() == reference.predict_with_recommendations(row)
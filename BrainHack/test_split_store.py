@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from split_store import FrequentValues, ReservoirMedian, load_store, read_store_manifest, write_store
+
+
+def make_csv(path, n_rows=500, seed=0):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        'stress_level': rng.integers(1, 6, n_rows).astype(float),
+        'location': rng.choice(['home', 'office', 'cafe'], n_rows),
+        'timestamp': [f'2023-01-{1 + i % 28:02d} {i % 24:02d}:15:00' for i in range(n_rows)],
+        'user_id': [f'user_{i % 40}' for i in range(n_rows)],
+        'fell_into_distraction': rng.integers(0, 2, n_rows),
+        'distraction_duration_minutes': rng.integers(0, 30, n_rows),
+    })
+    data.loc[::7, 'stress_level'] = np.nan
+    data.loc[::11, 'location'] = np.nan
+    data.to_csv(path, index=False)
+    return data
+
+
+def test_store_does_not_depend_on_chunk_size(tmp_path):
+    data = make_csv(tmp_path / 'data.csv')
+    small = write_store(tmp_path / 'data.csv', tmp_path / 'small', chunksize=37)
+    large = write_store(tmp_path / 'data.csv', tmp_path / 'large', chunksize=10_000)
+
+    assert small == large
+    assert sum(small['split_rows'].values()) == len(data)
+    assert small['fill_values']['stress_level'] == data['stress_level'].median()
+    assert small['fill_values']['location'] == data['location'].mode()[0]
+
+    splits = load_store(tmp_path / 'small')
+    other = load_store(tmp_path / 'large')
+    for split in ('train', 'val', 'test'):
+        pd.testing.assert_frame_equal(splits[f'X_{split}'], other[f'X_{split}'])
+        assert not splits[f'X_{split}'].isna().any().any()
+    assert 'user_bucket' in splits['categorical_features'] and 'hour' in splits['numeric_features']
+    assert 'location' in splits['categorical_features']
+    assert read_store_manifest(tmp_path / 'small')['format_version'] == 1
+
+
+def test_streaming_statistics():
+    median = ReservoirMedian(size=1000)
+    for chunk in np.array_split(np.arange(100_001, dtype=float), 50):
+        median.update(chunk)
+    assert abs(median.median() - 50_000) < 5_000
+
+    frequent = FrequentValues(max_tracked=3)
+    for chunk in [['a', 'b', 'c', 'd'], ['a', 'e', 'a'], ['f', 'a', 'g']]:
+        frequent.update(pd.Series(chunk))
+    assert frequent.mode() == 'a'
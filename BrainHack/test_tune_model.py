@@ -0,0 +1,47 @@
+from split_store import write_store
+from test_split_store import make_csv
+import numpy as np
+
+from tune_model import mark_pareto, sample_trials, stratified_folds, tune
+
+
+def test_search_produces_a_ranked_leaderboard(tmp_path):
+    make_csv(tmp_path / 'data.csv', n_rows=400)
+    write_store(tmp_path / 'data.csv', tmp_path / 'store')
+
+    rows = tune(tmp_path / 'store', n_trials=3, n_folds=2, n_workers=1)
+
+    assert sorted(row['trial'] for row in rows) == [0, 1, 2]
+    finished = [row for row in rows if not row['pruned']]
+    assert finished and [row['mean_auc'] for row in finished] == sorted((row['mean_auc'] for row in finished), reverse=True)
+    assert all(row['model_kb'] > 0 and row['n_trees'] >= 1 for row in rows)
+    assert any(row['pareto'] for row in rows)
+
+
+def test_early_stopping_rows_are_kept_out_of_the_scored_fold():
+    y = np.array([0, 1] * 50)
+    folds = stratified_folds(y, 5, validation_fraction=0.2)
+
+    assert len(folds) == 5
+    for fit_index, validation_index, test_index in folds:
+        assert len(fit_index) == 64 and len(validation_index) == 16 and len(test_index) == 20
+        assert not set(validation_index) & set(test_index)
+        assert sorted([*fit_index, *validation_index, *test_index]) == list(range(100))
+        assert y[validation_index].mean() == 0.5
+    assert sorted(i for *_, test_index in folds for i in test_index) == list(range(100))
+
+
+def test_trials_are_reproducible():
+    assert sample_trials(5, seed=1) == sample_trials(5, seed=1)
+    assert sample_trials(5, seed=1) != sample_trials(5, seed=2)
+
+
+def test_pareto_front():
+    rows = [
+        {'mean_auc': 0.90, 'predict_us_per_row': 1.0, 'model_kb': 10, 'pruned': False},
+        {'mean_auc': 0.95, 'predict_us_per_row': 5.0, 'model_kb': 50, 'pruned': False},
+        {'mean_auc': 0.89, 'predict_us_per_row': 2.0, 'model_kb': 20, 'pruned': False},
+        {'mean_auc': 0.99, 'predict_us_per_row': 0.1, 'model_kb': 1, 'pruned': True},
+    ]
+    mark_pareto(rows)
+    assert [row['pareto'] for row in rows] == [True, True, False, False]
@@ -1,59 +1,58 @@
+import argparse
+import json
 import pandas as pd
 import numpy as np
 import pickle
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, roc_auc_score
 import xgboost as xgb
-import matplotlib.pyplot as plt
 
-# Load the prepared data splits
-print("Loading prepared data splits...")
-with open('data_splits.pkl', 'rb') as f:
-    data_splits = pickle.load(f)
+from model_bundle import export_bundle
+from feature_matrix import load_encoded_splits, make_preprocessor
+from split_store import read_store_manifest
+
+parser = argparse.ArgumentParser(description='Train the distraction model on the prepared splits.')
+parser.add_argument('--params', help='JSON file with XGBoost parameters, e.g. tuning/best_params.json from tune_model.py')
+args = parser.parse_args()
+
+tuned_params = {}
+if args.params:
+    with open(args.params) as f:
+        tuned_params = json.load(f)
+    print(f"Using XGBoost parameters from {args.params}: {tuned_params}")
 
-X_train = data_splits['X_train']
+# Load the splits written by prepare_data.py, encoded once and cached as memory-mapped
+# matrices in data_splits/encoded (see feature_matrix.py); later runs on the same data reuse them
+print("Loading prepared data splits...")
+manifest = read_store_manifest('data_splits')
+numeric_features = manifest['numeric_features']
+categorical_features = manifest['categorical_features']
+data_splits = load_encoded_splits('data_splits', make_preprocessor(numeric_features, categorical_features))
+print("Reused the cached encoded matrices" if data_splits['cached'] else "Encoded the splits and cached the matrices")
+
+preprocessor_fit = data_splits['preprocessor']
+X_train_preprocessed = data_splits['X_train']
 y_train = data_splits['y_train']
-X_val = data_splits['X_val']
+X_val_transformed = data_splits['X_val']
 y_val = data_splits['y_val']
-X_test = data_splits['X_test']
+X_test_transformed = data_splits['X_test']
 y_test = data_splits['y_test']
-numeric_features = data_splits['numeric_features']
-categorical_features = data_splits['categorical_features']
-
-print(f"Training set: {X_train.shape[0]} samples")
-print(f"Validation set: {X_val.shape[0]} samples")
-print(f"Test set: {X_test.shape[0]} samples")
-
-# Create preprocessing pipeline
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('num', StandardScaler(), numeric_features),
-        ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features)
-    ])
 
-# Apply preprocessing to validation data for later use with early stopping
-preprocessor_fit = preprocessor.fit(X_train)
-X_val_transformed = preprocessor_fit.transform(X_val)
+print(f"Training set: {X_train_preprocessed.shape[0]} samples")
+print(f"Validation set: {X_val_transformed.shape[0]} samples")
+print(f"Test set: {X_test_transformed.shape[0]} samples")
 
 # Create XGBoost classifier with early stopping parameters
 xgb_classifier = xgb.XGBClassifier(
     use_label_encoder=False,
     eval_metric='logloss',
     early_stopping_rounds=10,
-    verbose=True
+    verbose=True,
+    **tuned_params
 )
 
-# Create and train model pipeline
+# Train on the cached matrices
 print("\nTraining the model...")
-model_pipeline = Pipeline(steps=[
-    ('preprocessor', preprocessor),
-    ('classifier', xgb_classifier)
-])
-
-# Fit the model
-X_train_preprocessed = preprocessor_fit.transform(X_train)
 eval_set = [(X_train_preprocessed, y_train), (X_val_transformed, y_val)]
 xgb_classifier.fit(X_train_preprocessed, y_train, eval_set=eval_set)
 
@@ -65,8 +64,9 @@ final_pipeline = Pipeline(steps=[
 
 # Make predictions on validation set
 print("\nEvaluating on validation set...")
-y_val_pred = final_pipeline.predict(X_val)
-y_val_pred_proba = final_pipeline.predict_proba(X_val)[:, 1]
+# Score the already encoded matrices instead of re-running the preprocessor
+y_val_pred = xgb_classifier.predict(X_val_transformed)
+y_val_pred_proba = xgb_classifier.predict_proba(X_val_transformed)[:, 1]
 
 print("Validation Accuracy:", accuracy_score(y_val, y_val_pred))
 print("Validation AUC:", roc_auc_score(y_val, y_val_pred_proba))
@@ -75,8 +75,8 @@ print(classification_report(y_val, y_val_pred))
 
 # Final evaluation on test set
 print("\nFinal evaluation on test set...")
-y_test_pred = final_pipeline.predict(X_test)
-y_test_pred_proba = final_pipeline.predict_proba(X_test)[:, 1]
+y_test_pred = xgb_classifier.predict(X_test_transformed)
+y_test_pred_proba = xgb_classifier.predict_proba(X_test_transformed)[:, 1]
 
 print("Test Accuracy:", accuracy_score(y_test, y_test_pred))
 print("Test AUC:", roc_auc_score(y_test, y_test_pred_proba))
@@ -93,10 +93,22 @@ with open('distraction_model.pkl', 'wb') as f:
 with open('feature_columns.pkl', 'wb') as f:
     pickle.dump({'numeric': numeric_features, 'categorical': categorical_features}, f)
 
+# Export the pickle-free model bundle (native XGBoost booster + preprocessing arrays)
+try:
+    export_bundle(final_pipeline, {'numeric': numeric_features, 'categorical': categorical_features},
+                  'distraction_model_bundle', with_onnx=True)
+    print("Model bundle saved to 'distraction_model_bundle' (with ONNX)")
+except ImportError:
+    export_bundle(final_pipeline, {'numeric': numeric_features, 'categorical': categorical_features},
+                  'distraction_model_bundle')
+    print("Model bundle saved to 'distraction_model_bundle' (onnxmltools not installed, skipped ONNX)")
+
 print("\nModel training completed and saved!")
 
-# Plot feature importance
+# Plot feature importance (matplotlib is optional and only imported here)
 try:
+    import matplotlib.pyplot as plt
+
     # Get feature importances
     xgb_model = xgb_classifier
     importances = xgb_model.feature_importances_
@@ -111,7 +123,7 @@ try:
     # Get one-hot encoded feature names
     if len(categorical_features) > 0:
         for i, category in enumerate(categorical_features):
-            ohe = preprocessor.transformers_[1][1]
+            ohe = preprocessor_fit.transformers_[1][1]
             for category_value in ohe.categories_[i]:
                 feature_names.append(f"{category}_{category_value}")
 
@@ -0,0 +1,187 @@
+"""
+Pure NumPy evaluator for the XGBoost tree ensemble.
+
+The trees are flattened into one set of node arrays (feature index,
+threshold, left child, default direction, leaf value), with the node ids of
+every tree offset into the shared arrays. XGBoost allocates the two children
+of a split next to each other, so the right child is always left + 1 and the
+next node is left[node] + went_right. A batch is scored by moving a
+(rows x trees) matrix of node ids down all trees at once, one level per step,
+for as many steps as the deepest tree. Leaves point to themselves with an
+infinite threshold, so rows that reach a leaf early stay there. Rows are
+processed in blocks so the working arrays stay in the CPU cache.
+
+Loading and scoring need only NumPy: no xgboost, sklearn or pandas import,
+which makes it suited to small containers and fast cold starts. The arrays
+are exported from a trained booster (which needs xgboost) and stored as an
+.npz file in the model bundle (see model_bundle.py).
+"""
+import json
+
+import numpy as np
+
+ENSEMBLE_VERSION = 1
+
+# Rows scored together; keeps the (rows x trees) working arrays cache-sized
+BLOCK_ROWS = 256
+
+
+class TreeEnsemble:
+    """
+    Flat-array form of a binary:logistic XGBoost booster.
+    """
+
+    def __init__(self, feature, threshold, left, default_left, value, roots, depth, base_margin):
+        """
+        Args:
+            feature (numpy.ndarray): Split feature index per node (0 for leaves)
+            threshold (numpy.ndarray): float32 split threshold per node; rows with value < threshold go left
+                (infinite for leaves)
+            left (numpy.ndarray): Left child per node, the right child is left + 1 (the node itself for leaves)
+            default_left (numpy.ndarray): Whether missing values go left, per node (True for leaves)
+            value (numpy.ndarray): Leaf value per node (0 for internal nodes)
+            roots (numpy.ndarray): Root node of each tree
+            depth (int): Depth of the deepest tree
+            base_margin (float): Margin added to the sum of the trees (log-odds)
+        """
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.value = np.asarray(value, dtype=np.float32)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.depth = int(depth)
+        self.base_margin = float(base_margin)
+
+    @classmethod
+    def from_booster(cls, booster):
+        """
+        Flatten a trained booster.
+
+        Args:
+            booster (xgboost.Booster): binary:logistic booster with numerical splits only
+
+        Returns:
+            TreeEnsemble: The flattened ensemble
+        """
+        model = json.loads(booster.save_raw('json'))['learner']
+        if model['objective']['name'] != 'binary:logistic':
+            raise ValueError(f"Only binary:logistic boosters are supported, not {model['objective']['name']}")
+
+        feature, threshold, left, default_left, value, roots = [], [], [], [], [], []
+        depth = 0
+        for tree in model['gradient_booster']['model']['trees']:
+            if any(split_type != 0 for split_type in tree['split_type']):
+                raise ValueError('Categorical splits are not supported')
+            offset = len(feature)
+            roots.append(offset)
+            tree_left = np.asarray(tree['left_children'])
+            tree_right = np.asarray(tree['right_children'])
+            is_leaf = tree_left == -1
+            if np.any(tree_right[~is_leaf] != tree_left[~is_leaf] + 1):
+                raise ValueError('Expected the right child of every split to follow its left child')
+            nodes = np.arange(len(tree_left))
+
+            feature.extend(np.where(is_leaf, 0, tree['split_indices']).tolist())
+            threshold.extend(np.where(is_leaf, np.inf, tree['split_conditions']).tolist())
+            left.extend((np.where(is_leaf, nodes, tree_left) + offset).tolist())
+            default_left.extend((is_leaf | np.asarray(tree['default_left'], dtype=bool)).tolist())
+            value.extend(np.where(is_leaf, tree['split_conditions'], 0.0).tolist())
+            depth = max(depth, _tree_depth(tree_left, tree_right))
+
+        # base_score is stored as a probability
+        base_score = float(model['learner_model_param']['base_score'])
+        return cls(feature, threshold, left, default_left, value, roots, depth,
+                   np.log(base_score / (1 - base_score)))
+
+    def save(self, path):
+        """
+        Write the arrays to an .npz file.
+
+        Args:
+            path (str): File path
+        """
+        np.savez(
+            path, version=ENSEMBLE_VERSION,
+            feature=self.feature.astype(np.int32), threshold=self.threshold,
+            left=self.left.astype(np.int32),
+            default_left=self.default_left, value=self.value, roots=self.roots.astype(np.int32),
+            depth=self.depth, base_margin=self.base_margin,
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read an ensemble written by save.
+
+        Args:
+            path (str): File path
+
+        Returns:
+            TreeEnsemble: The ensemble
+        """
+        with np.load(path) as arrays:
+            if int(arrays['version']) != ENSEMBLE_VERSION:
+                raise ValueError(f"Unsupported tree ensemble version {int(arrays['version'])}")
+            return cls(
+                arrays['feature'], arrays['threshold'], arrays['left'],
+                arrays['default_left'], arrays['value'], arrays['roots'],
+                int(arrays['depth']), float(arrays['base_margin']),
+            )
+
+    def predict_margin(self, matrix):
+        """
+        Sum the trees' outputs for each row.
+
+        Args:
+            matrix (numpy.ndarray): Encoded rows, NaN for missing values
+
+        Returns:
+            numpy.ndarray: Margin (log-odds) per row
+        """
+        matrix = np.asarray(matrix, dtype=np.float32)
+        margin = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(matrix), BLOCK_ROWS):
+            block = matrix[start:start + BLOCK_ROWS]
+            margin[start:start + len(block)] = self._block_margin(block)
+        return margin + np.float32(self.base_margin)
+
+    def _block_margin(self, block):
+        n_rows, n_features = block.shape
+        values = np.ascontiguousarray(block).ravel()
+        # Flat index of each row's first feature, broadcast against the trees
+        row_offsets = (np.arange(n_rows) * n_features)[:, None]
+        has_missing = np.isnan(values).any()
+
+        nodes = np.broadcast_to(self.roots, (n_rows, len(self.roots)))
+        for _ in range(self.depth):
+            x = values[row_offsets + self.feature[nodes]]
+            # NaN < threshold is False, so missing values go right unless the node sends them left
+            go_left = x < self.threshold[nodes]
+            if has_missing:
+                go_left |= np.isnan(x) & self.default_left[nodes]
+            nodes = self.left[nodes] + ~go_left
+
+        return self.value[nodes].sum(axis=1, dtype=np.float32)
+
+    def predict_proba(self, matrix):
+        """
+        Predict the probability of the positive class.
+
+        Args:
+            matrix (numpy.ndarray): Encoded rows, NaN for missing values
+
+        Returns:
+            numpy.ndarray: Probability per row
+        """
+        return 1 / (1 + np.exp(-self.predict_margin(matrix)))
+
+
+def _tree_depth(left, right):
+    # Number of splits on the longest root-to-leaf path
+    depth, level = 0, [0]
+    while True:
+        level = [child for node in level if left[node] != -1 for child in (left[node], right[node])]
+        if not level:
+            return depth
+        depth += 1
@@ -0,0 +1,292 @@
+"""
+Parallel hyperparameter search with k-fold cross-validation.
+
+Random-search trials over the XGBoost parameters (max_depth, learning_rate,
+subsample, colsample_bytree, min_child_weight; always tree_method='hist') run
+in a process pool. Workers memory-map the encoded training matrix cached by
+train_model.py / feature_matrix.py, so it is shared through the page cache
+instead of being pickled to every process. Each fold uses early stopping on
+an inner validation split of its training rows, so the held-out fold that
+is scored never picks the number of trees, and a trial whose running mean AUC falls more than --prune-margin below the best
+finished trial is stopped early.
+
+The leaderboard ranks trials by mean CV AUC next to training time, serving
+latency and booster size, and marks the trials on the Pareto front (no other
+trial is at least as accurate, as fast to serve and as small), so the model
+picked is both accurate and cheap to serve.
+
+Usage:
+python tune_model.py --trials 40 --folds 5 --workers 4
+python train_model.py --params tuning/best_params.json
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from feature_matrix import load_encoded_splits, make_preprocessor, open_encoded_splits
+from split_store import read_store_manifest
+
+# Search space: (low, high) ranges sampled uniformly, lists sampled as choices
+SEARCH_SPACE = {
+    'max_depth': [3, 4, 5, 6, 8, 10],
+    'learning_rate': (0.02, 0.3),
+    'subsample': (0.6, 1.0),
+    'colsample_bytree': (0.5, 1.0),
+    'min_child_weight': [1, 2, 5, 10],
+}
+FIXED_PARAMS = {
+    'tree_method': 'hist',
+    'n_estimators': 1000,
+    'early_stopping_rounds': 20,
+    'eval_metric': 'auc',
+}
+
+# Set in each worker by _init_worker
+_splits = None
+_best_auc = None
+
+
+def sample_trials(n_trials, seed=0):
+    """
+    Draw random parameter sets from SEARCH_SPACE.
+
+    Args:
+        n_trials (int): Number of trials
+        seed (int): Random seed
+
+    Returns:
+        list: One parameter dict per trial
+    """
+    rng = random.Random(seed)
+    trials = []
+    for _ in range(n_trials):
+        params = {}
+        for name, space in SEARCH_SPACE.items():
+            if isinstance(space, list):
+                params[name] = rng.choice(space)
+            else:
+                params[name] = round(rng.uniform(*space), 4)
+        trials.append(params)
+    return trials
+
+
+def stratified_folds(y, n_folds, seed=0, validation_fraction=0.1):
+    """
+    Split row indices into stratified folds, each with an inner early-stopping split.
+
+    Args:
+        y (numpy.ndarray): Binary target
+        n_folds (int): Number of folds
+        seed (int): Random seed
+        validation_fraction (float): Share of each fold's training rows held out for early stopping
+
+    Returns:
+        list: (fit_indices, validation_indices, test_indices) per fold
+    """
+    from sklearn.model_selection import StratifiedKFold, train_test_split
+
+    folds = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    return [
+        (*train_test_split(train_index, test_size=validation_fraction, stratify=y[train_index], random_state=seed),
+         test_index)
+        for train_index, test_index in folds.split(np.zeros(len(y)), y)
+    ]
+
+
+def _init_worker(store_dir, best_auc):
+    global _splits, _best_auc
+    _splits = open_encoded_splits(store_dir)
+    _best_auc = best_auc
+
+
+def run_trial(trial_id, params, folds, n_jobs, prune_margin):
+    """
+    Cross-validate one parameter set in a worker process.
+
+    Args:
+        trial_id (int): Trial number
+        params (dict): Sampled XGBoost parameters
+        folds (list): (fit_indices, validation_indices, test_indices) per fold
+        n_jobs (int): XGBoost threads for this trial
+        prune_margin (float): Stop the trial when its running mean AUC is this far below the best trial
+
+    Returns:
+        dict: Leaderboard row
+    """
+    import xgboost as xgb
+    from sklearn.metrics import roc_auc_score
+
+    X, y = _splits['X_train'], np.asarray(_splits['y_train'])
+    aucs, fit_seconds, model_kb, latency_us, iterations = [], [], [], [], []
+    pruned = False
+
+    for fit_index, validation_index, test_index in folds:
+        classifier = xgb.XGBClassifier(**FIXED_PARAMS, **params, n_jobs=n_jobs)
+        X_fold_test, y_fold_test = X[test_index], y[test_index]
+
+        # Early stopping watches the inner validation rows; the test fold is only scored
+        start = time.perf_counter()
+        classifier.fit(X[fit_index], y[fit_index], eval_set=[(X[validation_index], y[validation_index])],
+                       verbose=False)
+        fit_seconds.append(time.perf_counter() - start)
+
+        booster = classifier.get_booster()
+        best_iteration = classifier.best_iteration
+        booster = booster[:best_iteration + 1]
+        iterations.append(best_iteration + 1)
+        model_kb.append(len(booster.save_raw('ubj')) / 1024)
+
+        # Batch scoring time per row on the held-out fold
+        start = time.perf_counter()
+        probabilities = booster.inplace_predict(X_fold_test)
+        latency_us.append((time.perf_counter() - start) * 1e6 / X_fold_test.shape[0])
+        aucs.append(roc_auc_score(y_fold_test, probabilities))
+
+        # Stop trials that cannot catch up with the best finished one
+        if len(aucs) < len(folds) and np.mean(aucs) < _best_auc.value - prune_margin:
+            pruned = True
+            break
+
+    mean_auc = float(np.mean(aucs))
+    if not pruned:
+        with _best_auc.get_lock():
+            _best_auc.value = max(_best_auc.value, mean_auc)
+
+    return {
+        'trial': trial_id,
+        'mean_auc': round(mean_auc, 5),
+        'std_auc': round(float(np.std(aucs)), 5),
+        'folds': len(aucs),
+        'pruned': pruned,
+        'n_trees': int(np.mean(iterations)),
+        'fit_seconds': round(float(np.mean(fit_seconds)), 3),
+        'model_kb': round(float(np.mean(model_kb)), 1),
+        'predict_us_per_row': round(float(np.mean(latency_us)), 3),
+        'params': params,
+    }
+
+
+def mark_pareto(rows):
+    """
+    Flag the finished trials no other trial beats on AUC, latency and size at once.
+
+    Args:
+        rows (list of dict): Leaderboard rows
+    """
+    def scores(row):
+        # Higher is better on every axis
+        return (row['mean_auc'], -row['predict_us_per_row'], -row['model_kb'])
+
+    finished = [scores(row) for row in rows if not row['pruned']]
+    for row in rows:
+        own = scores(row)
+        dominated = any(
+            all(a >= b for a, b in zip(other, own)) and other != own for other in finished
+        )
+        row['pareto'] = not row['pruned'] and not dominated
+
+
+def tune(store_dir='data_splits', n_trials=20, n_folds=5, n_workers=None, prune_margin=0.02, seed=0):
+    """
+    Run the search.
+
+    Args:
+        store_dir (str): Split store written by prepare_data.py
+        n_trials (int): Number of random-search trials
+        n_folds (int): Cross-validation folds per trial
+        n_workers (int): Worker processes (default: one per CPU)
+        prune_margin (float): AUC margin below the best trial at which a trial is stopped
+        seed (int): Random seed for the trials and folds
+
+    Returns:
+        list: Leaderboard rows sorted by mean AUC, pruned trials last
+    """
+    manifest = read_store_manifest(store_dir)
+    # Encode once in the parent; workers only memory-map the cached matrices
+    splits = load_encoded_splits(
+        store_dir, make_preprocessor(manifest['numeric_features'], manifest['categorical_features'])
+    )
+    folds = stratified_folds(np.asarray(splits['y_train']), n_folds, seed)
+    del splits
+
+    n_workers = n_workers or os.cpu_count() or 1
+    n_jobs = max(1, (os.cpu_count() or 1) // n_workers)
+    best_auc = multiprocessing.Value('d', 0.0)
+
+    rows = []
+    with ProcessPoolExecutor(n_workers, initializer=_init_worker, initargs=(store_dir, best_auc)) as pool:
+        futures = [
+            pool.submit(run_trial, trial_id, params, folds, n_jobs, prune_margin)
+            for trial_id, params in enumerate(sample_trials(n_trials, seed))
+        ]
+        for future in as_completed(futures):
+            row = future.result()
+            rows.append(row)
+            status = 'pruned' if row['pruned'] else 'done'
+            print(f"trial {row['trial']:>3} {status:<6} AUC {row['mean_auc']:.4f} "
+                  f"({row['folds']} folds, {row['fit_seconds']:.2f} s/fold, {row['model_kb']:.0f} KB)")
+
+    mark_pareto(rows)
+    rows.sort(key=lambda row: (row['pruned'], -row['mean_auc']))
+    return rows
+
+
+def write_leaderboard(rows, output_dir):
+    """
+    Write the leaderboard as JSON and CSV, and the best parameters as JSON.
+
+    Args:
+        rows (list of dict): Sorted leaderboard rows
+        output_dir (str): Directory to write to (created if needed)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'leaderboard.json'), 'w') as f:
+        json.dump(rows, f, indent=2)
+
+    columns = ['rank', 'trial', 'mean_auc', 'std_auc', 'folds', 'pruned', 'pareto', 'n_trees',
+               'fit_seconds', 'model_kb', 'predict_us_per_row'] + list(SEARCH_SPACE)
+    with open(os.path.join(output_dir, 'leaderboard.csv'), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for rank, row in enumerate(rows, 1):
+            writer.writerow({'rank': rank, **{k: v for k, v in row.items() if k != 'params'}, **row['params']})
+
+    if rows and not rows[0]['pruned']:
+        best = rows[0]
+        with open(os.path.join(output_dir, 'best_params.json'), 'w') as f:
+            # n_estimators is the number of trees early stopping kept, so train_model.py needs no eval set
+            json.dump({'tree_method': 'hist', 'n_estimators': best['n_trees'], **best['params']}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--store', default='data_splits', help='Split store directory (default: data_splits)')
+    parser.add_argument('--trials', type=int, default=20)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--prune-margin', type=float, default=0.02)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='tuning', help='Leaderboard directory (default: tuning)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = tune(args.store, args.trials, args.folds, args.workers, args.prune_margin, args.seed)
+    write_leaderboard(rows, args.output)
+
+    print(f"\nSearch finished in {time.perf_counter() - start:.1f} s\n")
+    print(f"{'rank':>4} {'trial':>5} {'AUC':>7} {'s/fold':>7} {'KB':>7} {'us/row':>7}  pareto  params")
+    for rank, row in enumerate(rows[:10], 1):
+        print(f"{rank:>4} {row['trial']:>5} {row['mean_auc']:>7.4f} {row['fit_seconds']:>7.2f} {row['model_kb']:>7.0f} "
+              f"{row['predict_us_per_row']:>7.2f}  {'yes' if row['pareto'] else '':<6}  {row['params']}")
+    print(f"\nLeaderboard written to {args.output}/leaderboard.csv")
+
+
+if __name__ == '__main__':
+    main()
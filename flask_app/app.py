@@ -1,122 +1,84 @@
 # app.py
-from flask import Flask, request, jsonify, render_template
-import pandas as pd
-import pickle
-import numpy as np
+from flask import render_template, jsonify
 from flask_cors import CORS
 import os
+import sys
+import time
 
-# Set up the template folder path to point to the templates directory in the flask_app directory
-template_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
-app = Flask(__name__, template_folder=template_dir)
-# Enable CORS for all routes with specific settings for the frontend
-# Get allowed origins from environment variable or use a default list
-allowed_origins = os.environ.get('ALLOWED_ORIGINS', 'http://localhost:9002,http://localhost:3000')
-origins_list = allowed_origins.split(',')
-CORS(app, resources={r"/*": {"origins": origins_list, "supports_credentials": True}})
+# Shared prediction modules live in ../BrainHack; the Docker image copies them to
+# BRAINHACK_DIR (see Dockerfile)
+brainhack_dir = os.environ.get(
+    'BRAINHACK_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'BrainHack')
+)
+sys.path.insert(0, brainhack_dir)
+
+from serving import InferenceService, create_app
+
+# Record when and in which process the model is loaded. With gunicorn's preload_app
+# (see gunicorn.conf.py) this runs once in the master and the workers share the pages.
+load_started = time.perf_counter()
+loaded_in_pid = os.getpid()
 
 # Set up paths to the model and feature columns files
 model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'distraction_model.pkl')
 feature_columns_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'feature_columns.pkl')
 
-# Load the model
-# Note: There might be a warning about loading a serialized XGBoost model from an older version
-# If you encounter issues, consider exporting the model using Booster.save_model and then loading it
+# Load the model through the shared serving package, which owns /predict, /predict/batch,
+# /health and /stats/cache and the optional fast paths (COMPILED_INFERENCE,
+# PREDICTION_CACHE_SIZE, MAX_BATCH_SIZE). With BACKGROUND_MODEL_LOAD the model loads on a
+# thread and /health answers 503 until it is ready.
 try:
-    # Try to load the model using a more compatible approach for XGBoost
-    import xgboost as xgb
-    if os.path.exists(model_path):
-        with open(model_path, 'rb') as f:
-            model = pickle.load(f)
-        print("Model loaded successfully")
-
-        # If this is an XGBoost model and we want to avoid the serialization warning,
-        # we could save and reload it using XGBoost's native format
-        # Uncomment the following lines if you want to convert the model
-        """
-        if isinstance(model, xgb.Booster) or hasattr(model, 'get_booster'):
-            # Get the booster if it's a scikit-learn wrapper
-            booster = model.get_booster() if hasattr(model, 'get_booster') else model
-            # Save in XGBoost format
-            temp_model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'temp_model.json')
-            booster.save_model(temp_model_path)
-            # Load back
-            new_model = xgb.Booster()
-            new_model.load_model(temp_model_path)
-            # Replace the original model
-            model = new_model
-            # Clean up
-            os.remove(temp_model_path)
-            print("Model converted to XGBoost native format")
-        """
-    else:
-        raise FileNotFoundError(f"Model file not found at {model_path}")
+    service = InferenceService.from_env(model_path, feature_columns_path)
+    print("Model loaded successfully" if service.ready else "Loading model in the background")
 except Exception as e:
     print(f"Error loading model: {e}")
     raise
 
-# Load the feature columns
-try:
-    with open(feature_columns_path, 'rb') as f:
-        feature_columns = pickle.load(f)
-    print("Feature columns loaded successfully")
-except Exception as e:
-    print(f"Error loading feature columns: {e}")
-    raise
+model_load_seconds = time.perf_counter() - load_started
+
+# Set up the template folder path to point to the templates directory in the flask_app directory
+template_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+app = create_app(service, template_folder=template_dir)
+# Enable CORS for all routes with specific settings for the frontend
+# Get allowed origins from environment variable or use a default list
+allowed_origins = os.environ.get('ALLOWED_ORIGINS', 'http://localhost:9002,http://localhost:3000')
+origins_list = allowed_origins.split(',')
+CORS(app, resources={r"/*": {"origins": origins_list, "supports_credentials": True}})
 
 
-@app.route('/')
-def home():
-    return render_template('index.html')
+def process_memory():
+    # Resident and proportional set size of this process, in MB. PSS splits shared
+    # pages between the processes mapping them, so summing PSS across workers gives
+    # their real combined footprint, unlike RSS.
+    memory = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty'):
+                    memory[key.lower() + '_mb'] = round(int(value.split()[0]) / 1024, 2)
+    except OSError:
+        # Not on Linux: fall back to peak RSS
+        import resource
+        memory['max_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2)
+    return memory
+
 
 @app.route('/ask-brainhack')
 def ask_brainhack():
     return render_template('ask_brainhack.html')
 
 
-@app.route('/predict', methods=['POST'])
-def predict():
-    # Get data from form
-    data = request.form.to_dict()
-
-    # Create a DataFrame with one row
-    input_df = pd.DataFrame([data])
-
-    # Ensure all required numeric columns exist
-    for col in feature_columns['numeric']:
-        if col in input_df.columns:
-            input_df[col] = input_df[col].astype(float)
-        else:
-            # Add missing numeric columns with default value 0
-            input_df[col] = 0
-
-    # Ensure all required categorical columns exist
-    for col in feature_columns['categorical']:
-        if col not in input_df.columns:
-            # Add missing categorical columns with the default value 'unknown'
-            input_df[col] = 'unknown'
-
-    # Make prediction
-    prediction = float(model.predict_proba(input_df)[0, 1])
-
-    # Format as percentage
-    risk_percentage = round(prediction * 100, 2)
-
-    # Generate recommendations based on risk level
-    if risk_percentage > 75:
-        recommendation = "High risk of distraction. Consider avoiding your phone for the next 15 minutes."
-        alternative = "Try a 5-minute walk or deep breathing exercise instead."
-    elif risk_percentage > 50:
-        recommendation = "Moderate risk of distraction. Be mindful of your phone usage."
-        alternative = "Set a timer if you need to use your phone."
-    else:
-        recommendation = "Low risk of distraction. This is a good time to use your phone if needed."
-        alternative = "Remember to stay focused on your primary task."
-
+@app.route('/stats/worker', methods=['GET'])
+def worker_stats():
     return jsonify({
-        'risk_percentage': risk_percentage,
-        'recommendation': recommendation,
-        'alternative': alternative
+        'pid': os.getpid(),
+        'preloaded': os.getpid() != loaded_in_pid,
+        # For background loads, the time the loading thread took
+        'model_load_seconds': service.load_seconds if service.loader else round(model_load_seconds, 4),
+        # Set by gunicorn.conf.py: time from fork until the worker is ready to serve
+        'worker_startup_seconds': app.config.get('WORKER_STARTUP_SECONDS'),
+        'memory': process_memory()
     })
 
 
@@ -0,0 +1,29 @@
+# asgi_app.py
+# ASGI serving mode for the prediction API with micro-batching of concurrent requests.
+#
+# Run with:
+#   uvicorn asgi_app:app --host 0.0.0.0 --port 8080 --workers 4
+#
+# /predict takes the same form or JSON body and returns the same response as the
+# Flask app, but concurrent requests are scored together in one batched model call.
+import os
+import sys
+
+brainhack_dir = os.environ.get(
+    'BRAINHACK_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'BrainHack')
+)
+sys.path.insert(0, brainhack_dir)
+
+from micro_batcher import MicroBatcher
+from serving import InferenceService, create_asgi_app
+
+# Batching knobs: flush after MICRO_BATCH_MAX_WAIT_MS or MICRO_BATCH_SIZE rows, whichever comes first
+MICRO_BATCH_SIZE = int(os.environ.get('MICRO_BATCH_SIZE', 64))
+MICRO_BATCH_MAX_WAIT_MS = float(os.environ.get('MICRO_BATCH_MAX_WAIT_MS', 5))
+
+model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'distraction_model.pkl')
+feature_columns_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'feature_columns.pkl')
+# Compiled inference is the default here; MAX_BATCH_SIZE still limits /predict/batch
+service = InferenceService.from_env(model_path, feature_columns_path, compiled=True)
+batcher = MicroBatcher(service.predict_batch, max_batch_size=MICRO_BATCH_SIZE, max_wait_ms=MICRO_BATCH_MAX_WAIT_MS)
+app = create_asgi_app(service, batcher)
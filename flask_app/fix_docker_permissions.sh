@@ -33,5 +33,5 @@ echo ""
 echo "If you still see permission errors, you can use the temporary fix:"
 echo "  sudo chmod 666 /var/run/docker.sock"
 echo "Or use sudo with Docker commands:"
-echo "  sudo docker build -t distraction-predictor-api ."
+echo "  sudo docker build -f Dockerfile -t distraction-predictor-api .."
 echo "  sudo docker run -p 8080:8080 distraction-predictor-api"
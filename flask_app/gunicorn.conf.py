@@ -0,0 +1,33 @@
+# gunicorn.conf.py
+# Gunicorn settings for the Flask API, loaded with `gunicorn --config gunicorn.conf.py app:app`.
+import gc
+import os
+import time
+
+bind = f"0.0.0.0:{os.environ.get('FLASK_PORT', 8080)}"
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+
+# Load app.py (and with it the model) once in the master before forking, so all
+# workers share the model's memory pages copy-on-write instead of each one
+# unpickling its own copy. Set GUNICORN_PRELOAD=false to load per worker.
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the garbage collector's reach, so
+    # collections in the workers do not write to (and thereby copy) shared pages
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    worker.forked_at = time.perf_counter()
+
+
+def post_worker_init(worker):
+    # Start the background model load (BACKGROUND_MODEL_LOAD) in this worker if the master's
+    # load had not finished when it forked, instead of on the first request
+    worker.wsgi.config['INFERENCE_SERVICE'].start()
+    startup_seconds = time.perf_counter() - worker.forked_at
+    worker.wsgi.config['WORKER_STARTUP_SECONDS'] = round(startup_seconds, 4)
+    worker.log.info(f"Worker {worker.pid} ready in {startup_seconds:.3f}s (preload_app={preload_app})")
@@ -0,0 +1,407 @@
+# load_test.py
+# HTTP load generator for the prediction API.
+#
+# Replays /predict payloads, synthetic or recorded, over a pool of keep-alive connections
+# driven by one asyncio event loop. Without --rate the test is closed-loop: each connection
+# sends its next request as soon as the previous answer arrives. With --rate it is open-loop:
+# requests are due on a fixed schedule, spread over the connections, and each latency is
+# measured from the time the request was due, not from when it could actually be sent. A
+# server that stalls delays the requests queued behind the stall too, and that waiting counts
+# (coordinated-omission correction, as in wrk2). The time from the actual send is reported
+# separately as the service time.
+#
+# Latencies are kept in a log-bucketed histogram with 1% resolution. The histograms and the
+# error counts are saved with --output, so runs can be compared later with --compare.
+#
+# --serve MODE:WORKERS starts the server itself (see SERVING_MODES), waits for /health, runs
+# the test against it and stops it, once per --serve, to compare gunicorn worker counts and
+# serving modes in one table.
+#
+# Usage:
+#   python load_test.py --url http://127.0.0.1:8080/predict --connections 32 --duration 20
+#   python load_test.py --rate 500 --connections 16 --duration 30 --output run.json
+#   python load_test.py --payloads recorded.ndjson --rate 200
+#   python load_test.py --serve gunicorn:1 --serve gunicorn:4 --serve uvicorn:1 --rate 300
+#   python load_test.py --compare before.json after.json
+#   python load_test.py --once    # send one request and print the response
+import argparse
+import asyncio
+import http.client
+import json
+import math
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from urllib.parse import urlencode, urlparse
+
+FLASK_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LOCATIONS = ['home', 'library', 'cafe', 'office', 'park', 'gym']
+ACTIVITIES = ['studying', 'working', 'break', 'social', 'entertainment', 'exercise']
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Number of distinct synthetic payloads, encoded once before the test
+N_SYNTHETIC = 1000
+
+GUNICORN = [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+            '--bind', '127.0.0.1:{port}', '--workers', '{workers}', 'app:app']
+UVICORN = [sys.executable, '-m', 'uvicorn', 'asgi_app:app', '--host', '127.0.0.1', '--port', '{port}',
+           '--workers', '{workers}', '--log-level', 'warning']
+
+# Command and extra environment of each --serve mode, run from this directory
+SERVING_MODES = {
+    'gunicorn': (GUNICORN, {}),
+    'gunicorn-compiled': (GUNICORN, {'COMPILED_INFERENCE': 'true'}),
+    'gunicorn-numpy': (GUNICORN, {'MODEL_PATH': 'distraction_model_bundle', 'MODEL_RUNTIME': 'numpy'}),
+    'uvicorn': (UVICORN, {}),
+}
+
+PERCENTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def make_payload(rng):
+    # Same fields as the HTML form
+    return {
+        'time_of_day_hour': rng.randint(0, 23),
+        'day_of_week': rng.choice(DAYS),
+        'location': rng.choice(LOCATIONS),
+        'current_activity': rng.choice(ACTIVITIES),
+        'productive_session_duration_minutes': rng.randint(0, 180),
+        'time_since_productive_activity_minutes': rng.randint(0, 240),
+        'stress_level': rng.randint(1, 5),
+        'fatigue_level': rng.randint(1, 5),
+        'notifications_last_30min': rng.randint(0, 15),
+        'phone_unlocks_last_hour': rng.randint(0, 30),
+    }
+
+
+def load_payloads(path=None, seed=0):
+    # (content type, body) pairs: the rows of a JSON array or NDJSON file sent as JSON,
+    # or synthetic form posts
+    if path is None:
+        rng = random.Random(seed)
+        return [('application/x-www-form-urlencoded', urlencode(make_payload(rng)).encode('utf-8'))
+                for _ in range(N_SYNTHETIC)]
+    with open(path, 'rb') as f:
+        text = f.read().decode('utf-8').strip()
+    rows = json.loads(text) if text.startswith('[') else [json.loads(line) for line in text.splitlines() if line.strip()]
+    if not rows:
+        raise ValueError(f'No payloads in {path}')
+    return [('application/json', json.dumps(row).encode('utf-8')) for row in rows]
+
+
+class LatencyHistogram:
+    # Log-bucketed histogram: bucket i holds latencies in [MIN_SECONDS * RATIO**i, MIN_SECONDS * RATIO**(i + 1))
+    MIN_SECONDS = 1e-5
+    RATIO = 1.01
+
+    def __init__(self, counts=None, max_seconds=0.0):
+        self.counts = Counter({int(bucket): count for bucket, count in (counts or {}).items()})
+        self.total = sum(self.counts.values())
+        self.max_seconds = max_seconds
+
+    def record(self, seconds):
+        bucket = int(math.log(seconds / self.MIN_SECONDS, self.RATIO)) if seconds > self.MIN_SECONDS else 0
+        self.counts[bucket] += 1
+        self.total += 1
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def percentile(self, q):
+        # Upper bound of the bucket holding the q-th latency, capped at the largest latency seen
+        if not self.total:
+            return float('nan')
+        rank, seen = max(1, math.ceil(q * self.total)), 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self.MIN_SECONDS * self.RATIO ** (bucket + 1), self.max_seconds)
+        return self.max_seconds
+
+    def summary_ms(self):
+        summary = {f'p{q * 100:g}': round(self.percentile(q) * 1000, 2) for q in PERCENTILES}
+        summary['max'] = round(self.max_seconds * 1000, 2)
+        return summary
+
+    def to_dict(self):
+        return {'counts': {str(bucket): count for bucket, count in sorted(self.counts.items())},
+                'max_seconds': self.max_seconds}
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(state['counts'], state['max_seconds'])
+
+
+async def read_response(reader):
+    # Read one HTTP/1.1 response; returns (status, body, whether the connection stays open)
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name:
+            headers[name.strip().lower()] = value.strip()
+
+    keep_alive = headers.get('connection', '').lower() != 'close'
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            chunk = await reader.readexactly(size + 2)
+            if size == 0:
+                break
+            chunks.append(chunk[:-2])
+        body = b''.join(chunks)
+    elif 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    else:
+        body, keep_alive = await reader.read(), False
+    return status, body, keep_alive
+
+
+class Connection:
+    # One keep-alive HTTP/1.1 connection, reopened after errors and 'Connection: close'
+
+    def __init__(self, host, port, timeout):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = self.writer = None
+
+    async def request(self, path, content_type, body):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout
+            )
+        self.writer.write(
+            f'POST {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nContent-Type: {content_type}\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body
+        )
+        try:
+            await self.writer.drain()
+            status, response, keep_alive = await asyncio.wait_for(read_response(self.reader), self.timeout)
+        except BaseException:
+            # The response may still arrive; never read it as the answer to the next request
+            self.close()
+            raise
+        if not keep_alive:
+            self.close()
+        return status, response
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def run_load(url, payloads, connections=32, duration=20.0, rate=None, warmup=2.0, timeout=10.0):
+    """
+    Run one load test.
+
+    Args:
+        url (str): Endpoint URL, e.g. http://127.0.0.1:8080/predict
+        payloads (list): (content type, body) pairs, sent in turn
+        connections (int): Keep-alive connections
+        duration (float): Seconds measured, after the warm-up
+        rate (float): Target requests per second over all connections (None: closed loop)
+        warmup (float): Seconds of load before the measurement starts
+        timeout (float): Seconds before a request counts as failed
+
+    Returns:
+        dict: Throughput, error counts, latency and service-time histograms
+    """
+    parsed = urlparse(url)
+    host, port, path = parsed.hostname, parsed.port or 80, parsed.path or '/'
+    latency, service_time, errors = LatencyHistogram(), LatencyHistogram(), Counter()
+    start = time.perf_counter() + 0.05
+    measure_from, end = start + warmup, start + warmup + duration
+
+    async def drive(index):
+        connection = Connection(host, port, timeout)
+        # Connection i sends requests i, i + connections, ...; with a rate they are due 1/rate apart
+        interval = connections / rate if rate else 0.0
+        due = start + index / rate if rate else None
+        sent_count = index
+        while True:
+            now = time.perf_counter()
+            if rate:
+                if due >= end:
+                    break
+                if due > now:
+                    await asyncio.sleep(due - now)
+            elif now >= end:
+                break
+            sent = time.perf_counter()
+            intended = due if rate else sent
+            content_type, body = payloads[sent_count % len(payloads)]
+            sent_count += connections
+            try:
+                status, _ = await connection.request(path, content_type, body)
+                error = None if status == 200 else f'HTTP {status}'
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                    ValueError, IndexError) as e:
+                error = type(e).__name__
+            done = time.perf_counter()
+            if intended >= measure_from:
+                if error is None:
+                    latency.record(done - intended)
+                    service_time.record(done - sent)
+                else:
+                    errors[error] += 1
+            if rate:
+                due += interval
+        connection.close()
+
+    await asyncio.gather(*(drive(index) for index in range(connections)))
+    # Requests still running at the end (or falling behind the schedule) finish after it
+    elapsed = max(time.perf_counter(), end) - measure_from
+    n_errors = sum(errors.values())
+    total = latency.total + n_errors
+    return {
+        'url': url,
+        'connections': connections,
+        'target_rate': rate,
+        'duration': duration,
+        'requests': total,
+        'throughput': round(latency.total / elapsed, 1),
+        'errors': dict(errors),
+        'error_rate': round(n_errors / total, 4) if total else 0.0,
+        'latency_ms': latency.summary_ms(),
+        'service_time_ms': service_time.summary_ms(),
+        'latency_histogram': latency.to_dict(),
+        'service_time_histogram': service_time.to_dict(),
+    }
+
+
+def wait_for_health(port, process, timeout=120.0):
+    # Poll /health until it answers 200; fails if the server exits first
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server exited with status {process.returncode}')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'Server not healthy after {timeout:.0f} s')
+
+
+def serve_and_load(spec, port, payloads, **load_options):
+    """
+    Start a server mode, load test it and stop it.
+
+    Args:
+        spec (str): MODE or MODE:WORKERS, MODE one of SERVING_MODES
+        port (int): Port the server listens on
+        payloads (list): (content type, body) pairs
+        **load_options: Options for run_load
+
+    Returns:
+        dict: run_load results, labeled with the spec
+    """
+    mode, _, workers = spec.partition(':')
+    if mode not in SERVING_MODES:
+        raise ValueError(f"Unknown serving mode {mode!r}, expected one of {', '.join(SERVING_MODES)}")
+    command, env = SERVING_MODES[mode]
+    command = [part.format(port=port, workers=workers or 1) for part in command]
+    with tempfile.TemporaryFile() as log:
+        # Its own process group, so the workers are stopped with it
+        process = subprocess.Popen(command, cwd=FLASK_APP_DIR, env={**os.environ, **env},
+                                   stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+        try:
+            wait_for_health(port, process)
+            result = asyncio.run(run_load(f'http://127.0.0.1:{port}/predict', payloads, **load_options))
+        except RuntimeError:
+            log.seek(0)
+            print(log.read().decode('utf-8', 'replace')[-2000:], file=sys.stderr)
+            raise
+        finally:
+            if process.poll() is None:
+                os.killpg(process.pid, signal.SIGTERM)
+                try:
+                    process.wait(30)
+                except subprocess.TimeoutExpired:
+                    os.killpg(process.pid, signal.SIGKILL)
+                    process.wait()
+    return {'label': spec, **result}
+
+
+def print_table(results):
+    print(f"{'run':<24}{'target/s':>10}{'req/s':>10}{'errors':>9}"
+          + ''.join(f'{name + " ms":>11}' for name in ('p50', 'p90', 'p99', 'p99.9', 'max'))
+          + f"{'svc p99 ms':>12}")
+    for result in results:
+        latency = result['latency_ms']
+        target = f"{result['target_rate']:g}" if result['target_rate'] else 'closed'
+        print(f"{result['label']:<24}{target:>10}{result['throughput']:>10.1f}{result['error_rate']:>9.2%}"
+              + ''.join(f"{latency[name]:>11.1f}" for name in ('p50', 'p90', 'p99', 'p99.9', 'max'))
+              + f"{result['service_time_ms']['p99']:>12.1f}")
+
+
+def send_once(url, payloads):
+    # What BrainHack/test_predict.py used to do: one request, response printed
+    parsed = urlparse(url)
+    content_type, body = payloads[0]
+    connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+    connection.request('POST', parsed.path or '/', body=body, headers={'Content-Type': content_type})
+    response = connection.getresponse()
+    print(f'HTTP {response.status}')
+    print(response.read().decode('utf-8', 'replace'))
+    return response.status == 200
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the /predict endpoint')
+    parser.add_argument('--url', default='http://127.0.0.1:8080/predict')
+    parser.add_argument('--connections', '--concurrency', type=int, default=32, help='Keep-alive connections')
+    parser.add_argument('--rate', type=float, help='Target requests per second (default: closed loop)')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds measured')
+    parser.add_argument('--warmup', type=float, default=2, help='Seconds of load before measuring')
+    parser.add_argument('--timeout', type=float, default=10, help='Seconds before a request fails')
+    parser.add_argument('--payloads', help='JSON array or NDJSON file of recorded rows (default: synthetic)')
+    parser.add_argument('--serve', action='append', metavar='MODE[:WORKERS]',
+                        help=f"Start and test a server: {', '.join(SERVING_MODES)} (repeatable)")
+    parser.add_argument('--port', type=int, default=8089, help='Port for --serve')
+    parser.add_argument('--label', help='Name of this run in the table and the output')
+    parser.add_argument('--output', help='Write the results, histograms included, to this JSON file')
+    parser.add_argument('--compare', nargs='+', metavar='RESULTS', help='Print saved results side by side')
+    parser.add_argument('--once', action='store_true', help='Send one request and print the response')
+    args = parser.parse_args()
+
+    if args.compare:
+        results = []
+        for path in args.compare:
+            with open(path) as f:
+                saved = json.load(f)
+            results += saved if isinstance(saved, list) else [saved]
+        print_table(results)
+        return
+
+    payloads = load_payloads(args.payloads)
+    if args.once:
+        sys.exit(0 if send_once(args.url, payloads) else 1)
+
+    load_options = {'connections': args.connections, 'duration': args.duration, 'rate': args.rate,
+                    'warmup': args.warmup, 'timeout': args.timeout}
+    if args.serve:
+        results = [serve_and_load(spec, args.port, payloads, **load_options) for spec in args.serve]
+    else:
+        results = [{'label': args.label or urlparse(args.url).netloc,
+                    **asyncio.run(run_load(args.url, payloads, **load_options))}]
+    print_table(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results if len(results) > 1 else results[0], f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
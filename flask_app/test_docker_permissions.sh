@@ -21,7 +21,7 @@ fi
 if docker info > /dev/null 2>&1; then
     echo "✅ Success! You have the necessary permissions to use Docker."
     echo "You can now build and run the Docker container:"
-    echo "  docker build -t distraction-predictor-api ."
+    echo "  docker build -f Dockerfile -t distraction-predictor-api .."
     echo "  docker run -p 8080:8080 distraction-predictor-api"
 else
     echo "❌ Error: You don't have permission to use Docker."
@@ -33,6 +33,6 @@ else
     echo "  newgrp docker"
     echo ""
     echo "Alternatively, you can use sudo with Docker commands:"
-    echo "  sudo docker build -t distraction-predictor-api ."
+    echo "  sudo docker build -f Dockerfile -t distraction-predictor-api .."
     echo "  sudo docker run -p 8080:8080 distraction-predictor-api"
 fi